@@ -0,0 +1,38 @@
+"""add_lesson_variants
+
+Revision ID: 0d6e8b3f5c72
+Revises: f3a7c2e9b615
+Create Date: 2026-10-17 16:48:20.537114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0d6e8b3f5c72'
+down_revision: Union[str, Sequence[str], None] = 'f3a7c2e9b615'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('lesson_variants',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('lesson_id', sa.UUID(), nullable=False),
+    sa.Column('level', sa.Integer(), nullable=False),
+    sa.Column('prompt_version', sa.String(length=50), nullable=False),
+    sa.Column('content_md', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['lesson_id'], ['lessons.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('lesson_id', 'level', 'prompt_version', name='uq_lesson_variants_lesson_level_version')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('lesson_variants')
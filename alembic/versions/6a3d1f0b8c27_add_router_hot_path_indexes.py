@@ -0,0 +1,69 @@
+"""add_router_hot_path_indexes
+
+Revision ID: 6a3d1f0b8c27
+Revises: 2c8f5b7e9d31
+Create Date: 2026-10-17 14:26:55.318047
+
+Indexes for the lookups every inbound WhatsApp message runs:
+- active mission of a learner: missions(learner_id) WHERE status = 'active'
+- current / next lesson: lessons(mission_id, order_index) WHERE status <> 'completed'
+- open progress row: user_progress(user_id, mission_id) WHERE status <> 'completed'
+plus a unique (mission_id, order_index) on lessons and plain FK indexes.
+
+Indexes are built CONCURRENTLY so the migration doesn't block writes on a live DB.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a3d1f0b8c27'
+down_revision: Union[str, Sequence[str], None] = '2c8f5b7e9d31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_missions_learner_id_active', 'missions', ['learner_id'],
+            postgresql_where=sa.text("status = 'active'"), postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_missions_goal_setter_id', 'missions', ['goal_setter_id'],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'uq_lessons_mission_id_order_index', 'lessons', ['mission_id', 'order_index'],
+            unique=True, postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_lessons_mission_id_order_index_open', 'lessons', ['mission_id', 'order_index'],
+            postgresql_where=sa.text("status <> 'completed'"), postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_user_progress_user_id_mission_id_open', 'user_progress', ['user_id', 'mission_id'],
+            postgresql_where=sa.text("status <> 'completed'"), postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_user_progress_lesson_id', 'user_progress', ['lesson_id'],
+            postgresql_concurrently=True,
+        )
+    # Promote the unique index to a named constraint (matches the model's UniqueConstraint).
+    op.execute(
+        'ALTER TABLE lessons ADD CONSTRAINT uq_lessons_mission_id_order_index '
+        'UNIQUE USING INDEX uq_lessons_mission_id_order_index'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_lessons_mission_id_order_index', 'lessons', type_='unique')
+    op.drop_index('ix_user_progress_lesson_id', table_name='user_progress')
+    op.drop_index('ix_user_progress_user_id_mission_id_open', table_name='user_progress')
+    op.drop_index('ix_lessons_mission_id_order_index_open', table_name='lessons')
+    op.drop_index('ix_missions_goal_setter_id', table_name='missions')
+    op.drop_index('ix_missions_learner_id_active', table_name='missions')
@@ -0,0 +1,42 @@
+"""add_document_extractions
+
+Revision ID: 7c4e1b9a2d58
+Revises: 0d6e8b3f5c72
+Create Date: 2026-10-17 19:02:41.306518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '7c4e1b9a2d58'
+down_revision: Union[str, Sequence[str], None] = '0d6e8b3f5c72'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('documents', sa.Column('content_sha256', sa.String(length=64), nullable=True))
+    op.create_index('ix_documents_content_sha256', 'documents', ['content_sha256'])
+    op.create_table('document_extractions',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('size_bytes', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('last_accessed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('sha256', 'kind')
+    )
+    op.create_index('ix_document_extractions_last_accessed_at', 'document_extractions', ['last_accessed_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_document_extractions_last_accessed_at', table_name='document_extractions')
+    op.drop_table('document_extractions')
+    op.drop_index('ix_documents_content_sha256', table_name='documents')
+    op.drop_column('documents', 'content_sha256')
@@ -0,0 +1,46 @@
+"""add_mission_lesson_counters
+
+Revision ID: 8e4b2d6f1a93
+Revises: 6a3d1f0b8c27
+Create Date: 2026-10-17 15:02:11.472930
+
+Denormalized missions.lessons_total / lessons_completed, backfilled from
+lessons with COUNT ... FILTER and maintained by services.complete_lesson.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4b2d6f1a93'
+down_revision: Union[str, Sequence[str], None] = '6a3d1f0b8c27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('missions', sa.Column('lessons_total', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('missions', sa.Column('lessons_completed', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        """
+        UPDATE missions m
+        SET lessons_total = c.total, lessons_completed = c.completed
+        FROM (
+            SELECT mission_id,
+                   count(*) AS total,
+                   count(*) FILTER (WHERE status = 'completed') AS completed
+            FROM lessons
+            GROUP BY mission_id
+        ) c
+        WHERE c.mission_id = m.id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('missions', 'lessons_completed')
+    op.drop_column('missions', 'lessons_total')
@@ -0,0 +1,46 @@
+"""add_inbound_messages
+
+Revision ID: 9b0e6d2c5a14
+Revises: 4f2a9c1d7e83
+Create Date: 2026-10-17 13:05:47.902311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b0e6d2c5a14'
+down_revision: Union[str, Sequence[str], None] = '4f2a9c1d7e83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('inbound_messages',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('phone_number', sa.String(length=20), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('media_url', sa.String(length=2048), nullable=True),
+    sa.Column('media_type', sa.String(length=50), nullable=True),
+    sa.Column('wa_message_id', sa.String(length=255), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_inbound_messages_status_created_at', 'inbound_messages', ['status', 'created_at'])
+    op.create_index('ix_inbound_messages_phone_number_status', 'inbound_messages', ['phone_number', 'status'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_inbound_messages_phone_number_status', table_name='inbound_messages')
+    op.drop_index('ix_inbound_messages_status_created_at', table_name='inbound_messages')
+    op.drop_table('inbound_messages')
@@ -0,0 +1,59 @@
+"""add_uploads_and_processing_jobs
+
+Revision ID: a9d3f6c1e047
+Revises: 7c4e1b9a2d58
+Create Date: 2026-10-17 20:14:09.781254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d3f6c1e047'
+down_revision: Union[str, Sequence[str], None] = '7c4e1b9a2d58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('uploads',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('filename', sa.String(length=500), nullable=False),
+    sa.Column('content_type', sa.String(length=255), nullable=True),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('storage_path', sa.String(length=2048), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_uploads_sha256', 'uploads', ['sha256'])
+    op.create_table('processing_jobs',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('upload_id', sa.UUID(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('result_path', sa.String(length=2048), nullable=True),
+    sa.Column('result_bytes', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['upload_id'], ['uploads.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_processing_jobs_status_created_at', 'processing_jobs', ['status', 'created_at'])
+    op.create_index('ix_processing_jobs_upload_id_created_at', 'processing_jobs', ['upload_id', 'created_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_processing_jobs_upload_id_created_at', table_name='processing_jobs')
+    op.drop_index('ix_processing_jobs_status_created_at', table_name='processing_jobs')
+    op.drop_table('processing_jobs')
+    op.drop_index('ix_uploads_sha256', table_name='uploads')
+    op.drop_table('uploads')
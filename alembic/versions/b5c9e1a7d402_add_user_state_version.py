@@ -0,0 +1,30 @@
+"""add_user_state_version
+
+Revision ID: b5c9e1a7d402
+Revises: 8e4b2d6f1a93
+Create Date: 2026-10-17 15:41:37.209184
+
+users.wa_state_version: optimistic-lock version for the per-process session
+state cache (app.session_state).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5c9e1a7d402'
+down_revision: Union[str, Sequence[str], None] = '8e4b2d6f1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('wa_state_version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'wa_state_version')
@@ -0,0 +1,50 @@
+"""unique_active_processing_job
+
+Revision ID: b8f1c4e6a2d9
+Revises: e2b7d4a9c613
+Create Date: 2026-10-17 19:04:51.208344
+
+At most one queued/running processing job per (upload_id, kind), so
+concurrent submits of the same upload share one job (app.jobs inserts with
+ON CONFLICT DO NOTHING). Duplicates that already exist are failed first,
+keeping the oldest.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8f1c4e6a2d9'
+down_revision: Union[str, Sequence[str], None] = 'e2b7d4a9c613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        """
+        UPDATE processing_jobs SET status = 'failed', error = 'duplicate job', finished_at = now()
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY upload_id, kind ORDER BY created_at, id
+                ) AS n
+                FROM processing_jobs
+                WHERE status IN ('queued', 'running')
+            ) ranked
+            WHERE n > 1
+        )
+        """
+    )
+    op.create_index(
+        'uq_processing_jobs_upload_id_kind_active', 'processing_jobs', ['upload_id', 'kind'],
+        unique=True, postgresql_where=sa.text("status IN ('queued', 'running')"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_processing_jobs_upload_id_kind_active', table_name='processing_jobs')
@@ -0,0 +1,33 @@
+"""add_inbound_reply
+
+Revision ID: c4e9a7d3b150
+Revises: b8f1c4e6a2d9
+Create Date: 2026-10-17 19:41:12.734590
+
+inbound_messages.reply_text / reply_media_url: the router's reply, written in
+the same transaction as its state changes. A message retried after its reply
+failed to send re-sends this instead of routing again (app.inbound_queue).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e9a7d3b150'
+down_revision: Union[str, Sequence[str], None] = 'b8f1c4e6a2d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('inbound_messages', sa.Column('reply_text', sa.Text(), nullable=True))
+    op.add_column('inbound_messages', sa.Column('reply_media_url', sa.String(length=2048), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('inbound_messages', 'reply_media_url')
+    op.drop_column('inbound_messages', 'reply_text')
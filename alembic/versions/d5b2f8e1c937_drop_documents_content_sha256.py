@@ -0,0 +1,33 @@
+"""drop_documents_content_sha256
+
+Revision ID: d5b2f8e1c937
+Revises: c4e9a7d3b150
+Create Date: 2026-10-17 20:06:33.481927
+
+documents.content_sha256 (added in 7c4e1b9a2d58) was never populated: no code
+path creates documents rows. Extractions are reached from uploads.sha256
+instead (Upload.extractions).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5b2f8e1c937'
+down_revision: Union[str, Sequence[str], None] = 'c4e9a7d3b150'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index('ix_documents_content_sha256', table_name='documents')
+    op.drop_column('documents', 'content_sha256')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('documents', sa.Column('content_sha256', sa.String(length=64), nullable=True))
+    op.create_index('ix_documents_content_sha256', 'documents', ['content_sha256'])
@@ -0,0 +1,30 @@
+"""unique_wa_message_id
+
+Revision ID: d71c3e8a0f56
+Revises: 9b0e6d2c5a14
+Create Date: 2026-10-17 13:31:12.044870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd71c3e8a0f56'
+down_revision: Union[str, Sequence[str], None] = '9b0e6d2c5a14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_messages_wa_message_id', 'messages', ['wa_message_id'], unique=True)
+    op.create_index('ix_inbound_messages_wa_message_id', 'inbound_messages', ['wa_message_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_inbound_messages_wa_message_id', table_name='inbound_messages')
+    op.drop_index('ix_messages_wa_message_id', table_name='messages')
@@ -0,0 +1,31 @@
+"""add_notification_claimed_at
+
+Revision ID: e2b7d4a9c613
+Revises: a9d3f6c1e047
+Create Date: 2026-10-17 18:12:04.531907
+
+notification_outbox.claimed_at: when a dispatcher marked the row 'sending'.
+Rows left 'sending' past the lease (dispatcher crashed mid-send) go back to
+'pending' (app.notifications).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b7d4a9c613'
+down_revision: Union[str, Sequence[str], None] = 'a9d3f6c1e047'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('notification_outbox', sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('notification_outbox', 'claimed_at')
@@ -0,0 +1,29 @@
+"""add_lesson_research_json
+
+Revision ID: f3a7c2e9b615
+Revises: b5c9e1a7d402
+Create Date: 2026-10-17 16:05:52.918346
+
+lessons.research_json: Tavily results stored by eager research (app.research).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a7c2e9b615'
+down_revision: Union[str, Sequence[str], None] = 'b5c9e1a7d402'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('lessons', sa.Column('research_json', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('lessons', 'research_json')
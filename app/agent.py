@@ -1,16 +1,32 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
 import json
+import logging
 import os
+import random
+import threading
+import time
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import datetime
 from typing import TypedDict
 
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph import END, START, StateGraph
-from tavily import TavilyClient
+
+from app.config import settings
+from app.search_cache import acached_search, cached_search
+from app.search_log import get_search_log
+from app.tracing import tracer
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 def _get_gemini_api_key() -> str:
     """Prefer app config so webhook can use GEMINI_API_KEY or GOOGLE_API_KEY."""
@@ -50,14 +66,8 @@ class AgentState(TypedDict):
 
 
 
-def outline_generator(state: AgentState):
-    """
-    Generate a logical, hierarchical lesson plan (outline) with 4-6 key topics
-    based on the user's learning goal.
-    """
-    user_question = state["user_question"]
-
-    prompt = f"""You are an expert curriculum designer. A user wants to learn about: {user_question}
+def _outline_prompt(user_question: str) -> str:
+    return f"""You are an expert curriculum designer. A user wants to learn about: {user_question}
 
 Generate a logical, hierarchical lesson plan (outline) with 4-6 key topics that will help them understand this subject comprehensively.
 
@@ -67,26 +77,46 @@ Example format: ["Introduction to Topic", "Core Concepts", "Practical Applicatio
 
 Generate the outline now:"""
 
-    try:
-        tool_llm = get_tool_llm()
-        response = tool_llm.invoke(prompt)
 
-        # Extract JSON from response
-        raw = response.content
-        content = (raw if isinstance(raw, str) else str(raw)).strip()
+def response_text(response) -> str:
+    """Text of a chat response whose content may be a string or a list of parts."""
+    raw = response.content
+    if isinstance(raw, list):
+        raw = "".join(
+            part if isinstance(part, str) else str(part.get("text", ""))
+            for part in raw
+            if isinstance(part, (str, dict))
+        )
+    return str(raw).strip()
 
-        # Remove markdown code blocks if present
-        if content.startswith("```"):
-            content = content.split("```")[1]
-            if content.startswith("json"):
-                content = content[4:]
-            content = content.strip()
 
-        # Parse JSON
-        outline = json.loads(content)
+def _parse_outline(content: str) -> list[str]:
+    """Parse the outline JSON array, tolerating a markdown code fence. Raises ValueError."""
+    # Remove markdown code blocks if present
+    if content.startswith("```"):
+        content = content.split("```")[1]
+        if content.startswith("json"):
+            content = content[4:]
+        content = content.strip()
+
+    outline = json.loads(content)
+    if not isinstance(outline, list) or len(outline) < 1:
+        raise ValueError("Failed to generate a valid outline")
+    return outline
 
-        if not isinstance(outline, list) or len(outline) < 1:
-            return {"error": "Failed to generate a valid outline"}
+
+def outline_generator(state: AgentState):
+    """
+    Generate a logical, hierarchical lesson plan (outline) with 4-6 key topics
+    based on the user's learning goal.
+    """
+    user_question = state["user_question"]
+    prompt = _outline_prompt(user_question)
+
+    try:
+        tool_llm = get_tool_llm()
+        response = tool_llm.invoke(prompt)
+        outline = _parse_outline(response_text(response))
 
         print(f"\n📋 Generated Outline ({len(outline)} topics):")
         for i, topic in enumerate(outline, 1):
@@ -96,6 +126,8 @@ Generate the outline now:"""
 
     except json.JSONDecodeError as e:
         return {"error": f"Failed to parse outline JSON: {str(e)}"}
+    except ValueError as e:
+        return {"error": str(e)}
     except Exception as e:
         return {"error": f"Error generating outline: {str(e)}"}
 
@@ -109,16 +141,12 @@ def source_harvester(state: AgentState):
     if not outline:
         return {"error": "No outline available for harvesting sources"}
 
-    tavily_api_key = os.getenv("TAVILY_API_KEY")
-    tavily_client = TavilyClient(tavily_api_key)
-
     all_facts = {}
-    log_path = "websearch_logs.json"
 
     def search_topic(topic: str) -> tuple[str, dict]:
         """Search a single topic and return (topic, results)."""
         try:
-            response = tavily_client.search(
+            response = cached_search(
                 query=topic,
                 search_depth="advanced",
                 max_results=5
@@ -130,21 +158,7 @@ def source_harvester(state: AgentState):
                 "query": topic,
                 "response": response
             }
-
-            # Thread-safe logging
-            if not os.path.exists(log_path):
-                with open(log_path, "w") as f:
-                    json.dump([log_entry], f, indent=4)
-            else:
-                with open(log_path, "r+") as f:
-                    try:
-                        data = json.load(f)
-                    except json.JSONDecodeError:
-                        data = []
-                    data.append(log_entry)
-                    f.seek(0)
-                    f.truncate()
-                    json.dump(data, f, indent=4)
+            get_search_log().write(log_entry)
 
             return (topic, response)
 
@@ -166,6 +180,396 @@ def source_harvester(state: AgentState):
     return {"retrieved_facts": all_facts}
 
 
+# Bump these when the corresponding prompt changes so cached content is regenerated.
+OUTLINE_PROMPT_VERSION = "outline-v1"
+LESSON_PROMPT_VERSION = "lesson-v1"
+TOOL_MODEL_NAME = "gemini-2.5-flash"
+MAIN_MODEL_NAME = "gemini-2.5-flash"
+
+#==========================================================================================
+# LLM GATEWAY: every Gemini call goes through one rate-limited, prioritised scheduler.
+#==========================================================================================
+
+PRIORITY_INTERACTIVE = 0  # learner/goal-setter is waiting on the reply
+PRIORITY_BACKGROUND = 1  # prefetch, pregeneration: may wait behind interactive calls
+
+_llm_priority: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "llm_priority", default=PRIORITY_INTERACTIVE
+)
+
+
+@contextmanager
+def llm_priority(priority: int):
+    """Run LLM calls made inside this block (and tasks it creates) at `priority`."""
+    token = _llm_priority.set(priority)
+    try:
+        yield
+    finally:
+        _llm_priority.reset(token)
+
+
+class LLMUnavailableError(RuntimeError):
+    """Raised without calling Gemini while the circuit breaker is open."""
+
+
+class TokenBucket:
+    """Refills `per_minute` units continuously; thread-safe."""
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)."""
+        with self._lock:
+            self._refill()
+            amount = min(amount, self.capacity)
+            return max(0.0, (amount - self._level) / self.rate)
+
+    def take(self, amount: float) -> None:
+        with self._lock:
+            self._refill()
+            self._level -= min(amount, self.capacity)
+
+
+def _estimate_tokens(prompt) -> int:
+    # ~4 characters per token, plus an allowance for the response.
+    return len(str(prompt)) // 4 + settings.llm_output_token_estimate
+
+
+_RETRYABLE_MARKERS = (
+    "429", "RESOURCE_EXHAUSTED", "500 Internal", "502", "503", "504", "UNAVAILABLE", "DEADLINE_EXCEEDED",
+)
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    """429 (quota/rate limit) and 5xx responses are worth retrying."""
+    for attr in ("status_code", "code", "status"):
+        code = getattr(exc, attr, None)
+        code = code() if callable(code) else code
+        if isinstance(code, int):
+            return code == 429 or 500 <= code < 600
+    text = str(exc)
+    return any(marker in text for marker in _RETRYABLE_MARKERS)
+
+
+class LLMGateway:
+    """
+    Token-bucket rate limiter (requests/min and tokens/min) with priority
+    classes, jittered exponential retry on 429/5xx and a circuit breaker.
+
+    Async callers queue by (priority, arrival) and are admitted by a pump task;
+    sync callers (CLI, LangGraph nodes) block on the same buckets.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_retries: int,
+        retry_base_seconds: float,
+        retry_max_seconds: float,
+        breaker_threshold: int,
+        breaker_cooldown_seconds: float,
+    ) -> None:
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown_seconds = breaker_cooldown_seconds
+
+        self._queue: list[tuple[int, int, asyncio.Future, int]] = []
+        self._seq = itertools.count()
+        self._wakeup: asyncio.Event | None = None
+        self._pump_task: asyncio.Task | None = None
+        self._sync_lock = threading.Lock()
+
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._half_open_trial = False
+
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+        self._waits: deque[float] = deque(maxlen=1000)
+        self._max_wait = 0.0
+
+    # ── Admission ─────────────────────────────────────────────────────
+
+    async def _acquire(self, priority: int, tokens: int) -> None:
+        loop = asyncio.get_running_loop()
+        if self._pump_task is None or self._pump_task.done() or self._pump_task.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._pump_task = loop.create_task(self._pump(), name="llm-gateway")
+        future = loop.create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), future, tokens))
+        self._wakeup.set()
+        started = time.monotonic()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if not future.done():
+                future.cancel()
+            raise
+        self._record_wait(time.monotonic() - started)
+
+    async def _pump(self) -> None:
+        while True:
+            while self._queue and self._queue[0][2].done():
+                heapq.heappop(self._queue)  # caller gave up
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            _, _, future, tokens = self._queue[0]
+            delay = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    # Re-check early if a higher-priority call arrives.
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._queue)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            future.set_result(None)
+
+    def _acquire_blocking(self, tokens: int) -> None:
+        started = time.monotonic()
+        with self._sync_lock:
+            while True:
+                delay = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                if delay <= 0:
+                    break
+                time.sleep(delay)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+        self._record_wait(time.monotonic() - started)
+
+    def _record_wait(self, seconds: float) -> None:
+        self._waits.append(seconds)
+        self._max_wait = max(self._max_wait, seconds)
+
+    # ── Circuit breaker ───────────────────────────────────────────────
+
+    def _check_breaker(self) -> bool:
+        """Raise while open; True if this call is the half-open probe."""
+        if self._opened_at is None:
+            return False
+        if time.monotonic() - self._opened_at < self.breaker_cooldown_seconds or self._half_open_trial:
+            self.rejected += 1
+            raise LLMUnavailableError("Gemini circuit breaker is open; try again shortly")
+        self._half_open_trial = True  # let one call through to probe
+        return True
+
+    @contextmanager
+    def _probe(self, probe: bool):
+        """Close out the half-open probe however the attempt ends."""
+        try:
+            yield
+        finally:
+            if probe and self._half_open_trial:
+                # Cancelled, closed early or a non-retryable error: neither
+                # _on_success nor _on_failure ran, so stay open another cooldown.
+                self.failures += 1
+                self._half_open_trial = False
+                self._opened_at = time.monotonic()
+
+    def _on_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._half_open_trial = False
+
+    def _on_failure(self) -> None:
+        self.failures += 1
+        self._failures += 1
+        self._half_open_trial = False
+        if self._failures >= self.breaker_threshold:
+            if self._opened_at is None:
+                logger.warning("LLM circuit breaker opened after %d failures", self._failures)
+            self._opened_at = time.monotonic()
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform(0, min(cap, base * 2^attempt)).
+        return random.uniform(0, min(self.retry_max_seconds, self.retry_base_seconds * 2**attempt))
+
+    # ── Calls ─────────────────────────────────────────────────────────
+
+    async def acall(self, fn, prompt, priority: int | None = None):
+        """Run `await fn()` under rate limiting, retry and the breaker."""
+        priority = _llm_priority.get() if priority is None else priority
+        tokens = _estimate_tokens(prompt)
+        with tracer.span("llm.call", priority=priority, tokens_estimate=tokens) as span:
+            queued = 0.0
+            for attempt in range(self.max_retries + 1):
+                with self._probe(self._check_breaker()):
+                    started = time.monotonic()
+                    await self._acquire(priority, tokens)
+                    queued += time.monotonic() - started
+                    span.set(attempts=attempt + 1, queue_wait_s=round(queued, 4))
+                    self.calls += 1
+                    try:
+                        result = await fn()
+                    except Exception as e:
+                        if not _is_retryable(e):
+                            raise
+                        self._on_failure()
+                        if attempt == self.max_retries:
+                            raise
+                        self.retries += 1
+                        await asyncio.sleep(self._backoff(attempt))
+                    else:
+                        self._on_success()
+                        return result
+
+    def call(self, fn, prompt):
+        """Blocking counterpart of acall for sync callers."""
+        tokens = _estimate_tokens(prompt)
+        with tracer.span("llm.call", tokens_estimate=tokens) as span:
+            for attempt in range(self.max_retries + 1):
+                with self._probe(self._check_breaker()):
+                    self._acquire_blocking(tokens)
+                    span.set(attempts=attempt + 1)
+                    self.calls += 1
+                    try:
+                        result = fn()
+                    except Exception as e:
+                        if not _is_retryable(e):
+                            raise
+                        self._on_failure()
+                        if attempt == self.max_retries:
+                            raise
+                        self.retries += 1
+                        time.sleep(self._backoff(attempt))
+                    else:
+                        self._on_success()
+                        return result
+
+    def stream(self, fn, prompt):
+        """Gate a streaming call; retries only if it fails before the first chunk."""
+        tokens = _estimate_tokens(prompt)
+        for attempt in range(self.max_retries + 1):
+            with self._probe(self._check_breaker()):
+                self._acquire_blocking(tokens)
+                self.calls += 1
+                started = False
+                try:
+                    for chunk in fn():
+                        if not started:
+                            # Gemini answered; a consumer closing early later is not a failure.
+                            started = True
+                            self._on_success()
+                        yield chunk
+                except Exception as e:
+                    if started or not _is_retryable(e):
+                        raise
+                    self._on_failure()
+                    if attempt == self.max_retries:
+                        raise
+                    self.retries += 1
+                    time.sleep(self._backoff(attempt))
+                else:
+                    self._on_success()
+                    return
+
+    # ── Metrics ───────────────────────────────────────────────────────
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits) or [0.0]
+        depth = {"interactive": 0, "background": 0}
+        for priority, _, future, _ in self._queue:
+            if not future.done():
+                depth["interactive" if priority == PRIORITY_INTERACTIVE else "background"] += 1
+        return {
+            "queue_depth": depth,
+            "wait_p50_s": waits[len(waits) // 2],
+            "wait_p95_s": waits[max(int(len(waits) * 0.95) - 1, 0)],
+            "wait_max_s": self._max_wait,
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "breaker": "open" if self._opened_at is not None else "closed",
+        }
+
+    def render_metrics(self) -> str:
+        """stats() in Prometheus text exposition format, appended to /metrics."""
+        stats = self.stats()
+        lines = [
+            "# HELP learnado_llm_queue_depth LLM calls waiting for the gateway, by priority class.",
+            "# TYPE learnado_llm_queue_depth gauge",
+        ]
+        for priority, depth in stats["queue_depth"].items():
+            lines.append(f'learnado_llm_queue_depth{{priority="{priority}"}} {depth}')
+        lines += [
+            "# HELP learnado_llm_wait_seconds Time LLM calls spent queued (recent calls).",
+            "# TYPE learnado_llm_wait_seconds gauge",
+            f'learnado_llm_wait_seconds{{quantile="0.5"}} {stats["wait_p50_s"]}',
+            f'learnado_llm_wait_seconds{{quantile="0.95"}} {stats["wait_p95_s"]}',
+            f'learnado_llm_wait_seconds{{quantile="1"}} {stats["wait_max_s"]}',
+        ]
+        for name, help_text in (
+            ("calls", "LLM calls made."),
+            ("retries", "LLM calls retried after a retryable error."),
+            ("failures", "LLM calls that failed after retries."),
+            ("rejected", "LLM calls rejected while the circuit breaker was open."),
+        ):
+            lines += [
+                f"# HELP learnado_llm_{name}_total {help_text}",
+                f"# TYPE learnado_llm_{name}_total counter",
+                f"learnado_llm_{name}_total {stats[name]}",
+            ]
+        lines += [
+            "# HELP learnado_llm_breaker_open 1 while the LLM circuit breaker is open.",
+            "# TYPE learnado_llm_breaker_open gauge",
+            f"learnado_llm_breaker_open {int(stats['breaker'] == 'open')}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+class GatedChatModel:
+    """Wraps a chat model so invoke/ainvoke/stream go through the LLM gateway."""
+
+    def __init__(self, model, gateway: LLMGateway) -> None:
+        self.model = model
+        self.gateway = gateway
+
+    def invoke(self, prompt, *args, **kwargs):
+        return self.gateway.call(lambda: self.model.invoke(prompt, *args, **kwargs), prompt)
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        return await self.gateway.acall(lambda: self.model.ainvoke(prompt, *args, **kwargs), prompt)
+
+    def stream(self, prompt, *args, **kwargs):
+        return self.gateway.stream(lambda: self.model.stream(prompt, *args, **kwargs), prompt)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+llm_gateway = LLMGateway(
+    requests_per_minute=settings.llm_requests_per_minute,
+    tokens_per_minute=settings.llm_tokens_per_minute,
+    max_retries=settings.llm_max_retries,
+    retry_base_seconds=settings.llm_retry_base_seconds,
+    retry_max_seconds=settings.llm_retry_max_seconds,
+    breaker_threshold=settings.llm_breaker_threshold,
+    breaker_cooldown_seconds=settings.llm_breaker_cooldown_seconds,
+)
+
 # Lazy initialization of LLMs
 _tool_llm = None
 _main_llm = None
@@ -176,7 +580,11 @@ def get_tool_llm():
     if _tool_llm is None:
         api_key = _get_gemini_api_key()
         # 2026 recommendation: Gemini 2.5 Flash for low-latency/high-volume tasks.
-        _tool_llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=api_key)
+        # max_retries=1: the gateway owns retry/backoff.
+        _tool_llm = GatedChatModel(
+            ChatGoogleGenerativeAI(model=TOOL_MODEL_NAME, google_api_key=api_key, max_retries=1),
+            llm_gateway,
+        )
     return _tool_llm
 
 
@@ -185,7 +593,10 @@ def get_main_llm():
     global _main_llm
     if _main_llm is None:
         api_key = _get_gemini_api_key()
-        _main_llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=api_key)
+        _main_llm = GatedChatModel(
+            ChatGoogleGenerativeAI(model=MAIN_MODEL_NAME, google_api_key=api_key, max_retries=1),
+            llm_gateway,
+        )
     return _main_llm
 
 
@@ -193,6 +604,16 @@ def generate_outline_from_topic(topic: str) -> list[dict]:
     """
     Callable by the webhook bridge. Returns outline as list of dicts with title/description.
     """
+    try:
+        outline = generate_outline_or_none(topic)
+    except Exception:
+        outline = None
+    # Fallback outline if Gemini is rate-limited / misconfigured.
+    return outline or fallback_outline(topic)
+
+
+def generate_outline_or_none(topic: str) -> list[dict] | None:
+    """Like generate_outline_from_topic, but returns None instead of the canned fallback."""
     initial_state: AgentState = {
         "user_question": topic,
         "outline": None,
@@ -203,17 +624,16 @@ def generate_outline_from_topic(topic: str) -> list[dict]:
         "current_lesson": None,
         "error": None,
     }
-    try:
-        result = outline_generator(initial_state)
-        if result.get("error"):
-            raise RuntimeError(result["error"])
-        outline_strings = result.get("outline") or []
-        if outline_strings:
-            return [{"title": t, "description": ""} for t in outline_strings]
-    except Exception:
-        # Fallback outline if Gemini is rate-limited / misconfigured.
-        pass
+    result = outline_generator(initial_state)
+    if result.get("error"):
+        raise RuntimeError(result["error"])
+    outline_strings = result.get("outline") or []
+    if not outline_strings:
+        return None
+    return [{"title": t, "description": ""} for t in outline_strings]
 
+
+def fallback_outline(topic: str) -> list[dict]:
     base = topic.strip() or "the topic"
     fallback = [
         f"Introduction to {base}",
@@ -245,17 +665,7 @@ def lesson_synthesizer(state: AgentState):
     # Get the current topic
     current_topic = outline[current_index]
     topic_facts = retrieved_facts.get(current_topic, {})
-
-    # Extract source URLs and scores from Tavily results
-    sources = []
-    if isinstance(topic_facts, dict) and "results" in topic_facts:
-        for result in topic_facts["results"]:
-            if "url" in result:
-                sources.append({
-                    "title": result.get("title", "Unknown"),
-                    "url": result["url"],
-                    "score": result.get("score", 0.0)  # Relevance score (0.0-1.0)
-                })
+    sources = _lesson_sources(topic_facts)
 
     prompt = f"""You are a helpful teacher. Your task is to write ONE engaging micro-learning lesson.
 
@@ -320,6 +730,151 @@ Generate the lesson now:"""
         return {"error": f"Error synthesizing lesson: {str(e)}"}
 
 
+def _lesson_sources(topic_facts) -> list[dict]:
+    """Extract source URLs and scores from Tavily results."""
+    sources = []
+    if isinstance(topic_facts, dict) and "results" in topic_facts:
+        for result in topic_facts["results"]:
+            if "url" in result:
+                sources.append({
+                    "title": result.get("title", "Unknown"),
+                    "url": result["url"],
+                    "score": result.get("score", 0.0)  # Relevance score (0.0-1.0)
+                })
+    return sources
+
+
+#================================================================================================================
+# STREAMING LESSON SYNTHESIS
+#================================================================================================================
+
+# The streamed lesson is plain markdown followed by this marker line and a JSON
+# trailer, so the body can be shown as it arrives and parsed metadata comes last.
+LESSON_TRAILER_MARKER = "<<<LESSON_META>>>"
+
+
+def _streaming_lesson_prompt(current_topic: str, topic_facts) -> str:
+    return f"""You are a helpful teacher. Your task is to write ONE engaging micro-learning lesson.
+
+Topic: {current_topic}
+
+Research material for this topic:
+{json.dumps(topic_facts, indent=2)}
+
+Your task:
+1. Write 2-3 paragraphs explaining this topic clearly
+2. Use ONLY the provided research material
+3. Break down difficult technical terms
+4. Make it digestible in 2-3 minutes
+5. Include inline citations (e.g., "According to [Source Name]..." or "As noted by [Source]...")
+6. Keep the tone engaging and educational
+
+Output format:
+- Start directly with the lesson text in markdown (no title heading, no JSON, no code fences).
+- After the lesson, output a line containing exactly {LESSON_TRAILER_MARKER}
+- Then a single-line JSON object: {{"title": "Lesson title based on the topic", "sources": ["url of each source you cited"]}}
+
+Generate the lesson now:"""
+
+
+class LessonStream:
+    """
+    Streaming counterpart of lesson_synthesizer.
+
+    Iterating yields lesson body text as it arrives (the trailer is held back).
+    Once exhausted, `result` holds the same state update lesson_synthesizer
+    returns, and `first_token_s` / `total_s` the time-to-first-token and total
+    generation time in seconds.
+    """
+
+    def __init__(self, state: AgentState) -> None:
+        self.state = state
+        self.result: dict | None = None
+        self.first_token_s: float | None = None
+        self.total_s: float | None = None
+        self.chunks = 0
+
+    def __iter__(self):
+        outline = self.state.get("outline")
+        retrieved_facts = self.state.get("retrieved_facts")
+        current_index: int = self.state.get("current_lesson_index") or 0
+        synthesized_lessons: list[dict] = self.state.get("synthesized_lessons") or []
+
+        if not outline or not retrieved_facts:
+            self.result = {"error": "Missing outline or retrieved facts for synthesis"}
+            return
+        if current_index >= len(outline):
+            self.result = {"current_lesson": None}
+            return
+
+        current_topic = outline[current_index]
+        topic_facts = retrieved_facts.get(current_topic, {})
+        prompt = _streaming_lesson_prompt(current_topic, topic_facts)
+
+        started = time.perf_counter()
+        text = ""
+        emitted = 0
+        try:
+            for chunk in get_tool_llm().stream(prompt):
+                raw = chunk.content
+                delta = raw if isinstance(raw, str) else "".join(
+                    part.get("text", "") if isinstance(part, dict) else str(part) for part in raw
+                )
+                if not delta:
+                    continue
+                if self.first_token_s is None:
+                    self.first_token_s = time.perf_counter() - started
+                self.chunks += 1
+                text += delta
+
+                # Emit everything that can't be the start of the trailer marker.
+                marker_at = text.find(LESSON_TRAILER_MARKER)
+                safe_end = marker_at if marker_at != -1 else len(text) - len(LESSON_TRAILER_MARKER) + 1
+                if safe_end > emitted:
+                    yield text[emitted:safe_end]
+                    emitted = safe_end
+        except Exception as e:
+            self.total_s = time.perf_counter() - started
+            self.result = {"error": f"Error synthesizing lesson: {str(e)}"}
+            return
+
+        body, _, trailer = text.partition(LESSON_TRAILER_MARKER)
+        if len(body) > emitted:
+            yield body[emitted:]
+        self.total_s = time.perf_counter() - started
+
+        meta = _parse_lesson_trailer(trailer)
+        cited = set(meta.get("sources") or [])
+        sources = _lesson_sources(topic_facts)
+        for source in sources:
+            source["cited"] = source["url"] in cited
+
+        lesson = {
+            "title": meta.get("title") or current_topic,
+            "content": body.strip(),
+            "sources": sources,
+            "topic": current_topic,
+        }
+        synthesized_lessons.append(lesson)
+        self.result = {
+            "current_lesson": lesson,
+            "synthesized_lessons": synthesized_lessons,
+            "current_lesson_index": current_index + 1,
+        }
+
+
+def _parse_lesson_trailer(trailer: str) -> dict:
+    """Parse the JSON trailer; a missing or malformed trailer yields {}."""
+    trailer = trailer.strip().strip("`").strip()
+    if trailer.startswith("json"):
+        trailer = trailer[4:].strip()
+    try:
+        meta = json.loads(trailer)
+    except json.JSONDecodeError:
+        return {}
+    return meta if isinstance(meta, dict) else {}
+
+
 #================================================================================================================
 # LEARNADO GRAPH: Interactive Outline-Search-Synthesize Pipeline
 #================================================================================================================
@@ -431,22 +986,28 @@ def synthesize_single_lesson(topic: str, lesson_title: str, description: str) ->
     Callable by agent_bridge. Runs Tavily search + Gemini synthesis
     for a single lesson and returns the lesson content as a plain string.
     """
-    tavily_api_key = os.getenv("TAVILY_API_KEY") or ""
     try:
-        from app.config import settings as _s
-        tavily_api_key = _s.tavily_api_key or tavily_api_key
-    except Exception:
-        pass
+        return synthesize_lesson_text(topic, lesson_title, description)
+    except Exception as e:
+        return lesson_placeholder(topic, lesson_title, e)
+
 
+def synthesize_lesson_text(topic: str, lesson_title: str, description: str) -> str:
+    """Like synthesize_single_lesson, but raises instead of returning placeholder text."""
     query = f"{topic} {lesson_title}"
     topic_facts: dict = {}
     try:
-        client = TavilyClient(tavily_api_key)
-        topic_facts = client.search(query=query, search_depth="advanced", max_results=5)
+        topic_facts = cached_search(query=query, search_depth="advanced", max_results=5)
     except Exception as e:
         topic_facts = {"error": str(e)}
 
-    prompt = f"""You are a helpful teacher writing a short WhatsApp-friendly micro-lesson.
+    llm = get_tool_llm()
+    response = llm.invoke(_single_lesson_prompt(topic, lesson_title, description, topic_facts))
+    return response_text(response)
+
+
+def _single_lesson_prompt(topic: str, lesson_title: str, description: str, topic_facts: dict) -> str:
+    return f"""You are a helpful teacher writing a short WhatsApp-friendly micro-lesson.
 
 Topic: {topic}
 Lesson: {lesson_title}
@@ -464,18 +1025,50 @@ Instructions:
 
 Return ONLY the lesson text — no JSON, no markdown headers, no extra formatting."""
 
+
+def lesson_placeholder(topic: str, lesson_title: str, error: Exception) -> str:
+    return (
+        f"*{lesson_title}*\n\n"
+        f"This lesson covers {lesson_title} as part of {topic}.\n\n"
+        f"_(Full content unavailable right now: {error})_\n\n"
+        "Quick check: What do you already know about this topic?"
+    )
+
+
+#==========================================================================================
+# ASYNC API: used by agent_bridge so the webhook never parks a thread on an HTTP call.
+#==========================================================================================
+
+async def agenerate_outline_or_none(topic: str) -> list[dict] | None:
+    """Async counterpart of generate_outline_or_none (LLM ainvoke, no executor)."""
+    response = await get_tool_llm().ainvoke(_outline_prompt(topic))
+    outline = _parse_outline(response_text(response))
+    return [{"title": t, "description": ""} for t in outline]
+
+
+async def aresearch_lesson(topic: str, lesson_title: str) -> dict:
+    """Tavily research for one lesson (same query synthesize uses, so it shares the search cache)."""
+    query = f"{topic} {lesson_title}"
     try:
-        llm = get_tool_llm()
-        response = llm.invoke(prompt)
-        raw = response.content
-        return (raw if isinstance(raw, str) else str(raw)).strip()
+        return await acached_search(query=query, search_depth="advanced", max_results=5)
     except Exception as e:
-        return (
-            f"*{lesson_title}*\n\n"
-            f"This lesson covers {lesson_title} as part of {topic}.\n\n"
-            f"_(Full content unavailable right now: {e})_\n\n"
-            "Quick check: What do you already know about this topic?"
-        )
+        return {"error": str(e)}
+
+
+async def asynthesize_lesson_text(
+    topic: str, lesson_title: str, description: str, topic_facts: dict | None = None
+) -> str:
+    """
+    Async counterpart of synthesize_lesson_text (async Tavily + LLM ainvoke).
+    Pass `topic_facts` from earlier research to skip the search.
+    """
+    if topic_facts is None:
+        topic_facts = await aresearch_lesson(topic, lesson_title)
+
+    response = await get_tool_llm().ainvoke(
+        _single_lesson_prompt(topic, lesson_title, description, topic_facts)
+    )
+    return response_text(response)
 
 
 if __name__ == "__main__":
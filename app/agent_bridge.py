@@ -1,75 +1,126 @@
 """
 Thin async bridge between the WhatsApp webhook and the LangGraph agent.
-All sync agent calls run in a thread executor so they don't block FastAPI.
+Uses the agent's async-native API (LLM ainvoke + async Tavily), so no thread
+is parked on an in-flight HTTP call.
+Outlines and lessons are served from the content cache when possible.
 """
 
-import asyncio
-
-from app.agent import generate_outline_from_topic, synthesize_single_lesson
-
-
+from app.agent import (
+    LESSON_PROMPT_VERSION,
+    OUTLINE_PROMPT_VERSION,
+    TOOL_MODEL_NAME,
+    agenerate_outline_or_none,
+    aresearch_lesson,
+    asynthesize_lesson_text,
+    fallback_outline,
+    get_tool_llm,
+    lesson_placeholder,
+    response_text,
+)
+from app.confusion import confusion_scorer
+from app.content_cache import content_cache, make_key
+from app.tracing import current_span, traced
+
+
+@traced("agent_bridge.get_outline")
 async def get_outline(topic: str) -> list[dict]:
     """Returns [{"title": "...", "description": ""}, ...]"""
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, generate_outline_from_topic, topic)
+    key = make_key("outline", topic, "", OUTLINE_PROMPT_VERSION, TOOL_MODEL_NAME)
+    cached = await content_cache.get(key)
+    current_span().set(cache_hit=cached is not None)
+    if cached is not None:
+        return cached
 
+    try:
+        outline = await agenerate_outline_or_none(topic)
+    except Exception:
+        outline = None
+    if not outline:
+        # Canned fallback (Gemini rate-limited / misconfigured) is never cached.
+        return fallback_outline(topic)
 
-async def get_lesson_content(topic: str, lesson_title: str, description: str) -> str:
-    """Generate full lesson content for one lesson node. Returns plain text."""
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(
-        None, synthesize_single_lesson, topic, lesson_title, description
-    )
+    await content_cache.put(key, "outline", outline)
+    return outline
 
 
+@traced("agent_bridge.get_lesson_content")
+async def get_lesson_content(
+    topic: str, lesson_title: str, description: str, research: dict | None = None
+) -> str:
+    """
+    Generate full lesson content for one lesson node. Returns plain text.
+    `research` is stored Tavily output for the lesson (eager research mode); when
+    given, only the LLM call runs.
+    """
+    try:
+        return await generate_lesson_content(topic, lesson_title, description, research)
+    except Exception as e:
+        return lesson_placeholder(topic, lesson_title, e)
+
+
+@traced("agent_bridge.generate_lesson_content")
+async def generate_lesson_content(
+    topic: str, lesson_title: str, description: str, research: dict | None = None
+) -> str:
+    """Like get_lesson_content, but raises instead of returning placeholder text."""
+    title_key = f"{lesson_title} {description}" if description else lesson_title
+    key = make_key("lesson", topic, title_key, LESSON_PROMPT_VERSION, TOOL_MODEL_NAME)
+    cached = await content_cache.get(key)
+    current_span().set(cache_hit=cached is not None)
+    if cached is not None:
+        return cached["content"]
+
+    if research is None:
+        research = await aresearch_lesson(topic, lesson_title)
+    content = await asynthesize_lesson_text(topic, lesson_title, description, research)
+    # A lesson written without research (Tavily failed) is served this once but
+    # not cached under the shared topic key for every later learner.
+    if "error" not in research:
+        await content_cache.put(key, "lesson", {"content": content})
+    return content
+
+
+@traced("agent_bridge.research_lesson")
+async def research_lesson(topic: str, lesson_title: str) -> dict:
+    """Tavily research for one lesson; errors come back as {"error": ...}."""
+    return await aresearch_lesson(topic, lesson_title)
+
+
+@traced("agent_bridge.score_confusion")
 async def score_confusion(lesson_content: str, learner_response: str) -> float:
     """
     Returns 0.0 (fully understood) → 1.0 (completely confused).
-    Uses Gemini Flash — no Tavily needed.
+    Obvious replies are scored locally; the rest go to Gemini Flash in
+    micro-batches (see app.confusion).
     """
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(
-        None, _score_confusion_sync, lesson_content, learner_response
-    )
-
-
-async def simplify_lesson(content: str) -> str:
-    """Rewrite lesson content in simpler, shorter language."""
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, _simplify_lesson_sync, content)
+    return await confusion_scorer.score(lesson_content, learner_response)
 
 
-def _score_confusion_sync(lesson_content: str, learner_response: str) -> float:
-    from app.agent import get_tool_llm
+@traced("agent_bridge.asimplify_lesson_text")
+async def asimplify_lesson_text(content: str, level: int = 1) -> str:
+    """Rewrite lesson content in simpler, shorter language (level 2 = simplest). Raises on failure."""
+    response = await get_tool_llm().ainvoke(_simplify_prompt(content, level))
+    return response_text(response)
 
-    prompt = f"""You are evaluating how well a learner understood a lesson.
 
-Lesson content:
-{lesson_content[:1500]}
+# Bump when a simplify prompt changes so stored lesson variants are regenerated.
+SIMPLIFY_PROMPT_VERSION = "simplify-v1"
+MAX_SIMPLIFY_LEVEL = 2
 
-Learner's response:
-{learner_response[:500]}
 
-Score the learner's confusion level from 0.0 to 1.0:
-- 0.0 = fully understood, clear correct answer
-- 0.3 = mostly understood, minor gaps
-- 0.6 = partially understood, significant confusion
-- 1.0 = completely lost, wrong or no answer
+def _simplify_prompt(content: str, level: int = 1) -> str:
+    if level >= 2:
+        return f"""Rewrite this lesson for someone who found even a simple explanation confusing.
+- Explain it the way you would to a 10-year-old
+- At most 5 very short sentences
+- Use one everyday comparison (shopping, cooking, family)
+- No jargon, no numbers unless essential
+- Keep it under 400 characters
+- End with one yes/no question to check understanding (e.g. "Quick check: ...")
 
-Reply with ONLY a single float like 0.2 or 0.7. Nothing else."""
-
-    try:
-        llm = get_tool_llm()
-        response = llm.invoke(prompt)
-        return float(response.content.strip())
-    except (ValueError, Exception):
-        return 0.5
-
-
-def _simplify_lesson_sync(content: str) -> str:
-    from app.agent import get_tool_llm
-
-    prompt = f"""Rewrite this lesson in much simpler language for WhatsApp.
+Original lesson:
+{content[:1500]}"""
+    return f"""Rewrite this lesson in much simpler language for WhatsApp.
 - Use very short sentences
 - Avoid jargon completely
 - Use a real-life everyday example
@@ -79,9 +130,3 @@ def _simplify_lesson_sync(content: str) -> str:
 Original lesson:
 {content[:1500]}"""
 
-    try:
-        llm = get_tool_llm()
-        response = llm.invoke(prompt)
-        return response.content.strip()
-    except Exception as e:
-        return f"{content}\n\n_(Simplified version unavailable: {e})_"
@@ -15,6 +15,14 @@ class Settings(BaseSettings):
 
     # Tavily
     tavily_api_key: str = ""
+    # Search result cache; an empty path keeps the cache in memory only.
+    search_cache_path: str = "data/cache/tavily_search.sqlite3"
+    search_cache_ttl_hours: int = 24
+    # Web search log (JSON Lines, rotated by size)
+    search_log_path: str = "websearch_logs.jsonl"
+    search_log_max_bytes: int = 10 * 1024 * 1024
+    search_log_backups: int = 5
+    search_log_gzip: bool = True
 
     # PostgreSQL
     postgres_host: str = "localhost"
@@ -30,6 +38,99 @@ class Settings(BaseSettings):
     twilio_account_sid: str = ""
     twilio_auth_token: str = ""
     twilio_whatsapp_from: str = "whatsapp:+14155238886"
+    # Point at app.fake_twilio (e.g. http://127.0.0.1:8099) to send offline.
+    twilio_api_base_url: str = "https://api.twilio.com"
+    twilio_max_connections: int = 20
+    twilio_per_destination_concurrency: int = 1
+    twilio_send_timeout: float = 15.0
+
+    # Inbound message queue: "memory" (single process) or "postgres" (multi-process)
+    inbound_queue_backend: str = "memory"
+    inbound_workers: int = 8
+    inbound_queue_poll_interval: float = 0.5
+    inbound_queue_lease_seconds: float = 300.0
+    # Routing attempts per message before it is failed with an apology reply
+    inbound_max_attempts: int = 3
+    # Recently seen Twilio MessageSids kept in memory for retry dedup
+    dedup_recent_ids: int = 10_000
+
+    # Goal-setter notification outbox
+    notification_poll_interval: float = 1.0
+    notification_coalesce_seconds: float = 5.0
+
+    # Lesson prefetch (background synthesis of upcoming lessons)
+    lesson_prefetch_ahead: int = 1
+    lesson_prefetch_workers: int = 4
+    # Max concurrent background pre-generations of simplified lesson variants
+    lesson_variant_workers: int = 2
+
+    # Per-process wa_session_state cache, invalidated via Postgres LISTEN/NOTIFY
+    session_state_cache: bool = True
+    session_state_cache_entries: int = 50_000
+    session_state_cache_ttl_seconds: float = 300.0
+
+    # Eager research: run every lesson's Tavily search as soon as the outline exists
+    eager_research: bool = False
+    eager_research_workers: int = 5
+
+    # Confusion scoring: local heuristics first, then micro-batched LLM calls
+    confusion_heuristics: bool = True
+    confusion_batch_window_ms: int = 150
+    confusion_batch_max: int = 8
+
+    # LLM gateway (app.agent): shared Gemini rate limits, retry and circuit breaker
+    llm_requests_per_minute: int = 300
+    llm_tokens_per_minute: int = 1_000_000
+    llm_output_token_estimate: int = 512
+    llm_max_retries: int = 4
+    llm_retry_base_seconds: float = 1.0
+    llm_retry_max_seconds: float = 30.0
+    llm_breaker_threshold: int = 5
+    llm_breaker_cooldown_seconds: float = 30.0
+
+    # Tracing (app.tracing): "none", "memory", "jsonl" or "otlp"; /metrics works with any
+    tracing_exporter: str = "none"
+    tracing_jsonl_path: str = "data/traces.jsonl"
+    tracing_otlp_endpoint: str = "http://localhost:4318/v1/traces"
+    tracing_service_name: str = "learnado"
+
+    # PDF extraction (app.pdf_extract): page ranges fanned out over a process pool
+    pdf_extract_workers: int = 0  # 0 = one per CPU
+    pdf_pages_per_task: int = 8
+    # Pages with fewer characters than this (and at least one image) are OCR'd
+    pdf_ocr_min_chars: int = 16
+    pdf_ocr_dpi: int = 150
+    pdf_ocr_language: str = "eng"
+
+    # Extraction store for uploads (PDF pages, OCR, transcripts) keyed by SHA-256:
+    # "disk" (files under extraction_store_dir) or "postgres" (document_extractions)
+    extraction_store_backend: str = "disk"
+    extraction_store_dir: str = "data/extractions"
+    extraction_store_max_mb: int = 1024
+
+    # PDF Q&A retrieval (app.retrieval): BM25 over overlapping chunks, persisted per document
+    pdf_query_mode: str = "retrieval"  # or "full" to send the whole document
+    retrieval_index_dir: str = "data/indexes"
+    retrieval_chunk_words: int = 220
+    retrieval_overlap_words: int = 40
+    retrieval_top_k: int = 6
+
+    # Upload ingestion (app.uploads): streamed to disk, processed on a bounded worker pool
+    upload_max_mb: int = 100
+    upload_chunk_bytes: int = 1024 * 1024
+    upload_workers: int = 4
+
+    # Background processing jobs (app.jobs): claimed from processing_jobs, results kept on disk
+    job_workers: int = 2
+    job_poll_interval: float = 1.0
+    job_lease_seconds: int = 3600
+    job_results_dir: str = "data/job_results"
+    job_long_poll_max_seconds: int = 30
+
+    # Content cache for synthesized outlines/lessons
+    content_cache_ttl_hours: int = 24 * 7
+    content_cache_memory_entries: int = 512
+    content_cache_max_rows: int = 50_000
 
     @computed_field  # type: ignore[prop-decorator]
     @property
@@ -0,0 +1,260 @@
+"""
+Tiered confusion scoring for learner replies.
+
+Stage 1 is a local heuristic: confusion phrases, reply length, lexical overlap
+with the lesson and coverage of its keywords. It only answers clear-cut
+replies ("idk" with nothing else said, a long on-topic paraphrase) and returns
+None otherwise.
+Stage 2 sends the ambiguous rest to Gemini; replies arriving within a short
+window are micro-batched into one multi-item prompt.
+
+Scores are 0.0 (fully understood) → 1.0 (completely confused).
+"""
+
+import asyncio
+import json
+import logging
+import re
+from collections import Counter
+
+from app.agent import get_tool_llm
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Heuristic thresholds. Deliberately conservative: anything in between goes to the LLM.
+CONFUSED_SCORE = 0.95
+UNDERSTOOD_SCORE = 0.1
+CONFUSED_MAX_WORDS = 10
+UNDERSTOOD_MIN_CONTENT_WORDS = 12
+UNDERSTOOD_MIN_OVERLAP = 0.5
+UNDERSTOOD_MIN_COVERAGE = 0.25
+LESSON_KEYWORDS = 15
+
+CONFUSION_PHRASES = (
+    "idk",
+    "i dont know",
+    "dont know",
+    "no idea",
+    "not sure",
+    "no clue",
+    "confused",
+    "confusing",
+    "dont understand",
+    "didnt understand",
+    "didnt get",
+    "dont get it",
+    "im lost",
+    "what does that mean",
+    "explain again",
+    "huh",
+    "samajh nahi",
+)
+
+# Words that can surround a confusion phrase without adding an answer ("sorry, im confused").
+_FILLER = frozenset("sorry still really please pls plz okay hmm umm yet".split())
+
+_STOPWORDS = frozenset(
+    """
+    a about above after again all also am an and any are as at be because been before being
+    between both but by can could did do does doing down during each few for from further had
+    has have having he her here hers him his how i if in into is it its itself just like me
+    more most my no nor not now of off on once only or other our out over own same she should
+    so some such than that the their them then there these they this those through to too
+    under until up very was we were what when where which while who whom why will with would
+    you your yours yourself quick check
+    """.split()
+)
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _words(text: str) -> list[str]:
+    return _WORD.findall(text.lower().replace("'", "").replace("’", ""))
+
+
+def _stem(word: str) -> str:
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[: -len(suffix)]
+    return word
+
+
+def _content_words(words: list[str]) -> list[str]:
+    return [_stem(w) for w in words if w not in _STOPWORDS and len(w) > 2]
+
+
+def _only_confusion(normalized: str) -> bool:
+    """True if the reply is a confusion phrase and nothing else ("not sure", "idk sorry")."""
+    rest, found = normalized, False
+    for phrase in CONFUSION_PHRASES:
+        rest, n = re.subn(rf"\b{phrase}\b", " ", rest)
+        found = found or n > 0
+    return found and not [w for w in _content_words(rest.split()) if w not in _FILLER]
+
+
+def heuristic_score(lesson_content: str, learner_response: str) -> float | None:
+    """Score obvious replies locally; None means "ambiguous, ask the LLM"."""
+    words = _words(learner_response)
+    normalized = " ".join(words)
+    if not words:
+        return CONFUSED_SCORE
+
+    if len(words) <= CONFUSED_MAX_WORDS and _only_confusion(normalized):
+        return CONFUSED_SCORE
+
+    reply_terms = _content_words(words)
+    if len(reply_terms) < UNDERSTOOD_MIN_CONTENT_WORDS:
+        return None
+
+    lesson_terms = _content_words(_words(lesson_content))
+    if not lesson_terms:
+        return None
+    lesson_vocab = set(lesson_terms)
+    keywords = {term for term, _ in Counter(lesson_terms).most_common(LESSON_KEYWORDS)}
+
+    overlap = sum(1 for term in reply_terms if term in lesson_vocab) / len(reply_terms)
+    coverage = len(keywords.intersection(reply_terms)) / len(keywords)
+    if overlap >= UNDERSTOOD_MIN_OVERLAP and coverage >= UNDERSTOOD_MIN_COVERAGE:
+        return UNDERSTOOD_SCORE
+    return None
+
+
+def _confusion_prompt(lesson_content: str, learner_response: str) -> str:
+    return f"""You are evaluating how well a learner understood a lesson.
+
+Lesson content:
+{lesson_content[:1500]}
+
+Learner's response:
+{learner_response[:500]}
+
+Score the learner's confusion level from 0.0 to 1.0:
+- 0.0 = fully understood, clear correct answer
+- 0.3 = mostly understood, minor gaps
+- 0.6 = partially understood, significant confusion
+- 1.0 = completely lost, wrong or no answer
+
+Reply with ONLY a single float like 0.2 or 0.7. Nothing else."""
+
+
+def _batch_confusion_prompt(items: list[tuple[str, str]]) -> str:
+    blocks = "\n\n".join(
+        f"### Item {i}\nLesson content:\n{lesson[:1500]}\n\nLearner's response:\n{reply[:500]}"
+        for i, (lesson, reply) in enumerate(items, 1)
+    )
+    return f"""You are evaluating how well learners understood their lessons.
+Each item below is an independent lesson and one learner's response to it.
+
+{blocks}
+
+Score each learner's confusion level from 0.0 to 1.0:
+- 0.0 = fully understood, clear correct answer
+- 0.3 = mostly understood, minor gaps
+- 0.6 = partially understood, significant confusion
+- 1.0 = completely lost, wrong or no answer
+
+Reply with ONLY a JSON array of {len(items)} floats, one per item in order, like [0.2, 0.7]. Nothing else."""
+
+
+def _parse_scores(content: str, expected: int) -> list[float]:
+    """Parse a JSON array of floats (tolerating a code fence). Raises ValueError."""
+    content = content.strip()
+    if content.startswith("```"):
+        content = content.split("```")[1]
+        if content.startswith("json"):
+            content = content[4:]
+    scores = json.loads(content)
+    if not isinstance(scores, list) or len(scores) != expected:
+        raise ValueError(f"expected {expected} scores, got {content!r}")
+    return [min(max(float(s), 0.0), 1.0) for s in scores]
+
+
+class ConfusionScorer:
+    """Heuristic fast path plus a micro-batching LLM scorer."""
+
+    def __init__(
+        self, heuristics: bool, batch_window: float, max_batch: int, report_every: int = 100
+    ) -> None:
+        self.heuristics = heuristics
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.report_every = report_every
+        self._pending: list[tuple[str, str, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._batches: set[asyncio.Task] = set()
+        self.replies = 0
+        self.local = 0
+        self.llm_calls = 0
+
+    async def score(self, lesson_content: str, learner_response: str) -> float:
+        self.replies += 1
+        self._maybe_report()
+        if self.heuristics:
+            score = heuristic_score(lesson_content, learner_response)
+            if score is not None:
+                self.local += 1
+                return score
+
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        self._pending.append((lesson_content, learner_response, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.batch_window, self._flush)
+        return await future
+
+    def stats(self) -> dict:
+        return {
+            "replies": self.replies,
+            "scored_locally": self.local,
+            "llm_calls": self.llm_calls,
+            "avoided_llm_fraction": self.local / self.replies if self.replies else 0.0,
+        }
+
+    def _maybe_report(self) -> None:
+        if self.report_every and self.replies % self.report_every == 0:
+            stats = self.stats()
+            logger.info(
+                "Confusion scoring: %d replies, %.0f%% scored without an LLM call, %d LLM calls",
+                stats["replies"],
+                stats["avoided_llm_fraction"] * 100,
+                stats["llm_calls"],
+            )
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._score_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _score_batch(self, batch: list[tuple[str, str, asyncio.Future]]) -> None:
+        self.llm_calls += 1
+        try:
+            if len(batch) == 1:
+                lesson, reply, _ = batch[0]
+                response = await get_tool_llm().ainvoke(_confusion_prompt(lesson, reply))
+                scores = [min(max(float(response.content.strip()), 0.0), 1.0)]
+            else:
+                response = await get_tool_llm().ainvoke(
+                    _batch_confusion_prompt([(lesson, reply) for lesson, reply, _ in batch])
+                )
+                scores = _parse_scores(response.content, len(batch))
+        except Exception:
+            logger.exception("Confusion scoring failed for a batch of %d", len(batch))
+            scores = [0.5] * len(batch)
+        for (_, _, future), score in zip(batch, scores):
+            if not future.done():
+                future.set_result(score)
+
+
+confusion_scorer = ConfusionScorer(
+    heuristics=settings.confusion_heuristics,
+    batch_window=settings.confusion_batch_window_ms / 1000,
+    max_batch=settings.confusion_batch_max,
+)
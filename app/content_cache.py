@@ -0,0 +1,162 @@
+"""
+Content-addressed cache for synthesized outlines and lessons.
+
+Keys are a SHA-256 of the normalized (kind, topic, lesson title, prompt version,
+model name). Lookups hit an in-process LRU first, then the content_cache table.
+Entries expire after a TTL; the table is pruned to a maximum row count by
+least-recent access.
+"""
+
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import ContentCache
+
+logger = logging.getLogger(__name__)
+
+# Prune the table every N writes rather than on every insert.
+_PRUNE_EVERY = 100
+
+
+def normalize(text: str) -> str:
+    """Case-fold and collapse whitespace/punctuation so near-identical topics share a key."""
+    text = re.sub(r"[^\w\s]", " ", text.casefold())
+    return " ".join(text.split())
+
+
+def make_key(kind: str, topic: str, lesson_title: str, prompt_version: str, model: str) -> str:
+    parts = [kind, normalize(topic), normalize(lesson_title), prompt_version, model]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class ContentCacheStore:
+    """Two-level (memory LRU → Postgres) cache with TTL and size-based eviction."""
+
+    def __init__(self, ttl_seconds: float, memory_entries: int, max_rows: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self.max_rows = max_rows
+        # key -> (time.monotonic() deadline, payload)
+        self._lru: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._writes = 0
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Any | None:
+        entry = self._lru.get(key)
+        if entry is not None:
+            expires_at, payload = entry
+            if time.monotonic() < expires_at:
+                self._lru.move_to_end(key)
+                self.memory_hits += 1
+                return payload
+            del self._lru[key]
+
+        try:
+            row = await self._db_get(key)
+        except Exception:
+            logger.exception("Content cache lookup failed")
+            row = None
+
+        if row is None:
+            self.misses += 1
+            return None
+        payload, created_at = row
+        self.db_hits += 1
+        # The row's TTL runs from when it was written, not from this read.
+        age = (datetime.now(timezone.utc) - created_at).total_seconds()
+        self._remember(key, payload, age)
+        return payload
+
+    async def put(self, key: str, kind: str, payload: Any) -> None:
+        self._remember(key, payload)
+        try:
+            await self._db_put(key, kind, payload)
+        except Exception:
+            logger.exception("Content cache write failed")
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.db_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.db_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._lru),
+        }
+
+    def _remember(self, key: str, payload: Any, age: float = 0.0) -> None:
+        self._lru[key] = (time.monotonic() + self.ttl_seconds - age, payload)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.memory_entries:
+            self._lru.popitem(last=False)
+
+    async def _db_get(self, key: str) -> tuple[Any, datetime] | None:
+        """(payload, created_at) of an unexpired row, or None."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(ContentCache.payload, ContentCache.created_at).where(
+                    ContentCache.key == key,
+                    ContentCache.created_at >= cutoff,
+                )
+            )
+            row = result.one_or_none()
+            if row is not None:
+                await db.execute(
+                    update(ContentCache)
+                    .where(ContentCache.key == key)
+                    .values(
+                        hit_count=ContentCache.hit_count + 1,
+                        last_accessed_at=datetime.now(timezone.utc),
+                    )
+                )
+                await db.commit()
+            return (row.payload, row.created_at) if row is not None else None
+
+    async def _db_put(self, key: str, kind: str, payload: Any) -> None:
+        now = datetime.now(timezone.utc)
+        stmt = insert(ContentCache).values(
+            key=key, kind=kind, payload=payload, hit_count=0,
+            created_at=now, last_accessed_at=now,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ContentCache.key],
+            set_={"payload": payload, "created_at": now, "last_accessed_at": now},
+        )
+        async with AsyncSessionLocal() as db:
+            await db.execute(stmt)
+            self._writes += 1
+            if self._writes % _PRUNE_EVERY == 0:
+                await self._prune(db)
+            await db.commit()
+
+    async def _prune(self, db: AsyncSession) -> None:
+        """Drop expired rows and keep only the `max_rows` most recently accessed."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
+        await db.execute(delete(ContentCache).where(ContentCache.created_at < cutoff))
+        keep = (
+            select(ContentCache.key)
+            .order_by(ContentCache.last_accessed_at.desc())
+            .limit(self.max_rows)
+        )
+        await db.execute(delete(ContentCache).where(ContentCache.key.not_in(keep)))
+
+
+content_cache = ContentCacheStore(
+    ttl_seconds=settings.content_cache_ttl_hours * 3600,
+    memory_entries=settings.content_cache_memory_entries,
+    max_rows=settings.content_cache_max_rows,
+)
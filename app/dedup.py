@@ -0,0 +1,40 @@
+"""
+Idempotency for inbound Twilio messages, keyed on MessageSid.
+
+A bounded in-process map of recently seen MessageSids short-circuits webhook
+retries before any DB or LLM work. The unique index on wa_message_id
+(inbound_messages and messages) is the cross-process backstop.
+"""
+
+import threading
+from collections import OrderedDict
+
+from app.config import settings
+
+
+class RecentMessageIds:
+    """Bounded LRU of MessageSid → webhook outcome."""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._outcomes: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self.duplicates = 0
+
+    def get(self, message_id: str) -> dict | None:
+        with self._lock:
+            outcome = self._outcomes.get(message_id)
+            if outcome is not None:
+                self._outcomes.move_to_end(message_id)
+                self.duplicates += 1
+            return outcome
+
+    def remember(self, message_id: str, outcome: dict) -> None:
+        with self._lock:
+            self._outcomes[message_id] = outcome
+            self._outcomes.move_to_end(message_id)
+            while len(self._outcomes) > self.max_size:
+                self._outcomes.popitem(last=False)
+
+
+recent_message_ids = RecentMessageIds(max_size=settings.dedup_recent_ids)
@@ -0,0 +1,224 @@
+"""
+Extraction store for uploaded files, keyed by the SHA-256 of their bytes.
+
+Holds what is expensive to recompute: per-page PDF text (with an OCR flag),
+image OCR text and Whisper transcripts. A second question about the same file
+(whatever its filename) skips extraction entirely.
+
+Backends (EXTRACTION_STORE_BACKEND):
+- disk:     one JSON file per (hash, kind) under EXTRACTION_STORE_DIR
+- postgres: the document_extractions table (read per upload via Upload.extractions)
+
+Both evict least-recently-used entries once their total size exceeds
+EXTRACTION_STORE_MAX_MB.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import uuid
+from concurrent.futures import Executor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import delete, func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import DocumentExtraction
+
+logger = logging.getLogger(__name__)
+
+PDF_PAGES = "pdf_pages"
+IMAGE_OCR = "image_ocr"
+TRANSCRIPT = "transcript"
+
+# Prune the table every N writes rather than on every insert.
+_PRUNE_EVERY = 20
+
+
+def sha256_file(path: str | Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DiskExtractionBackend:
+    """JSON files under a directory; access time is tracked through mtime."""
+
+    def __init__(self, root: str, max_bytes: int) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._total: int | None = None
+
+    def _path(self, sha256: str, kind: str) -> Path:
+        return self.root / sha256[:2] / f"{sha256}.{kind}.json"
+
+    def get(self, sha256: str, kind: str) -> Any | None:
+        path = self._path(sha256, kind)
+        try:
+            with open(path, encoding="utf-8") as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return payload
+
+    def put(self, sha256: str, kind: str, payload: Any) -> None:
+        path = self._path(sha256, kind)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(payload).encode("utf-8")
+        # Unique per write, so concurrent puts of one (hash, kind) can't collide.
+        tmp = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        if self._total is None:
+            self._total = self._scan_total()
+        else:
+            self._total += len(data)
+        if self._total > self.max_bytes:
+            self._evict()
+
+    def _files(self) -> list[tuple[float, int, Path]]:
+        files = []
+        for path in self.root.glob("*/*.json"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+        return files
+
+    def _scan_total(self) -> int:
+        return sum(size for _, size, _ in self._files())
+
+    def _evict(self) -> None:
+        # Rescan: other processes may share the directory.
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        self._total = total
+
+
+class PostgresExtractionBackend:
+    """Rows in document_extractions; LRU by last_accessed_at, weighted by size_bytes."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._writes = 0
+
+    async def get(self, sha256: str, kind: str) -> Any | None:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(DocumentExtraction)
+                .where(DocumentExtraction.sha256 == sha256, DocumentExtraction.kind == kind)
+                .values(last_accessed_at=datetime.now(timezone.utc))
+                .returning(DocumentExtraction.payload)
+            )
+            payload = result.scalar_one_or_none()
+            await db.commit()
+            return payload
+
+    async def put(self, sha256: str, kind: str, payload: Any) -> None:
+        now = datetime.now(timezone.utc)
+        size = len(json.dumps(payload).encode("utf-8"))
+        stmt = insert(DocumentExtraction).values(
+            sha256=sha256, kind=kind, payload=payload, size_bytes=size,
+            created_at=now, last_accessed_at=now,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DocumentExtraction.sha256, DocumentExtraction.kind],
+            set_={"payload": payload, "size_bytes": size, "last_accessed_at": now},
+        )
+        async with AsyncSessionLocal() as db:
+            await db.execute(stmt)
+            self._writes += 1
+            if self._writes % _PRUNE_EVERY == 0:
+                await self._prune(db)
+            await db.commit()
+
+    async def _prune(self, db) -> None:
+        """Delete the least recently accessed rows beyond max_bytes in total."""
+        running = (
+            select(
+                DocumentExtraction.sha256,
+                DocumentExtraction.kind,
+                func.sum(DocumentExtraction.size_bytes)
+                .over(order_by=DocumentExtraction.last_accessed_at.desc())
+                .label("running"),
+            )
+        ).subquery()
+        over_budget = select(running.c.sha256, running.c.kind).where(
+            running.c.running > self.max_bytes
+        )
+        await db.execute(
+            delete(DocumentExtraction).where(
+                tuple_(DocumentExtraction.sha256, DocumentExtraction.kind).in_(over_budget)
+            )
+        )
+
+
+class ExtractionStore:
+    """Async facade over either backend; failures degrade to re-extraction."""
+
+    def __init__(self, backend: DiskExtractionBackend | PostgresExtractionBackend) -> None:
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, sha256: str, kind: str) -> Any | None:
+        try:
+            if isinstance(self.backend, DiskExtractionBackend):
+                payload = await asyncio.to_thread(self.backend.get, sha256, kind)
+            else:
+                payload = await self.backend.get(sha256, kind)
+        except Exception:
+            logger.exception("Extraction store lookup failed")
+            payload = None
+        if payload is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return payload
+
+    async def put(self, sha256: str, kind: str, payload: Any) -> None:
+        try:
+            if isinstance(self.backend, DiskExtractionBackend):
+                await asyncio.to_thread(self.backend.put, sha256, kind, payload)
+            else:
+                await self.backend.put(sha256, kind, payload)
+        except Exception:
+            logger.exception("Extraction store write failed")
+
+    async def get_or_extract(
+        self, sha256: str, kind: str, extract, executor: Executor | None = None
+    ) -> Any:
+        """Stored payload for (sha256, kind), or run `extract()` on `executor` and store it."""
+        payload = await self.get(sha256, kind)
+        if payload is None:
+            payload = await asyncio.get_running_loop().run_in_executor(executor, extract)
+            await self.put(sha256, kind, payload)
+        return payload
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def _build_extraction_store() -> ExtractionStore:
+    max_bytes = settings.extraction_store_max_mb * 1024 * 1024
+    if settings.extraction_store_backend == "postgres":
+        return ExtractionStore(PostgresExtractionBackend(max_bytes))
+    return ExtractionStore(DiskExtractionBackend(settings.extraction_store_dir, max_bytes))
+
+
+extraction_store = _build_extraction_store()
@@ -0,0 +1,34 @@
+"""
+Minimal stand-in for the Twilio Messages API, for offline throughput testing.
+
+Run it with:
+    uv run uvicorn app.fake_twilio:app --port 8099
+and set TWILIO_API_BASE_URL=http://127.0.0.1:8099 for the LearnaDo app.
+FAKE_TWILIO_LATENCY_MS adds an artificial delay to every request.
+"""
+
+import asyncio
+import os
+import uuid
+
+from fastapi import FastAPI, Form
+
+app = FastAPI(title="Fake Twilio")
+
+LATENCY_SECONDS = float(os.getenv("FAKE_TWILIO_LATENCY_MS", "0")) / 1000
+sent_messages: list[dict] = []
+
+
+@app.post("/2010-04-01/Accounts/{account_sid}/Messages.json", status_code=201)
+async def create_message(
+    account_sid: str,
+    From: str = Form(...),
+    To: str = Form(...),
+    Body: str = Form(default=""),
+    MediaUrl: str | None = Form(default=None),
+):
+    if LATENCY_SECONDS:
+        await asyncio.sleep(LATENCY_SECONDS)
+    sid = f"SM{uuid.uuid4().hex}"
+    sent_messages.append({"sid": sid, "from": From, "to": To, "body": Body, "media_url": MediaUrl})
+    return {"sid": sid, "account_sid": account_sid, "to": To, "from": From, "status": "queued"}
@@ -0,0 +1,386 @@
+"""
+Inbound WhatsApp message queue and worker pool.
+
+The webhook enqueues each message and returns immediately; workers drain the
+queue, run the router and send replies via Twilio. Messages from one user are
+processed strictly in arrival order while different users run in parallel.
+
+Backends:
+- MemoryInboundQueue: per-process, per-user lanes (single uvicorn worker).
+- PostgresInboundQueue: inbound_messages table claimed with FOR UPDATE SKIP LOCKED,
+  safe across several processes. Messages left 'processing' past the lease
+  (a worker crashed or hung) are requeued periodically.
+
+A message whose routing raises is retried up to INBOUND_MAX_ATTEMPTS times;
+after that it is marked failed and the user gets an apology instead of silence.
+The reply is kept with the message once routing commits (on the inbound_messages
+row for the Postgres backend, in the same transaction), so a retry after a
+failed send only re-sends it instead of routing again.
+"""
+
+import asyncio
+import logging
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Protocol
+
+from sqlalchemy import text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import InboundMessage
+from app.router import route_message
+from app.services import load_conversation_context, record_inbound_message
+from app.session_state import session_state_cache
+from app.tracing import tracer, traced
+from app.whatsapp import send_message, skip_repeat_sends
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueuedMessage:
+    phone: str
+    body: str
+    media_url: str | None = None
+    media_type: str | None = None
+    wa_message_id: str | None = None
+    id: uuid.UUID = field(default_factory=uuid.uuid4)
+    attempts: int = 0  # claims so far, including the current one
+    # (text, media_url) once routing has committed; a retry only re-sends it.
+    reply: tuple[str, str | None] | None = None
+    durable: bool = False  # has an inbound_messages row (Postgres backend)
+    # Messages already sent while handling this one (in this process); see skip_repeat_sends.
+    sent: set[tuple] = field(default_factory=set, repr=False, compare=False)
+
+
+class InboundQueue(Protocol):
+    async def put(self, msg: QueuedMessage) -> bool: ...
+    async def claim(self) -> QueuedMessage: ...
+    async def ack(self, msg: QueuedMessage) -> None: ...
+    async def retry(self, msg: QueuedMessage, error: str) -> None: ...
+    async def fail(self, msg: QueuedMessage, error: str) -> None: ...
+
+
+class MemoryInboundQueue:
+    """
+    In-process queue with one FIFO lane per phone number.
+
+    A phone is handed to at most one worker at a time; when that worker acks,
+    the phone is re-scheduled if more messages arrived meanwhile.
+    """
+
+    def __init__(self) -> None:
+        self._lanes: dict[str, deque[QueuedMessage]] = {}
+        self._ready: asyncio.Queue[str] = asyncio.Queue()
+        self._scheduled: set[str] = set()
+
+    async def put(self, msg: QueuedMessage) -> bool:
+        self._lanes.setdefault(msg.phone, deque()).append(msg)
+        if msg.phone not in self._scheduled:
+            self._scheduled.add(msg.phone)
+            self._ready.put_nowait(msg.phone)
+        return True
+
+    async def claim(self) -> QueuedMessage:
+        phone = await self._ready.get()
+        msg = self._lanes[phone].popleft()
+        msg.attempts += 1
+        return msg
+
+    async def ack(self, msg: QueuedMessage) -> None:
+        self._release(msg.phone)
+
+    async def retry(self, msg: QueuedMessage, error: str) -> None:
+        # Back to the head of its lane, so later messages still wait behind it.
+        self._lanes.setdefault(msg.phone, deque()).appendleft(msg)
+        self._release(msg.phone)
+
+    async def fail(self, msg: QueuedMessage, error: str) -> None:
+        self._release(msg.phone)
+
+    def _release(self, phone: str) -> None:
+        if self._lanes.get(phone):
+            self._ready.put_nowait(phone)
+        else:
+            self._lanes.pop(phone, None)
+            self._scheduled.discard(phone)
+
+
+# Oldest queued message per phone, skipping phones that already have one in flight.
+_CLAIM_SQL = text(
+    """
+    UPDATE inbound_messages
+    SET status = 'processing', started_at = now(), attempts = attempts + 1
+    WHERE id = (
+        SELECT m.id FROM inbound_messages m
+        WHERE m.status = 'queued'
+          AND NOT EXISTS (
+              SELECT 1 FROM inbound_messages p
+              WHERE p.phone_number = m.phone_number AND p.status = 'processing'
+          )
+          AND NOT EXISTS (
+              SELECT 1 FROM inbound_messages e
+              WHERE e.phone_number = m.phone_number AND e.status = 'queued'
+                AND e.created_at < m.created_at
+          )
+        ORDER BY m.created_at
+        FOR UPDATE SKIP LOCKED
+        LIMIT 1
+    )
+    RETURNING id, phone_number, body, media_url, media_type, wa_message_id, attempts,
+              reply_text, reply_media_url
+    """
+)
+
+
+class PostgresInboundQueue:
+    """Durable queue on the inbound_messages table for multi-process deployments."""
+
+    def __init__(self, poll_interval: float, lease_seconds: float) -> None:
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+
+    async def put(self, msg: QueuedMessage) -> bool:
+        """Insert the message; returns False if its MessageSid is already queued."""
+        stmt = (
+            insert(InboundMessage)
+            .values(
+                id=msg.id,
+                phone_number=msg.phone,
+                body=msg.body,
+                media_url=msg.media_url,
+                media_type=msg.media_type,
+                wa_message_id=msg.wa_message_id,
+                status="queued",
+                attempts=0,
+                # Set client-side so FIFO order within a burst doesn't depend on now().
+                created_at=datetime.now(timezone.utc),
+            )
+            .on_conflict_do_nothing(index_elements=[InboundMessage.wa_message_id])
+            .returning(InboundMessage.id)
+        )
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(stmt)
+            await db.commit()
+            return result.scalar_one_or_none() is not None
+
+    async def claim(self) -> QueuedMessage:
+        while True:
+            async with AsyncSessionLocal() as db:
+                row = (await db.execute(_CLAIM_SQL)).one_or_none()
+                await db.commit()
+            if row is not None:
+                return QueuedMessage(
+                    id=row.id,
+                    phone=row.phone_number,
+                    body=row.body,
+                    media_url=row.media_url,
+                    media_type=row.media_type,
+                    wa_message_id=row.wa_message_id,
+                    attempts=row.attempts,
+                    reply=(
+                        (row.reply_text, row.reply_media_url)
+                        if row.reply_text is not None
+                        else None
+                    ),
+                    durable=True,
+                )
+            await asyncio.sleep(self.poll_interval)
+
+    async def ack(self, msg: QueuedMessage) -> None:
+        await self._finish(msg, "done", None)
+
+    async def retry(self, msg: QueuedMessage, error: str) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(InboundMessage)
+                .where(InboundMessage.id == msg.id)
+                .values(status="queued", error=error, started_at=None)
+            )
+            await db.commit()
+
+    async def fail(self, msg: QueuedMessage, error: str) -> None:
+        await self._finish(msg, "failed", error)
+
+    async def requeue_stale(self) -> int:
+        """Return messages stuck in 'processing' past the lease (e.g. after a crash)."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.lease_seconds)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(InboundMessage)
+                .where(InboundMessage.status == "processing", InboundMessage.started_at < cutoff)
+                .values(status="queued")
+            )
+            await db.commit()
+            return result.rowcount or 0
+
+    async def _finish(self, msg: QueuedMessage, status: str, error: str | None) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(InboundMessage)
+                .where(InboundMessage.id == msg.id)
+                .values(status=status, error=error, finished_at=datetime.now(timezone.utc))
+            )
+            await db.commit()
+
+
+@traced("inbound.process_message")
+async def process_message(msg: QueuedMessage) -> None:
+    """Route one inbound message and send the reply; one load and one commit per message."""
+    # A re-run (stale state below, or a worker retry) may repeat notices the
+    # first run already sent; each distinct message goes out once.
+    with skip_repeat_sends(msg.sent):
+        if msg.reply is None:
+            try:
+                reply = await _route(msg)
+            except StaleDataError:
+                # Our cached session state was older than the row; reload from Postgres once.
+                logger.info("Stale session state for %s; retrying with a fresh load", msg.phone)
+                session_state_cache.forget(msg.phone)
+                reply = await _route(msg)
+            if reply is None:
+                return
+            msg.reply = reply
+        else:
+            # Routing already committed on an earlier attempt; the send failed.
+            logger.info("Re-sending stored reply for message %s to %s", msg.id, msg.phone)
+        reply_text, reply_media = msg.reply
+
+        logger.info("Sending reply to %s: %r", msg.phone, (reply_text or "")[:80])
+        await send_message(msg.phone, reply_text, reply_media)
+
+
+async def _route(msg: QueuedMessage) -> tuple[str, str | None] | None:
+    async with AsyncSessionLocal() as db:
+        try:
+            ctx = await load_conversation_context(db, msg.phone)
+            if msg.wa_message_id and not await record_inbound_message(
+                db, ctx.user, msg.body, msg.media_type, msg.wa_message_id
+            ):
+                logger.info("Skipping duplicate message %s from %s", msg.wa_message_id, msg.phone)
+                return None
+            reply = await route_message(db, ctx, msg.body, msg.media_url, msg.media_type)
+            if msg.durable:
+                await db.execute(
+                    update(InboundMessage)
+                    .where(InboundMessage.id == msg.id)
+                    .values(reply_text=reply[0], reply_media_url=reply[1])
+                )
+            with tracer.span("db.commit"):
+                await db.commit()
+            return reply
+        except Exception:
+            await db.rollback()
+            raise
+
+
+ERROR_REPLY = "Sorry, something went wrong with your last message. Please try again in a moment."
+
+
+class InboundWorkerPool:
+    """Fixed pool of asyncio workers draining an InboundQueue."""
+
+    def __init__(self, queue: InboundQueue, concurrency: int, max_attempts: int = 3) -> None:
+        self.queue = queue
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self._tasks: list[asyncio.Task] = []
+        self._stopping = False
+
+    async def start(self) -> None:
+        self._stopping = False
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"inbound-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+        if isinstance(self.queue, PostgresInboundQueue):
+            await self._requeue_stale()
+            self._tasks.append(asyncio.create_task(self._reaper(), name="inbound-reaper"))
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _requeue_stale(self) -> None:
+        requeued = await self.queue.requeue_stale()
+        if requeued:
+            logger.warning("Requeued %d stale inbound messages", requeued)
+
+    async def _reaper(self) -> None:
+        """Requeue messages whose worker crashed or hung, twice per lease."""
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 2)
+            try:
+                await self._requeue_stale()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Failed to requeue stale inbound messages")
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                msg = await self.queue.claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Failed to claim inbound message")
+                await asyncio.sleep(1.0)
+                continue
+
+            try:
+                await process_message(msg)
+            except asyncio.CancelledError as e:
+                if self._stopping:
+                    # Shutdown mid-message: the Postgres lease requeues it on next start.
+                    raise
+                # Cancellation from something we awaited, not of this worker:
+                # handle it like any other failure and keep the worker alive.
+                await self._failed(msg, e)
+            except Exception as e:
+                await self._failed(msg, e)
+            else:
+                await self.queue.ack(msg)
+
+    async def _failed(self, msg: QueuedMessage, error: BaseException) -> None:
+        logger.exception(
+            "Inbound message %s from %s failed (attempt %d/%d)",
+            msg.id, msg.phone, msg.attempts, self.max_attempts, exc_info=error,
+        )
+        try:
+            if msg.attempts < self.max_attempts:
+                await self.queue.retry(msg, repr(error))
+                return
+            await self.queue.fail(msg, repr(error))
+        except Exception:
+            logger.exception("Failed to record failure of inbound message %s", msg.id)
+            return
+        try:
+            await send_message(msg.phone, ERROR_REPLY)
+        except Exception:
+            logger.exception("Failed to send error reply to %s", msg.phone)
+
+
+def _build_queue() -> InboundQueue:
+    if settings.inbound_queue_backend == "postgres":
+        return PostgresInboundQueue(
+            poll_interval=settings.inbound_queue_poll_interval,
+            lease_seconds=settings.inbound_queue_lease_seconds,
+        )
+    return MemoryInboundQueue()
+
+
+inbound_queue: InboundQueue = _build_queue()
+inbound_workers = InboundWorkerPool(
+    inbound_queue,
+    concurrency=settings.inbound_workers,
+    max_attempts=settings.inbound_max_attempts,
+)
@@ -0,0 +1,357 @@
+"""
+Background processing jobs for uploads (PDF pages, image OCR, transcripts).
+
+POST /api/upload returns an upload id at once; a processing_jobs row is queued
+and picked up by JobRunner. Each process runs JOB_WORKERS asyncio workers that
+claim the oldest queued job with FOR UPDATE SKIP LOCKED, so several app
+processes can share the table; jobs left running past JOB_LEASE_SECONDS are
+requeued. A partial unique index keeps one queued/running job per upload. Image OCR and Whisper run in a spawned process
+pool of the same size; PDFs go through app.pdf_extract's own page pool.
+
+Results are written once to a JSON file under JOB_RESULTS_DIR (the job row
+points at it) and kept, so repeated fetches never re-run anything; the
+extraction store is filled as well, so /api/*-query on the same bytes skips
+extraction too. Clients poll GET /api/process/{upload_id}/status or long-poll
+.../result?wait=N.
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import time
+import uuid
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import select, text, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.extraction_store import IMAGE_OCR, PDF_PAGES, TRANSCRIPT, extraction_store
+from app.models import ProcessingJob, Upload
+from app.pdf_extract import extract_pdf_pages
+from app.uploads import StoredUpload, run_blocking
+
+logger = logging.getLogger(__name__)
+
+TERMINAL = ("succeeded", "failed")
+
+_IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".gif", ".webp"}
+_AUDIO_SUFFIXES = {".mp3", ".wav", ".m4a", ".ogg", ".oga", ".opus", ".flac", ".aac", ".webm"}
+
+
+def job_kind(filename: str, content_type: str | None) -> str | None:
+    """Extraction to run for a file, from its content type or suffix; None if unsupported."""
+    content_type = (content_type or "").lower()
+    suffix = Path(filename).suffix.lower()
+    if content_type == "application/pdf" or suffix == ".pdf":
+        return PDF_PAGES
+    if content_type.startswith("image/") or suffix in _IMAGE_SUFFIXES:
+        return IMAGE_OCR
+    if content_type.startswith("audio/") or suffix in _AUDIO_SUFFIXES:
+        return TRANSCRIPT
+    return None
+
+
+def _extract_in_worker(kind: str, path: str) -> Any:
+    """Runs in a job worker process; Whisper/torch load once per process."""
+    from app import utils
+
+    if kind == IMAGE_OCR:
+        return utils.ocr_image(path)
+    return utils.transcribe_audio(path)
+
+
+# Oldest queued job.
+_CLAIM_SQL = text(
+    """
+    UPDATE processing_jobs
+    SET status = 'running', started_at = now(), attempts = attempts + 1
+    WHERE id = (
+        SELECT id FROM processing_jobs
+        WHERE status = 'queued'
+        ORDER BY created_at
+        FOR UPDATE SKIP LOCKED
+        LIMIT 1
+    )
+    RETURNING id, upload_id, kind
+    """
+)
+
+
+class JobRunner:
+    def __init__(
+        self,
+        workers: int,
+        poll_interval: float,
+        lease_seconds: float,
+        results_dir: str,
+        result_cache_entries: int = 64,
+    ) -> None:
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.results_dir = Path(results_dir)
+        self.result_cache_entries = result_cache_entries
+        self._tasks: list[asyncio.Task] = []
+        self._pool: ProcessPoolExecutor | None = None
+        self._wakeup: asyncio.Event | None = None
+        # Completion events, kept only while some wait() call is parked on them.
+        self._finished: dict[uuid.UUID, asyncio.Event] = {}
+        self._waiters: Counter[uuid.UUID] = Counter()
+        self._results: OrderedDict[uuid.UUID, Any] = OrderedDict()
+
+    # ── Lifecycle ─────────────────────────────────────────────────────
+
+    async def start(self) -> None:
+        requeued = await self.requeue_stale()
+        if requeued:
+            logger.warning("Requeued %d stale processing jobs", requeued)
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{i}") for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._reaper(), name="job-reaper"))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def requeue_stale(self) -> int:
+        """Return jobs stuck in 'running' past the lease (e.g. after a crash)."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.lease_seconds)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(ProcessingJob)
+                .where(ProcessingJob.status == "running", ProcessingJob.started_at < cutoff)
+                .values(status="queued")
+            )
+            await db.commit()
+            return result.rowcount or 0
+
+    async def _reaper(self) -> None:
+        """Requeue jobs whose worker process died mid-run, twice per lease."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 2)
+            try:
+                requeued = await self.requeue_stale()
+                if requeued:
+                    logger.warning("Requeued %d stale processing jobs", requeued)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Failed to requeue stale processing jobs")
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    # ── Submitting ────────────────────────────────────────────────────
+
+    async def record_upload(self, stored: StoredUpload, content_type: str | None) -> Upload:
+        upload = Upload(
+            id=uuid.uuid4(),
+            filename=stored.filename,
+            content_type=content_type,
+            sha256=stored.sha256,
+            size_bytes=stored.size,
+            storage_path=str(stored.path),
+            created_at=datetime.now(timezone.utc),
+        )
+        async with AsyncSessionLocal() as db:
+            db.add(upload)
+            await db.commit()
+        return upload
+
+    async def submit(self, upload: Upload, kind: str) -> ProcessingJob:
+        """Queue a job, unless one for this upload is queued, running or done (result still on disk)."""
+        async with AsyncSessionLocal() as db:
+            existing = await self._latest_job(db, upload.id)
+            if existing is not None and existing.kind == kind and await self._reusable(existing):
+                return existing
+            # A concurrent submit may have queued the same job since the read
+            # above; the partial unique index makes that insert a no-op.
+            job = await db.scalar(
+                insert(ProcessingJob)
+                .values(
+                    id=uuid.uuid4(), upload_id=upload.id, kind=kind, status="queued", attempts=0,
+                    created_at=datetime.now(timezone.utc),
+                )
+                .on_conflict_do_nothing(
+                    index_elements=[ProcessingJob.upload_id, ProcessingJob.kind],
+                    index_where=text("status IN ('queued', 'running')"),
+                )
+                .returning(ProcessingJob)
+            )
+            if job is None:
+                job = await db.scalar(
+                    select(ProcessingJob)
+                    .where(ProcessingJob.upload_id == upload.id, ProcessingJob.kind == kind)
+                    .order_by(ProcessingJob.created_at.desc())
+                    .limit(1)
+                )
+            await db.commit()
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    @staticmethod
+    async def _reusable(job: ProcessingJob) -> bool:
+        if job.status == "failed":
+            return False
+        if job.status == "succeeded":
+            return await asyncio.to_thread(Path(job.result_path).exists)
+        return True
+
+    # ── Reading ───────────────────────────────────────────────────────
+
+    async def get_upload(self, upload_id: uuid.UUID) -> Upload | None:
+        async with AsyncSessionLocal() as db:
+            return await db.get(Upload, upload_id)
+
+    async def latest_job(self, upload_id: uuid.UUID) -> ProcessingJob | None:
+        async with AsyncSessionLocal() as db:
+            return await self._latest_job(db, upload_id)
+
+    @staticmethod
+    async def _latest_job(db, upload_id: uuid.UUID) -> ProcessingJob | None:
+        result = await db.execute(
+            select(ProcessingJob)
+            .where(ProcessingJob.upload_id == upload_id)
+            .order_by(ProcessingJob.created_at.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    async def wait(self, upload_id: uuid.UUID, timeout: float) -> ProcessingJob | None:
+        """Latest job for the upload, waiting up to `timeout` seconds for it to finish."""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await self.latest_job(upload_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job.status in TERMINAL or remaining <= 0:
+                return job
+            # Woken at once if this process runs the job; otherwise re-checked each poll.
+            event = self._finished.setdefault(job.id, asyncio.Event())
+            self._waiters[job.id] += 1
+            try:
+                await asyncio.wait_for(event.wait(), timeout=min(remaining, self.poll_interval))
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                # Last waiter out drops the event, so jobs finished in another
+                # process (nobody here sets or pops it) leave nothing behind.
+                self._waiters[job.id] -= 1
+                if not self._waiters[job.id]:
+                    del self._waiters[job.id]
+                    if self._finished.get(job.id) is event:
+                        del self._finished[job.id]
+
+    async def read_result(self, job: ProcessingJob) -> Any:
+        cached = self._results.get(job.id)
+        if cached is None:
+            cached = await asyncio.to_thread(_read_json, Path(job.result_path))
+            self._results[job.id] = cached
+            while len(self._results) > self.result_cache_entries:
+                self._results.popitem(last=False)
+        self._results.move_to_end(job.id)
+        return cached
+
+    # ── Workers ───────────────────────────────────────────────────────
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                claimed = await self._claim()
+                if claimed is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._execute(*claimed)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Job worker error")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _claim(self) -> tuple[uuid.UUID, str, Upload] | None:
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(_CLAIM_SQL)).one_or_none()
+            await db.commit()
+            if row is None:
+                return None
+            upload = await db.get(Upload, row.upload_id)
+        return row.id, row.kind, upload
+
+    async def _execute(self, job_id: uuid.UUID, kind: str, upload: Upload) -> None:
+        try:
+            payload = await extraction_store.get(upload.sha256, kind)
+            if payload is None:
+                payload = await self._extract(kind, upload.storage_path)
+                await extraction_store.put(upload.sha256, kind, payload)
+            path = self.results_dir / f"{job_id}.json"
+            size = await asyncio.to_thread(_write_json, path, {"kind": kind, "result": payload})
+            await self._finish(job_id, "succeeded", result_path=str(path), result_bytes=size)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("Processing job %s failed", job_id)
+            await self._finish(job_id, "failed", error=f"{type(e).__name__}: {e}")
+        finally:
+            event = self._finished.pop(job_id, None)
+            if event is not None:
+                event.set()
+
+    async def _extract(self, kind: str, path: str) -> Any:
+        if kind == PDF_PAGES:
+            # Blocks on app.pdf_extract's process pool; keep it off the event loop.
+            return await run_blocking(extract_pdf_pages, path)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._process_pool(), _extract_in_worker, kind, path)
+
+    async def _finish(self, job_id: uuid.UUID, status: str, **values) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(ProcessingJob)
+                .where(ProcessingJob.id == job_id)
+                .values(status=status, finished_at=datetime.now(timezone.utc), **values)
+            )
+            await db.commit()
+
+
+def _write_json(path: Path, payload: Any) -> int:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = json.dumps(payload).encode("utf-8")
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(data)
+    tmp.replace(path)
+    return len(data)
+
+
+def _read_json(path: Path) -> Any:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+job_runner = JobRunner(
+    workers=settings.job_workers,
+    poll_interval=settings.job_poll_interval,
+    lease_seconds=settings.job_lease_seconds,
+    results_dir=settings.job_results_dir,
+)
@@ -1,19 +1,24 @@
 """
 SQLAlchemy ORM models for LearnaDo.
-Mirrors the ERD schema: users, missions, lessons, user_progress, messages, documents.
+Mirrors the ERD schema: users, missions, lessons, user_progress, messages, documents,
+plus supporting cache, queue and outbox tables.
 """
 
 import uuid
 from datetime import datetime
 
 from sqlalchemy import (
+    BigInteger,
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
+    UniqueConstraint,
     func,
+    text,
 )
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -33,6 +38,8 @@ class User(Base):
     name: Mapped[str | None] = mapped_column(String(255))
     preferred_language: Mapped[str | None] = mapped_column(String(10), default="en")
     wa_session_state: Mapped[str | None] = mapped_column(String(255))
+    # Optimistic-lock version; checked on every ORM UPDATE (see app.session_state).
+    wa_state_version: Mapped[int] = mapped_column(Integer, server_default="1", nullable=False)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
@@ -48,6 +55,8 @@ class User(Base):
     messages: Mapped[list["Message"]] = relationship("Message", back_populates="user")
     documents: Mapped[list["Document"]] = relationship("Document", back_populates="uploaded_by_user")
 
+    __mapper_args__ = {"version_id_col": wa_state_version}
+
 
 class Mission(Base):
     __tablename__ = "missions"
@@ -61,7 +70,14 @@ class Mission(Base):
     )
     topic: Mapped[str] = mapped_column(String(500), nullable=False)
     status: Mapped[str] = mapped_column(String(50), default="pending", nullable=False)
-    outline_json: Mapped[dict | None] = mapped_column(JSONB)
+    # Large columns are deferred and raise if touched without an explicit load
+    # (undefer()/db.refresh); hot-path queries never need them.
+    outline_json: Mapped[dict | None] = mapped_column(JSONB, deferred=True, deferred_raiseload=True)
+    # Denormalized lesson counters, kept in step by services.complete_lesson.
+    lessons_total: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    lessons_completed: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", nullable=False
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
@@ -75,7 +91,10 @@ class Mission(Base):
         "User", foreign_keys=[learner_id], back_populates="missions_learning"
     )
     lessons: Mapped[list["Lesson"]] = relationship(
-        "Lesson", back_populates="mission", cascade="all, delete-orphan"
+        "Lesson",
+        back_populates="mission",
+        cascade="all, delete-orphan",
+        order_by="Lesson.order_index",
     )
     progress: Mapped[list["UserProgress"]] = relationship(
         "UserProgress", back_populates="mission", cascade="all, delete-orphan"
@@ -87,6 +106,16 @@ class Mission(Base):
         "Document", back_populates="mission", cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        # load_conversation_context: the learner's one active mission
+        Index(
+            "ix_missions_learner_id_active",
+            "learner_id",
+            postgresql_where=text("status = 'active'"),
+        ),
+        Index("ix_missions_goal_setter_id", "goal_setter_id"),
+    )
+
 
 class Lesson(Base):
     __tablename__ = "lessons"
@@ -97,7 +126,9 @@ class Lesson(Base):
     )
     order_index: Mapped[int] = mapped_column(Integer, nullable=False)
     title: Mapped[str] = mapped_column(String(500), nullable=False)
-    content_md: Mapped[str | None] = mapped_column(Text)
+    content_md: Mapped[str | None] = mapped_column(Text, deferred=True, deferred_raiseload=True)
+    # Tavily results gathered at mission creation (eager research mode)
+    research_json: Mapped[dict | None] = mapped_column(JSONB, deferred=True, deferred_raiseload=True)
     status: Mapped[str] = mapped_column(String(50), default="draft", nullable=False)
 
     # Relationships
@@ -106,6 +137,17 @@ class Lesson(Base):
         "UserProgress", back_populates="lesson", cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        UniqueConstraint("mission_id", "order_index", name="uq_lessons_mission_id_order_index"),
+        # current lesson lookup: first non-completed lesson by order
+        Index(
+            "ix_lessons_mission_id_order_index_open",
+            "mission_id",
+            "order_index",
+            postgresql_where=text("status <> 'completed'"),
+        ),
+    )
+
 
 class UserProgress(Base):
     __tablename__ = "user_progress"
@@ -130,6 +172,17 @@ class UserProgress(Base):
     lesson: Mapped["Lesson"] = relationship("Lesson", back_populates="progress")
     user: Mapped["User"] = relationship("User", back_populates="progress")
 
+    __table_args__ = (
+        # load_conversation_context: the open progress row for (user, mission)
+        Index(
+            "ix_user_progress_user_id_mission_id_open",
+            "user_id",
+            "mission_id",
+            postgresql_where=text("status <> 'completed'"),
+        ),
+        Index("ix_user_progress_lesson_id", "lesson_id"),
+    )
+
 
 class Message(Base):
     __tablename__ = "messages"
@@ -142,9 +195,10 @@ class Message(Base):
         UUID(as_uuid=True), ForeignKey("missions.id", ondelete="SET NULL")
     )
     role: Mapped[str] = mapped_column(String(20), nullable=False)
-    content: Mapped[str] = mapped_column(Text, nullable=False)
+    content: Mapped[str] = mapped_column(Text, nullable=False, deferred=True, deferred_raiseload=True)
     media_type: Mapped[str | None] = mapped_column(String(50))
-    wa_message_id: Mapped[str | None] = mapped_column(String(255))
+    # Twilio MessageSid; unique so a webhook retry can't be recorded (or processed) twice.
+    wa_message_id: Mapped[str | None] = mapped_column(String(255), unique=True, index=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
@@ -166,6 +220,7 @@ class Document(Base):
     )
     filename: Mapped[str] = mapped_column(String(500), nullable=False)
     storage_url: Mapped[str | None] = mapped_column(String(2048))
+    # Retrieval index namespace (app.retrieval.pdf_namespace)
     vector_namespace: Mapped[str | None] = mapped_column(String(255))
     uploaded_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
@@ -174,3 +229,183 @@ class Document(Base):
     # Relationships
     mission: Mapped["Mission | None"] = relationship("Mission", back_populates="documents")
     uploaded_by_user: Mapped["User"] = relationship("User", back_populates="documents")
+
+
+class LessonVariant(Base):
+    """Simplified rewrite of a lesson at a given difficulty level (1 = simpler, 2 = simplest)."""
+
+    __tablename__ = "lesson_variants"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=_uuid)
+    lesson_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("lessons.id", ondelete="CASCADE"), nullable=False
+    )
+    level: Mapped[int] = mapped_column(Integer, nullable=False)
+    prompt_version: Mapped[str] = mapped_column(String(50), nullable=False)
+    content_md: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    __table_args__ = (
+        UniqueConstraint(
+            "lesson_id", "level", "prompt_version", name="uq_lesson_variants_lesson_level_version"
+        ),
+    )
+
+
+class ContentCache(Base):
+    """Synthesized outlines/lessons keyed on a hash of (kind, topic, title, prompt version, model)."""
+
+    __tablename__ = "content_cache"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)
+    payload: Mapped[dict | list] = mapped_column(JSONB, nullable=False)
+    hit_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    last_accessed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False, index=True
+    )
+
+
+class DocumentExtraction(Base):
+    """Extracted text of an uploaded file (PDF pages, OCR, transcript), keyed by content hash."""
+
+    __tablename__ = "document_extractions"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(20), primary_key=True)
+    payload: Mapped[dict | list | str] = mapped_column(JSONB, nullable=False)
+    size_bytes: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    last_accessed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False, index=True
+    )
+
+
+class InboundMessage(Base):
+    """Inbound WhatsApp message waiting for (or undergoing) background processing."""
+
+    __tablename__ = "inbound_messages"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=_uuid)
+    phone_number: Mapped[str] = mapped_column(String(20), nullable=False)
+    body: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    media_url: Mapped[str | None] = mapped_column(String(2048))
+    media_type: Mapped[str | None] = mapped_column(String(50))
+    wa_message_id: Mapped[str | None] = mapped_column(String(255), unique=True, index=True)
+    status: Mapped[str] = mapped_column(String(20), default="queued", nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    error: Mapped[str | None] = mapped_column(Text)
+    # Reply stored with the routing commit; a retry after a failed send re-sends it
+    reply_text: Mapped[str | None] = mapped_column(Text)
+    reply_media_url: Mapped[str | None] = mapped_column(String(2048))
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_inbound_messages_status_created_at", "status", "created_at"),
+        Index("ix_inbound_messages_phone_number_status", "phone_number", "status"),
+    )
+
+
+class NotificationOutbox(Base):
+    """Outgoing notification written in the same transaction as the event that caused it."""
+
+    __tablename__ = "notification_outbox"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=_uuid)
+    recipient_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    mission_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("missions.id", ondelete="CASCADE")
+    )
+    kind: Mapped[str] = mapped_column(String(50), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict)
+    status: Mapped[str] = mapped_column(String(20), default="pending", nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    # Set when a dispatcher marks the row 'sending'; stale claims are requeued
+    claimed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_notification_outbox_status_created_at", "status", "created_at"),
+    )
+
+
+class Upload(Base):
+    """File received by the uploads API, stored content-addressed on disk."""
+
+    __tablename__ = "uploads"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=_uuid)
+    filename: Mapped[str] = mapped_column(String(500), nullable=False)
+    content_type: Mapped[str | None] = mapped_column(String(255))
+    sha256: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+    size_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    storage_path: Mapped[str] = mapped_column(String(2048), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    jobs: Mapped[list["ProcessingJob"]] = relationship(
+        "ProcessingJob", back_populates="upload", cascade="all, delete-orphan"
+    )
+    # Extractions of these bytes (postgres extraction store). No FK: rows are
+    # shared by every upload with the same hash and may be evicted, hence view-only.
+    extractions: Mapped[list["DocumentExtraction"]] = relationship(
+        "DocumentExtraction",
+        primaryjoin="Upload.sha256 == foreign(DocumentExtraction.sha256)",
+        viewonly=True,
+        lazy="raise",
+    )
+
+
+class ProcessingJob(Base):
+    """Background extraction (PDF pages, OCR, transcript) of an upload."""
+
+    __tablename__ = "processing_jobs"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=_uuid)
+    upload_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("uploads.id", ondelete="CASCADE"), nullable=False
+    )
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)
+    status: Mapped[str] = mapped_column(String(20), default="queued", nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    error: Mapped[str | None] = mapped_column(Text)
+    # JSON file holding the result (see app.jobs); kept after completion
+    result_path: Mapped[str | None] = mapped_column(String(2048))
+    result_bytes: Mapped[int | None] = mapped_column(Integer)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+
+    upload: Mapped["Upload"] = relationship("Upload", back_populates="jobs")
+
+    __table_args__ = (
+        Index("ix_processing_jobs_status_created_at", "status", "created_at"),
+        Index("ix_processing_jobs_upload_id_created_at", "upload_id", "created_at"),
+        # one active job per upload and kind; JobRunner.submit relies on it
+        Index(
+            "uq_processing_jobs_upload_id_kind_active",
+            "upload_id",
+            "kind",
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+    )
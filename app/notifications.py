@@ -0,0 +1,223 @@
+"""
+Outbox dispatcher for goal-setter notifications.
+
+Router handlers only insert notification_outbox rows (in the same transaction
+as the progress change); this background dispatcher delivers them. Pending
+events for the same recipient are coalesced into one digest message, so a
+burst of lesson completions produces a single WhatsApp message.
+
+Rows are claimed (marked 'sending') in a short transaction and sent after it
+commits, so no row lock or connection is held across Twilio calls. Claims
+older than the lease (a dispatcher died mid-send) go back to 'pending'.
+"""
+
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import case, select, update
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import NotificationOutbox, User
+from app.services import get_mission_progress_summaries
+from app.whatsapp import send_many
+
+logger = logging.getLogger(__name__)
+
+
+def build_digest(events: list[NotificationOutbox], summaries: dict[uuid.UUID, dict]) -> str:
+    """Render all pending events for one recipient as a single message."""
+    by_mission: dict[uuid.UUID | None, list[NotificationOutbox]] = defaultdict(list)
+    for event in events:
+        by_mission[event.mission_id].append(event)
+
+    sections = []
+    for mission_id, mission_events in by_mission.items():
+        topic = mission_events[0].payload.get("topic", "your mission")
+        lessons = [e for e in mission_events if e.kind == "lesson_completed"]
+        finished = any(e.kind == "mission_completed" for e in mission_events)
+
+        lines = []
+        if lessons:
+            lines.append(f"*{topic}* update:")
+            if len(lessons) == 1:
+                lines.append(f"Your learner completed: *{_lesson_line(lessons[0])}*")
+            else:
+                lines.append(f"Your learner completed {len(lessons)} lessons:")
+                lines.append("\n".join(f"• {_lesson_line(e)}" for e in lessons))
+            summary = summaries.get(mission_id) if mission_id else None
+            if summary and not finished:
+                lines.append(f"Progress: {summary['completed']}/{summary['total']} lessons done.")
+        if finished:
+            lines.append(
+                f"Your learner has completed the full *{topic}* course!\n\n"
+                "All lessons finished. Well done to both of you!"
+            )
+        sections.append("\n\n".join(lines))
+
+    return "\n\n---\n\n".join(sections)
+
+
+def _lesson_line(event: NotificationOutbox) -> str:
+    title = event.payload.get("lesson_title", "a lesson")
+    forced = " _(moved on after max attempts)_" if event.payload.get("forced") else ""
+    return f"{title}{forced}"
+
+
+class NotificationDispatcher:
+    """Polls the outbox and delivers coalesced digests per recipient."""
+
+    def __init__(
+        self,
+        poll_interval: float,
+        coalesce_seconds: float,
+        batch_size: int = 200,
+        max_attempts: int = 5,
+        lease_seconds: float = 300.0,
+    ) -> None:
+        self.poll_interval = poll_interval
+        self.coalesce_seconds = coalesce_seconds
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="notification-dispatcher")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                delivered = await self.dispatch_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Notification dispatch failed")
+                delivered = 0
+            if not delivered:
+                await asyncio.sleep(self.poll_interval)
+
+    async def dispatch_once(self) -> int:
+        """Deliver one batch of digests. Returns the number of messages sent."""
+        claimed = await self._claim()
+        if not claimed:
+            return 0
+
+        messages = [(phone, digest) for _, phone, digest, _ in claimed if phone is not None]
+        results = iter(await send_many(messages))
+
+        sent = 0
+        sent_ids: list[uuid.UUID] = []
+        failed_ids: list[uuid.UUID] = []
+        for recipient_id, phone, _, event_ids in claimed:
+            outcome = (
+                LookupError(f"recipient {recipient_id} not found") if phone is None else next(results)
+            )
+            if isinstance(outcome, BaseException):
+                logger.error("Failed to notify %s: %s", recipient_id, outcome)
+                failed_ids.extend(event_ids)
+            else:
+                sent_ids.extend(event_ids)
+                sent += 1
+
+        await self._record(sent_ids, failed_ids)
+        return sent
+
+    async def _claim(self) -> list[tuple[uuid.UUID, str | None, str, list[uuid.UUID]]]:
+        """Mark due events 'sending' and render one digest per recipient."""
+        now = datetime.now(timezone.utc)
+        cutoff = now - timedelta(seconds=self.coalesce_seconds)
+        # Recipients whose oldest pending event has waited out the coalescing window.
+        due_recipients = (
+            select(NotificationOutbox.recipient_id)
+            .where(NotificationOutbox.status == "pending", NotificationOutbox.created_at <= cutoff)
+            .distinct()
+        )
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(NotificationOutbox)
+                .where(
+                    NotificationOutbox.status == "sending",
+                    NotificationOutbox.claimed_at < now - timedelta(seconds=self.lease_seconds),
+                )
+                .values(status="pending")
+            )
+            result = await db.execute(
+                select(NotificationOutbox)
+                .where(
+                    NotificationOutbox.status == "pending",
+                    NotificationOutbox.recipient_id.in_(due_recipients),
+                )
+                .order_by(NotificationOutbox.created_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            events = list(result.scalars().all())
+            if not events:
+                await db.commit()
+                return []
+
+            by_recipient: dict[uuid.UUID, list[NotificationOutbox]] = defaultdict(list)
+            for event in events:
+                event.status = "sending"
+                event.claimed_at = now
+                by_recipient[event.recipient_id].append(event)
+
+            phones = dict(
+                (
+                    await db.execute(
+                        select(User.id, User.phone_number).where(User.id.in_(by_recipient))
+                    )
+                ).all()
+            )
+            mission_ids = list({e.mission_id for e in events if e.mission_id})
+            summaries = await get_mission_progress_summaries(db, mission_ids)
+            await db.commit()
+
+        return [
+            (
+                recipient_id,
+                phones.get(recipient_id),
+                build_digest(recipient_events, summaries),
+                [e.id for e in recipient_events],
+            )
+            for recipient_id, recipient_events in by_recipient.items()
+        ]
+
+    async def _record(self, sent_ids: list[uuid.UUID], failed_ids: list[uuid.UUID]) -> None:
+        """Mark sent events; failed ones go back to pending until max_attempts."""
+        async with AsyncSessionLocal() as db:
+            if sent_ids:
+                await db.execute(
+                    update(NotificationOutbox)
+                    .where(NotificationOutbox.id.in_(sent_ids))
+                    .values(status="sent", sent_at=datetime.now(timezone.utc))
+                )
+            if failed_ids:
+                await db.execute(
+                    update(NotificationOutbox)
+                    .where(NotificationOutbox.id.in_(failed_ids))
+                    .values(
+                        attempts=NotificationOutbox.attempts + 1,
+                        status=case(
+                            (NotificationOutbox.attempts + 1 >= self.max_attempts, "failed"),
+                            else_="pending",
+                        ),
+                    )
+                )
+            await db.commit()
+
+
+notification_dispatcher = NotificationDispatcher(
+    poll_interval=settings.notification_poll_interval,
+    coalesce_seconds=settings.notification_coalesce_seconds,
+)
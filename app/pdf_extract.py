@@ -0,0 +1,126 @@
+"""
+Page-level PDF text extraction, fanned out across a process pool.
+
+Pages are split into contiguous ranges; each worker process opens the PDF
+once per range and returns one PageText per page. Only pages that really lack
+a text layer (almost no extractable text, but at least one image) are OCR'd,
+and those are rendered straight to a grayscale PGM (raw pixmap samples plus a
+header) that Tesseract reads directly, with no PNG encode/decode in between.
+
+iter_pdf_pages() yields pages in order as soon as each range is done, so
+callers can start on page 1 while the rest is still being extracted. Small
+documents are extracted inline; the pool isn't worth its overhead there.
+
+Kept free of heavy imports (no torch/whisper) so spawned workers start fast.
+"""
+
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+
+import pymupdf
+import pytesseract
+
+from app.config import settings
+
+
+@dataclass
+class PageText:
+    index: int  # 0-based page number
+    text: str
+    ocr: bool  # True if the text came from Tesseract rather than the text layer
+
+
+def _needs_ocr(page, text: str) -> bool:
+    """No real text layer: (almost) no text, but something drawn as an image."""
+    return len(text.strip()) < settings.pdf_ocr_min_chars and bool(page.get_images(full=False))
+
+
+def _ocr_page(page) -> str:
+    pix = page.get_pixmap(dpi=settings.pdf_ocr_dpi, colorspace=pymupdf.csGRAY, alpha=False)
+    fd, path = tempfile.mkstemp(suffix=".pgm")
+    os.close(fd)
+    try:
+        pix.save(path)
+        # A path (not a PIL image) is handed to tesseract as-is, without re-encoding.
+        return pytesseract.image_to_string(path, lang=settings.pdf_ocr_language)
+    finally:
+        os.unlink(path)
+
+
+def extract_page_range(pdf_path: str, start: int, stop: int) -> list[PageText]:
+    """Extract pages [start, stop). Runs in a worker process (or inline)."""
+    pages: list[PageText] = []
+    with pymupdf.open(pdf_path) as doc:
+        for index in range(start, min(stop, doc.page_count)):
+            page = doc[index]
+            text = page.get_text()
+            if _needs_ocr(page, text):
+                pages.append(PageText(index, _ocr_page(page), ocr=True))
+            else:
+                pages.append(PageText(index, text, ocr=False))
+    return pages
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pdf_pool() -> ProcessPoolExecutor:
+    """Get or start the shared extraction pool (spawned, so no forked event-loop threads)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.pdf_extract_workers or os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+    return _pool
+
+
+def shutdown_pdf_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def page_count(pdf_path: str) -> int:
+    with pymupdf.open(pdf_path) as doc:
+        return doc.page_count
+
+
+def iter_pdf_pages(pdf_path: str, pages_per_task: int | None = None) -> Iterator[PageText]:
+    """Yield every page's text in order, extracting ranges in parallel."""
+    per_task = pages_per_task or settings.pdf_pages_per_task
+    total = page_count(pdf_path)
+    if total <= per_task:
+        yield from extract_page_range(pdf_path, 0, total)
+        return
+
+    pool = get_pdf_pool()
+    futures: list[Future] = [
+        pool.submit(extract_page_range, pdf_path, start, start + per_task)
+        for start in range(0, total, per_task)
+    ]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        # Caller stopped early (or a range failed): don't keep the pool busy.
+        for future in futures:
+            future.cancel()
+
+
+def extract_pdf_text(pdf_path: str) -> str:
+    return "".join(page.text for page in iter_pdf_pages(pdf_path))
+
+
+def extract_pdf_pages(pdf_path: str) -> list[dict]:
+    """Per-page results as JSON-ready dicts (the extraction store's pdf_pages payload)."""
+    return [{"text": page.text, "ocr": page.ocr} for page in iter_pdf_pages(pdf_path)]
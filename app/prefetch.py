@@ -0,0 +1,123 @@
+"""
+Background prefetch of upcoming lessons for the WhatsApp flow.
+
+When a mission is activated or a lesson is delivered, the next lesson(s) are
+synthesized in the background and stored in Lesson.content_md so the learner
+doesn't wait on Tavily + Gemini at every transition.
+"""
+
+import asyncio
+import logging
+import uuid
+
+from sqlalchemy import or_, select, update
+
+from app.agent import PRIORITY_BACKGROUND, llm_priority
+from app.agent_bridge import generate_lesson_content
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import Lesson
+
+logger = logging.getLogger(__name__)
+
+
+class LessonPrefetcher:
+    """
+    Bounded pool of background lesson synthesis jobs.
+
+    Jobs are keyed on (mission_id, order_index): a lesson that is already being
+    generated is never scheduled twice, and foreground delivery can wait on the
+    in-flight job instead of starting its own generation. A job still queued
+    for a worker slot is cancelled instead, so the learner never waits behind
+    background work.
+    """
+
+    def __init__(self, ahead: int, max_workers: int) -> None:
+        self.ahead = ahead
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self._inflight: dict[tuple[uuid.UUID, int], asyncio.Task] = {}
+        self._started: set[tuple[uuid.UUID, int]] = set()
+
+    def schedule(self, mission_id: uuid.UUID, topic: str, after_order_index: int) -> None:
+        """Prefetch the `ahead` lessons following `after_order_index` (-1 = from the start)."""
+        for order_index in range(after_order_index + 1, after_order_index + 1 + self.ahead):
+            key = (mission_id, order_index)
+            if key in self._inflight:
+                continue
+            task = asyncio.create_task(self._prefetch(mission_id, topic, order_index))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t, k=key: self._done(k))
+
+    async def wait_for(self, mission_id: uuid.UUID, order_index: int) -> bool:
+        """
+        Wait for a running prefetch of this lesson. Returns True if one was running;
+        a prefetch still waiting for a worker slot is cancelled and False returned,
+        so the caller generates the lesson itself at foreground priority.
+        """
+        key = (mission_id, order_index)
+        task = self._inflight.get(key)
+        if task is None:
+            return False
+        if key not in self._started:
+            task.cancel()
+            return False
+        await asyncio.shield(task)
+        return True
+
+    def cancel_mission(self, mission_id: uuid.UUID) -> None:
+        """Drop all pending prefetches for a mission."""
+        for (m_id, _), task in list(self._inflight.items()):
+            if m_id == mission_id:
+                task.cancel()
+
+    def _done(self, key: tuple[uuid.UUID, int]) -> None:
+        self._inflight.pop(key, None)
+        self._started.discard(key)
+
+    async def _prefetch(self, mission_id: uuid.UUID, topic: str, order_index: int) -> None:
+        try:
+            async with self._semaphore:
+                self._started.add((mission_id, order_index))
+                with llm_priority(PRIORITY_BACKGROUND):
+                    await self._fill(mission_id, topic, order_index)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Lesson prefetch failed (mission=%s, lesson=%d)", mission_id, order_index)
+
+    async def _fill(self, mission_id: uuid.UUID, topic: str, order_index: int) -> None:
+        # Short sessions on either side of generation: don't hold a pooled
+        # connection idle in transaction for the whole Tavily + Gemini call.
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Lesson.id, Lesson.title, Lesson.content_md, Lesson.research_json).where(
+                    Lesson.mission_id == mission_id,
+                    Lesson.order_index == order_index,
+                )
+            )
+            row = result.one_or_none()
+        if row is None or row.content_md:
+            return
+
+        # Raises on LLM/search failure: nothing is stored, so delivery regenerates
+        # the lesson rather than serving a placeholder forever.
+        content = await generate_lesson_content(topic, row.title, "", row.research_json)
+
+        async with AsyncSessionLocal() as db:
+            # Only fill if nobody else has written content in the meantime.
+            await db.execute(
+                update(Lesson)
+                .where(
+                    Lesson.id == row.id,
+                    or_(Lesson.content_md.is_(None), Lesson.content_md == ""),
+                )
+                .values(content_md=content)
+            )
+            await db.commit()
+        logger.info("Prefetched lesson %d of mission %s", order_index, mission_id)
+
+
+lesson_prefetcher = LessonPrefetcher(
+    ahead=settings.lesson_prefetch_ahead,
+    max_workers=settings.lesson_prefetch_workers,
+)
@@ -0,0 +1,82 @@
+"""
+Eager per-lesson research at mission creation (optional, EAGER_RESEARCH=true).
+
+As soon as an outline is saved, the Tavily search for every lesson runs in the
+background while the goal-setter is still reviewing the outline. Results are
+stored in Lesson.research_json, so later synthesis only needs the LLM call.
+Cancelling the mission cancels whatever is still running, and results are
+never written to a cancelled mission.
+"""
+
+import asyncio
+import logging
+import uuid
+
+from sqlalchemy import select, update
+
+from app.agent_bridge import research_lesson
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import Lesson, Mission
+
+logger = logging.getLogger(__name__)
+
+
+class LessonResearcher:
+    """Bounded fan-out of per-lesson Tavily searches, grouped by mission."""
+
+    def __init__(self, enabled: bool, max_workers: int) -> None:
+        self.enabled = enabled
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self._inflight: dict[uuid.UUID, set[asyncio.Task]] = {}
+
+    def schedule(self, mission_id: uuid.UUID, topic: str, lessons: list[tuple[uuid.UUID, str]]) -> None:
+        """Research each (lesson_id, title) in the background. No-op unless enabled."""
+        if not self.enabled:
+            return
+        tasks = self._inflight.setdefault(mission_id, set())
+        for lesson_id, title in lessons:
+            task = asyncio.create_task(self._research(mission_id, topic, lesson_id, title))
+            tasks.add(task)
+            task.add_done_callback(lambda t, m=mission_id: self._done(m, t))
+
+    def cancel_mission(self, mission_id: uuid.UUID) -> None:
+        """Discard all pending research for a mission."""
+        for task in list(self._inflight.get(mission_id, ())):
+            task.cancel()
+
+    def _done(self, mission_id: uuid.UUID, task: asyncio.Task) -> None:
+        tasks = self._inflight.get(mission_id)
+        if tasks is not None:
+            tasks.discard(task)
+            if not tasks:
+                del self._inflight[mission_id]
+
+    async def _research(self, mission_id: uuid.UUID, topic: str, lesson_id: uuid.UUID, title: str) -> None:
+        try:
+            async with self._semaphore:
+                research = await research_lesson(topic, title)
+            if "error" in research:
+                logger.warning("Eager research failed for %r: %s", title, research["error"])
+                return
+            async with AsyncSessionLocal() as db:
+                # Another process may have cancelled the mission meanwhile.
+                live_mission = select(Mission.id).where(
+                    Mission.id == mission_id, Mission.status != "cancelled"
+                )
+                await db.execute(
+                    update(Lesson)
+                    .where(Lesson.id == lesson_id, Lesson.mission_id.in_(live_mission))
+                    .values(research_json=research)
+                )
+                await db.commit()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Eager research failed (mission=%s, lesson=%s)", mission_id, lesson_id)
+
+
+lesson_researcher = LessonResearcher(
+    enabled=settings.eager_research,
+    max_workers=settings.eager_research_workers,
+)
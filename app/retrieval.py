@@ -0,0 +1,216 @@
+"""
+Chunked BM25 retrieval for PDF Q&A.
+
+Extracted pages are split into overlapping word windows (chunks keep the page
+they start on). Chunks are indexed with Okapi BM25 and the index is persisted
+as JSON under RETRIEVAL_INDEX_DIR, one file per document namespace
+(Document.vector_namespace; "pdf-<sha256>" for uploads), so it is built once
+per distinct file. A question then sends only the top-k chunks to Gemini
+instead of the whole document.
+
+BM25 rather than embeddings: no model to load at request time, and handouts
+are mostly answered by the passages sharing the question's terms.
+"""
+
+import json
+import math
+import os
+import re
+import threading
+import uuid
+from collections import Counter, OrderedDict
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from app.config import settings
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Bump when chunking or tokenization changes so persisted indexes are rebuilt.
+INDEX_VERSION = 1
+
+_TOKEN = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    """
+    a an and are as at be been but by can could did do does for from had has have how i if in
+    into is it its of on or so than that the their them then there these they this those to
+    was we were what when where which who whom why will with would you your
+    """.split()
+)
+
+
+def _stem(word: str) -> str:
+    # Crude suffix stripping so "clears"/"cleared"/"clear" share a term.
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    return [
+        _stem(t) for t in _TOKEN.findall(text.casefold()) if t not in _STOPWORDS and len(t) > 1
+    ]
+
+
+@dataclass
+class Chunk:
+    page: int  # 0-based page the chunk starts on
+    text: str
+
+
+def chunk_pages(pages: list[str], chunk_words: int, overlap_words: int) -> list[Chunk]:
+    """Overlapping windows of `chunk_words` words across page boundaries."""
+    words: list[str] = []
+    word_pages: list[int] = []
+    for page_no, text in enumerate(pages):
+        page_words = text.split()
+        words.extend(page_words)
+        word_pages.extend([page_no] * len(page_words))
+
+    step = max(chunk_words - overlap_words, 1)
+    chunks: list[Chunk] = []
+    for start in range(0, len(words), step):
+        window = words[start : start + chunk_words]
+        chunks.append(Chunk(word_pages[start], " ".join(window)))
+        if start + chunk_words >= len(words):
+            break
+    return chunks
+
+
+# Page texts, or a callable producing them when the index has to be built.
+Pages = list[str] | Callable[[], list[str]]
+
+
+class BM25Index:
+    def __init__(
+        self,
+        chunks: list[Chunk],
+        postings: dict[str, list[tuple[int, int]]],
+        lengths: list[int],
+    ) -> None:
+        self.chunks = chunks
+        self.postings = postings  # term -> [(chunk id, term frequency)]
+        self.lengths = lengths
+        self.avg_length = sum(lengths) / len(lengths) if lengths else 0.0
+
+    @classmethod
+    def build(cls, chunks: list[Chunk]) -> "BM25Index":
+        postings: dict[str, list[tuple[int, int]]] = {}
+        lengths: list[int] = []
+        for chunk_id, chunk in enumerate(chunks):
+            terms = tokenize(chunk.text)
+            lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                postings.setdefault(term, []).append((chunk_id, tf))
+        return cls(chunks, postings, lengths)
+
+    def search(self, query: str, k: int) -> list[tuple[float, int]]:
+        """Top-k (score, chunk id) by BM25, best first; chunks sharing no term are omitted."""
+        n = len(self.chunks)
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for chunk_id, tf in posting:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[chunk_id] / self.avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(score, chunk_id) for chunk_id, score in best]
+
+    def to_json(self) -> dict:
+        return {
+            "version": INDEX_VERSION,
+            "chunks": [asdict(chunk) for chunk in self.chunks],
+            "postings": self.postings,
+            "lengths": self.lengths,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "BM25Index":
+        return cls(
+            [Chunk(**chunk) for chunk in data["chunks"]],
+            {term: [tuple(p) for p in posting] for term, posting in data["postings"].items()},
+            data["lengths"],
+        )
+
+
+def pdf_namespace(sha256: str) -> str:
+    """Namespace (Document.vector_namespace) of the index for a PDF's bytes."""
+    return f"pdf-{sha256}"
+
+
+class IndexStore:
+    """Indexes persisted as JSON files per namespace, with a small in-memory LRU."""
+
+    def __init__(self, root: str, memory_entries: int = 32) -> None:
+        self.root = Path(root)
+        self.memory_entries = memory_entries
+        self._lru: OrderedDict[str, BM25Index] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, namespace: str) -> Path:
+        return self.root / f"{namespace}.json"
+
+    def get(self, namespace: str) -> BM25Index | None:
+        with self._lock:
+            index = self._lru.get(namespace)
+            if index is not None:
+                self._lru.move_to_end(namespace)
+                return index
+        try:
+            with open(self._path(namespace), encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        if data.get("version") != INDEX_VERSION:
+            return None
+        index = BM25Index.from_json(data)
+        self._remember(namespace, index)
+        return index
+
+    def put(self, namespace: str, index: BM25Index) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._path(namespace)
+        # Unique per write: concurrent first builds of one PDF (same process
+        # or not) each replace the file from their own temp file.
+        tmp = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp.write_text(json.dumps(index.to_json()), encoding="utf-8")
+        os.replace(tmp, path)
+        self._remember(namespace, index)
+
+    def get_or_build(self, namespace: str, pages: Pages) -> BM25Index:
+        """Persisted index for `namespace`; `pages` (or pages()) is only used to build it."""
+        index = self.get(namespace)
+        if index is None:
+            pages = pages() if callable(pages) else pages
+            chunks = chunk_pages(pages, settings.retrieval_chunk_words, settings.retrieval_overlap_words)
+            index = BM25Index.build(chunks)
+            self.put(namespace, index)
+        return index
+
+    def _remember(self, namespace: str, index: BM25Index) -> None:
+        with self._lock:
+            self._lru[namespace] = index
+            self._lru.move_to_end(namespace)
+            while len(self._lru) > self.memory_entries:
+                self._lru.popitem(last=False)
+
+
+index_store = IndexStore(settings.retrieval_index_dir)
+
+
+def retrieve(namespace: str, pages: Pages, question: str, k: int | None = None) -> list[Chunk]:
+    """Top-k chunks for `question`, in document order; every chunk if the document is small."""
+    index = index_store.get_or_build(namespace, pages)
+    k = k or settings.retrieval_top_k
+    if len(index.chunks) <= k:
+        return index.chunks
+    hits = index.search(question, k)
+    if not hits:
+        # No term overlap at all (e.g. a "summarize this" question): fall back to the opening.
+        return index.chunks[:k]
+    return [index.chunks[chunk_id] for chunk_id in sorted(chunk_id for _, chunk_id in hits)]
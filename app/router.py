@@ -1,37 +1,45 @@
 """
 WhatsApp state machine — dual-user flow (goal-setter vs learner).
 Phase 4: full lesson delivery, confusion scoring, adaptive retry, completion.
+
+Handlers work on a ConversationContext loaded once per message and only mutate
+ORM state; the caller commits once after route_message returns.
 """
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.agent_bridge import get_lesson_content, get_outline, score_confusion, simplify_lesson
+from app.agent_bridge import get_lesson_content, get_outline, score_confusion
 from app.models import User
+from app.prefetch import lesson_prefetcher
+from app.research import lesson_researcher
 from app.services import (
+    ConversationContext,
     activate_mission,
     cancel_mission,
     complete_lesson,
     create_mission_with_outline,
-    create_or_get_progress,
-    get_active_mission_as_learner,
-    get_current_lesson,
-    get_current_progress,
+    enqueue_notification,
     get_mission_by_id,
-    get_mission_progress_summary,
-    get_next_lesson,
+    load_lesson_content,
+    load_lesson_research,
     record_attempt,
     set_user_state,
+    start_progress,
 )
+from app.session_state import set_state_by_id
+from app.tracing import current_span, traced
+from app.variants import lesson_variants
 from app.whatsapp import send_message
 
 CONFUSION_THRESHOLD = 0.65
 MAX_ATTEMPTS = 3
 
 
+@traced("router.route_message")
 async def route_message(
     db: AsyncSession,
-    user: User,
+    ctx: ConversationContext,
     body: str,
     media_url: str | None,
     media_type: str | None,
@@ -40,8 +48,10 @@ async def route_message(
     Returns (reply_text, reply_media_url).
     reply_media_url is None for text-only replies.
     """
+    user = ctx.user
     state = user.wa_session_state or "idle"
     body_clean = body.strip().lower()
+    current_span().set(state=state)
 
     # ── SHARED: any user can type 'help' or 'reset' ──────────────────
     if body_clean in ("help", "reset", "start over"):
@@ -58,7 +68,7 @@ async def route_message(
             await set_user_state(db, user, "creating_mission")
             return await handle_creating_mission(db, user, body)
 
-        mission = await get_active_mission_as_learner(db, user.id)
+        mission = ctx.mission
         if mission:
             await set_user_state(db, user, "mission_notified")
             return (
@@ -96,24 +106,22 @@ async def route_message(
     # ── LEARNER: mission notified → deliver first lesson ─────────────
     if state == "mission_notified":
         if body_clean in ("start", "yes", "ready", "ok", "begin"):
-            mission = await get_active_mission_as_learner(db, user.id)
-            if not mission:
+            if not ctx.mission:
                 await set_user_state(db, user, "idle")
                 return ("Couldn't find your mission. Ask your mentor to resend it.", None)
-            return await deliver_lesson(db, user, mission)
+            return await deliver_lesson(db, ctx)
         return ("Reply *start* when you're ready to begin your lesson!", None)
 
     # ── LEARNER: mid-lesson → evaluate response ───────────────────────
     if state == "in_lesson":
-        mission = await get_active_mission_as_learner(db, user.id)
-        if not mission:
+        if not ctx.mission:
             await set_user_state(db, user, "idle")
             return ("No active mission found. Ask your mentor to set one up.", None)
         # If the learner replies "yes/start/ready" they may just be acknowledging
         # the "Loading..." message — re-deliver the current lesson instead of scoring.
         if body_clean in ("yes", "y", "start", "ok", "ready", "begin", "next"):
-            return await deliver_lesson(db, user, mission)
-        return await evaluate_response(db, user, mission, body, media_url, media_type)
+            return await deliver_lesson(db, ctx)
+        return await evaluate_response(db, ctx, body, media_url, media_type)
 
     # ── FALLBACK ─────────────────────────────────────────────────────
     return (
@@ -177,6 +185,12 @@ async def handle_creating_mission(
     )
 
     await set_user_state(db, user, f"confirming_outline:{mission.id}")
+    if lesson_researcher.enabled:
+        # Research writes to the lesson rows, so they must be committed first.
+        await db.commit()
+        lesson_researcher.schedule(
+            mission.id, topic, [(lesson.id, lesson.title) for lesson in mission.lessons]
+        )
     return (
         f"Here's the lesson plan for *{topic}*:\n\n"
         f"{outline_text}\n\n"
@@ -204,13 +218,15 @@ async def handle_confirming_outline(
 
         await activate_mission(db, mission, learner)
         await set_user_state(db, user, "monitoring")
+        # Commit before notifying: the learner may reply as soon as the message lands.
+        await db.commit()
+        lesson_prefetcher.schedule(mission.id, mission.topic, after_order_index=-1)
 
-        outline_len = len(mission.outline_json) if mission.outline_json else 0
         await send_message(
             learner.phone_number,
             f"Hi! *{user.phone_number}* has set up a learning mission for you:\n\n"
             f"*{mission.topic}*\n\n"
-            f"There are {outline_len} lessons waiting for you.\n\n"
+            f"There are {mission.lessons_total} lessons waiting for you.\n\n"
             "Reply *start* when you're ready to begin!",
         )
         return (
@@ -221,6 +237,8 @@ async def handle_confirming_outline(
 
     if body_lower in ("no", "n", "cancel", "nope"):
         await cancel_mission(db, mission)
+        lesson_researcher.cancel_mission(mission.id)
+        lesson_prefetcher.cancel_mission(mission.id)
         await set_user_state(db, user, "idle")
         return (
             "Mission cancelled. Send another message anytime to create a new one.",
@@ -233,12 +251,17 @@ async def handle_confirming_outline(
 # ── Learner handlers ──────────────────────────────────────────────────────────
 
 async def deliver_lesson(
-    db: AsyncSession, user: User, mission
+    db: AsyncSession, ctx: ConversationContext
 ) -> tuple[str, str | None]:
     """Fetch or generate lesson content and send it to the learner."""
-    lesson = await get_current_lesson(db, mission.id)
+    user, mission = ctx.user, ctx.mission
+    lesson = ctx.current_lesson
     if not lesson:
-        return await handle_mission_complete(db, user, mission)
+        return await handle_mission_complete(db, ctx)
+
+    await load_lesson_content(db, lesson)
+    if not lesson.content_md and await lesson_prefetcher.wait_for(mission.id, lesson.order_index):
+        await db.refresh(lesson, ["content_md"])
 
     if not lesson.content_md:
         await send_message(
@@ -249,19 +272,20 @@ async def deliver_lesson(
         # rather than being scored as a lesson answer.
         await set_user_state(db, user, "mission_notified")
         try:
-            content = await get_lesson_content(mission.topic, lesson.title, "")
-            lesson.content_md = content
-            await db.commit()
+            research = await load_lesson_research(db, lesson)
+            lesson.content_md = await get_lesson_content(mission.topic, lesson.title, "", research)
         except Exception as e:
             return (
                 f"Sorry, couldn't load that lesson right now. Try again? ({e})",
                 None,
             )
 
-    await create_or_get_progress(db, user.id, mission.id, lesson.id)
+    if ctx.progress is None:
+        ctx.progress = start_progress(db, user.id, mission.id, lesson.id)
     await set_user_state(db, user, "in_lesson")
+    lesson_prefetcher.schedule(mission.id, mission.topic, after_order_index=lesson.order_index)
 
-    summary = await get_mission_progress_summary(db, mission.id)
+    summary = ctx.progress_summary()
     progress_line = f"_Lesson {summary['completed'] + 1} of {summary['total']}_\n\n"
 
     return (
@@ -276,35 +300,35 @@ async def deliver_lesson(
 
 async def evaluate_response(
     db: AsyncSession,
-    user: User,
-    mission,
+    ctx: ConversationContext,
     body: str,
     media_url: str | None,
     media_type: str | None,
 ) -> tuple[str, str | None]:
     """Score the learner's reply and advance or retry."""
-    lesson = await get_current_lesson(db, mission.id)
+    mission = ctx.mission
+    lesson = ctx.current_lesson
     if not lesson:
-        return await handle_mission_complete(db, user, mission)
+        return await handle_mission_complete(db, ctx)
 
-    progress = await get_current_progress(db, user.id, mission.id)
+    progress = ctx.progress
     if not progress:
-        return await deliver_lesson(db, user, mission)
+        return await deliver_lesson(db, ctx)
 
-    confusion = await score_confusion(lesson.content_md or "", body)
+    content = await load_lesson_content(db, lesson) or ""
+    confusion = await score_confusion(content, body)
     await record_attempt(db, progress, confusion)
 
     # Force-advance after MAX_ATTEMPTS regardless of score
     if progress.attempts >= MAX_ATTEMPTS:
-        await complete_lesson(db, progress, lesson)
-        await _notify_goal_setter(db, mission, lesson, user, forced=True)
-        next_lesson = await get_next_lesson(db, mission.id, lesson.order_index)
-        if not next_lesson:
-            return await handle_mission_complete(db, user, mission)
-        return await deliver_lesson(db, user, mission)
+        await complete_lesson(db, progress, lesson, mission=mission, forced=True)
+        ctx.progress = None
+        if not ctx.next_lesson_after(lesson.order_index):
+            return await handle_mission_complete(db, ctx)
+        return await deliver_lesson(db, ctx)
 
     if confusion > CONFUSION_THRESHOLD:
-        simplified = await simplify_lesson(lesson.content_md or "")
+        simplified = await lesson_variants.simplified(db, lesson.id, content, progress.attempts)
         attempts_left = MAX_ATTEMPTS - progress.attempts
         return (
             f"Let me explain that differently!\n\n"
@@ -316,61 +340,40 @@ async def evaluate_response(
             None,
         )
 
-    # Understood — advance
-    await complete_lesson(db, progress, lesson)
-    await _notify_goal_setter(db, mission, lesson, user)
+    # Understood — advance (goal-setter is notified via the outbox)
+    await complete_lesson(db, progress, lesson, mission=mission)
+    ctx.progress = None
 
-    next_lesson = await get_next_lesson(db, mission.id, lesson.order_index)
-    if not next_lesson:
-        return await handle_mission_complete(db, user, mission)
+    if not ctx.next_lesson_after(lesson.order_index):
+        return await handle_mission_complete(db, ctx)
 
     # Deliver next lesson immediately
     great_job = "Great job! You understood that well.\n\n"
-    next_reply, media = await deliver_lesson(db, user, mission)
+    next_reply, media = await deliver_lesson(db, ctx)
     return (great_job + next_reply, media)
 
 
 async def handle_mission_complete(
-    db: AsyncSession, user: User, mission
+    db: AsyncSession, ctx: ConversationContext
 ) -> tuple[str, str | None]:
     from datetime import datetime, timezone
 
+    user, mission = ctx.user, ctx.mission
     mission.status = "completed"
     mission.completed_at = datetime.now(timezone.utc)
-    await set_user_state(db, user, "idle")
-    await db.commit()
-
-    result = await db.execute(select(User).where(User.id == mission.goal_setter_id))
-    goal_setter = result.scalar_one_or_none()
-    if goal_setter:
-        await send_message(
-            goal_setter.phone_number,
-            f"Your learner has completed the full *{mission.topic}* course!\n\n"
-            "All lessons finished. Well done to both of you!",
-        )
-        await set_user_state(db, goal_setter, "idle")
+    user.wa_session_state = "idle"
+    # Goal-setter hears about it from the outbox dispatcher, not on the learner's path.
+    enqueue_notification(
+        db,
+        recipient_id=mission.goal_setter_id,
+        mission_id=mission.id,
+        kind="mission_completed",
+        payload={"topic": mission.topic},
+    )
+    await set_state_by_id(db, mission.goal_setter_id, "idle")
 
     return (
         f"Congratulations! You've completed all lessons on *{mission.topic}*!\n\n"
         "You can start a new learning mission anytime by messaging again.",
         None,
     )
-
-
-async def _notify_goal_setter(
-    db: AsyncSession, mission, lesson, learner: User, forced: bool = False
-) -> None:
-    result = await db.execute(select(User).where(User.id == mission.goal_setter_id))
-    goal_setter = result.scalar_one_or_none()
-    if not goal_setter:
-        return
-
-    summary = await get_mission_progress_summary(db, mission.id)
-    forced_note = " _(moved on after max attempts)_" if forced else ""
-
-    await send_message(
-        goal_setter.phone_number,
-        f"*{mission.topic}* update:\n\n"
-        f"Your learner completed: *{lesson.title}*{forced_note}\n\n"
-        f"Progress: {summary['completed']}/{summary['total']} lessons done.",
-    )
@@ -1,17 +1,35 @@
 """
 API routes for LearnADo application.
 All endpoints for file upload, processing, and retrieval.
+
+Uploads are streamed to disk by app.uploads; extraction and Gemini calls run
+on its worker pool so the event loop (and the WhatsApp webhook) stays free.
+POST /upload only stores the file and queues a processing job (app.jobs);
+results are polled or long-polled under /process/{upload_id}.
 """
+import uuid
+
 from fastapi import APIRouter, UploadFile, File, HTTPException, Form
-from app.utils import transcribe_audio, query_pdf, process_image, query_audio
-from pathlib import Path
-import shutil
+from fastapi.responses import JSONResponse
+from app.config import settings
+from app.extraction_store import IMAGE_OCR, PDF_PAGES, TRANSCRIPT, extraction_store
+from app.jobs import job_kind, job_runner
+from app.models import ProcessingJob
+from app.pdf_extract import extract_pdf_pages
+from app.retrieval import pdf_namespace, retrieve
+from app.schemas import ProcessingJobOut, UploadOut
+from app.uploads import ingest_upload, processing_pool, run_blocking
+from app.utils import (
+    answer_audio_question,
+    answer_image_query,
+    answer_pdf_question,
+    answer_pdf_question_from_chunks,
+    ocr_image,
+    transcribe_audio,
+)
 
 router = APIRouter()
 
-UPLOAD_DIR = Path("data/uploads")
-UPLOAD_DIR.mkdir(exist_ok=True, parents=True)
-
 @router.post("/transcribe")
 async def transcribe(file: UploadFile = File(...)):
     """
@@ -19,31 +37,46 @@ async def transcribe(file: UploadFile = File(...)):
     """
     try:
         # Save uploaded file
-        file_path = UPLOAD_DIR / file.filename
-        with open(file_path, "wb") as f:
-            shutil.copyfileobj(file.file, f)
-        
-        # Run Whisper transcription
-        text = transcribe_audio(str(file_path))
-        return {"filename": file.filename, "transcription": text}
-    
+        upload = await ingest_upload(file)
+
+        # Run Whisper transcription (once per distinct file)
+        text = await extraction_store.get_or_extract(
+            upload.sha256, TRANSCRIPT, lambda: transcribe_audio(str(upload.path)), processing_pool()
+        )
+        return {"filename": upload.filename, "transcription": text}
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # --- PDF Q&A ---
 @router.post("/pdf-query")
-async def pdf_query(file: UploadFile = File(...), question: str = Form(...)):
+async def pdf_query(
+    file: UploadFile = File(...),
+    question: str = Form(...),
+    mode: str | None = Form(None),
+):
     """
     Upload a PDF and ask a question about it.
+    mode "retrieval" sends only the most relevant chunks to Gemini, "full" the
+    whole text (default: PDF_QUERY_MODE).
     """
     try:
-        file_path = UPLOAD_DIR / file.filename
-        with open(file_path, "wb") as f:
-            shutil.copyfileobj(file.file, f)
-        
-        answer = query_pdf(str(file_path), question)
-        return {"filename": file.filename, "question": question, "answer": answer}
+        upload = await ingest_upload(file)
+        pages = await extraction_store.get_or_extract(
+            upload.sha256, PDF_PAGES, lambda: extract_pdf_pages(str(upload.path)), processing_pool()
+        )
+        texts = [page["text"] for page in pages]
+        if (mode or settings.pdf_query_mode) == "full":
+            answer = await run_blocking(answer_pdf_question, "".join(texts), question)
+        else:
+            chunks = await run_blocking(retrieve, pdf_namespace(upload.sha256), texts, question)
+            answer = await run_blocking(answer_pdf_question_from_chunks, chunks, question)
+        return {"filename": upload.filename, "question": question, "answer": answer}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -58,12 +91,14 @@ async def image_query(
     Upload an image → OCR with Tesseract → send text+image to Gemini.
     """
     try:
-        file_path = UPLOAD_DIR / file.filename
-        with open(file_path, "wb") as f:
-            shutil.copyfileobj(file.file, f)
-
-        response = process_image(str(file_path), query)
-        return {"filename": file.filename, "query": query, "response": response}
+        upload = await ingest_upload(file)
+        extracted_text = await extraction_store.get_or_extract(
+            upload.sha256, IMAGE_OCR, lambda: ocr_image(str(upload.path)), processing_pool()
+        )
+        response = await run_blocking(answer_image_query, str(upload.path), query, extracted_text)
+        return {"filename": upload.filename, "query": query, "response": response}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -74,46 +109,113 @@ async def audio_query(file: UploadFile = File(...), question: str = Form(...)):
     Upload audio → Whisper transcription → ask Gemini about it.
     """
     try:
-        file_path = UPLOAD_DIR / file.filename
-        with open(file_path, "wb") as f:
-            shutil.copyfileobj(file.file, f)
+        upload = await ingest_upload(file)
+        transcription = await extraction_store.get_or_extract(
+            upload.sha256, TRANSCRIPT, lambda: transcribe_audio(str(upload.path)), processing_pool()
+        )
+        answer = await run_blocking(answer_audio_question, transcription, question)
+        return {"filename": upload.filename, "question": question, "answer": answer}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        answer = query_audio(str(file_path), question)
-        return {"filename": file.filename, "question": question, "answer": answer}
+# --- Upload + background processing ---
+def _job_out(job: ProcessingJob) -> dict:
+    out = ProcessingJobOut.model_validate(job).model_dump(mode="json")
+    out["queue_seconds"] = (
+        (job.started_at - job.created_at).total_seconds() if job.started_at else None
+    )
+    out["run_seconds"] = (
+        (job.finished_at - job.started_at).total_seconds()
+        if job.started_at and job.finished_at else None
+    )
+    return out
+
+
+@router.post("/upload", status_code=202)
+async def upload_file(file: UploadFile = File(...), process: bool = Form(True)):
+    """
+    Upload a PDF, image or audio file; returns its id at once.
+    Extraction runs in the background (unless process=false); poll
+    /process/{upload_id}/status or /process/{upload_id}/result?wait=N.
+    """
+    kind = job_kind(file.filename or "", file.content_type)
+    if kind is None:
+        raise HTTPException(status_code=400, detail="Unsupported file type (expected PDF, image or audio)")
+    try:
+        stored = await ingest_upload(file)
+        upload = await job_runner.record_upload(stored, file.content_type)
+        job = await job_runner.submit(upload, kind) if process else None
+        return {
+            "upload": UploadOut.model_validate(upload).model_dump(mode="json"),
+            "job": _job_out(job) if job else None,
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# TODO: Import local modules
-# from app.schemas import *
-# from app.services import *
-# from app.database import get_db
 
-# Create router
-# router = APIRouter()
+@router.post("/process/{upload_id}", status_code=202)
+async def start_processing(upload_id: uuid.UUID):
+    """
+    Queue processing of an upload; returns the existing job if one is queued,
+    running or already done (a failed job is retried).
+    """
+    upload = await job_runner.get_upload(upload_id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    kind = job_kind(upload.filename, upload.content_type)
+    if kind is None:
+        raise HTTPException(status_code=400, detail="Unsupported file type")
+    job = await job_runner.submit(upload, kind)
+    return _job_out(job)
+
+
+@router.get("/process/{upload_id}/status")
+async def processing_status(upload_id: uuid.UUID):
+    """
+    Latest job for an upload with its status and queue/run timings.
+    """
+    job = await job_runner.latest_job(upload_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No processing job for this upload")
+    return _job_out(job)
+
+
+@router.get("/process/{upload_id}/result")
+async def processing_result(upload_id: uuid.UUID, wait: float = 0):
+    """
+    Result of the latest job. With wait=N, hold the request up to N seconds
+    (capped at JOB_LONG_POLL_MAX_SECONDS) for the job to finish; 202 while
+    still queued or running.
+    """
+    timeout = min(max(wait, 0), settings.job_long_poll_max_seconds)
+    job = await job_runner.wait(upload_id, timeout)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No processing job for this upload")
+    out = _job_out(job)
+    if job.status == "succeeded":
+        try:
+            out["result"] = (await job_runner.read_result(job))["result"]
+        except FileNotFoundError:
+            raise HTTPException(status_code=410, detail="Result file is gone; queue processing again")
+        return out
+    if job.status == "failed":
+        return out
+    return JSONResponse(status_code=202, content=out)
 
 # TODO: File Upload Endpoints
-# - POST /upload: Upload a file (PDF, image, or audio)
 # - GET /uploads: List all uploaded files
 # - GET /uploads/{upload_id}: Get specific upload details
 # - DELETE /uploads/{upload_id}: Delete an upload
 
-# TODO: Processing Endpoints
-# - POST /process/{upload_id}: Start processing a file
-# - GET /process/{upload_id}/status: Get processing status
-# - GET /process/{upload_id}/result: Get processing results
-
 # TODO: File Type Specific Endpoints
 # - POST /process/pdf/{upload_id}: Process PDF specifically
 # - POST /process/image/{upload_id}: Process image specifically
 # - POST /process/audio/{upload_id}: Process audio specifically
 
 # TODO: Utility Endpoints
-# - GET /health: Health check
 # - GET /files/{file_id}/download: Download processed file
 # - GET /logs/{upload_id}: Get processing logs
-
-# TODO: Error handling
-# - 400: Bad request (invalid file type, missing parameters)
-# - 404: File not found
-# - 500: Processing error
-# - 413: File too large
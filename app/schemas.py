@@ -162,6 +162,30 @@ class DocumentOut(_Base):
     uploaded_at: datetime
 
 
+# ── Uploads / processing jobs ─────────────────────────────────────────────────
+
+class UploadOut(_Base):
+    id: uuid.UUID
+    filename: str
+    content_type: str | None
+    sha256: str
+    size_bytes: int
+    created_at: datetime
+
+
+class ProcessingJobOut(_Base):
+    id: uuid.UUID
+    upload_id: uuid.UUID
+    kind: str
+    status: str
+    attempts: int
+    error: str | None
+    result_bytes: int | None
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
+
+
 # ── Generic responses ─────────────────────────────────────────────────────────
 
 class HealthResponse(BaseModel):
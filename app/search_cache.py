@@ -0,0 +1,274 @@
+"""
+Shared Tavily search cache with single-flight request coalescing.
+
+Identical queries within the TTL are served from a local SQLite file (or an
+in-memory dict when no path is configured), so repeated missions and CLI runs
+skip the network. Concurrent callers asking for the same query while it is in
+flight wait on the one running request instead of issuing their own. Expired
+entries are purged every `evict_every` writes, so the cache doesn't grow without
+bound.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from tavily import AsyncTavilyClient, TavilyClient
+
+from app.config import settings
+from app.tracing import tracer
+
+_tavily_client: TavilyClient | None = None
+_async_tavily_client: AsyncTavilyClient | None = None
+_client_lock = threading.Lock()
+
+
+def _get_tavily_api_key() -> str:
+    return settings.tavily_api_key or os.getenv("TAVILY_API_KEY") or ""
+
+
+def get_tavily_client() -> TavilyClient:
+    """Get or initialize the shared TavilyClient instance."""
+    global _tavily_client
+    with _client_lock:
+        if _tavily_client is None:
+            _tavily_client = TavilyClient(_get_tavily_api_key())
+    return _tavily_client
+
+
+def get_async_tavily_client() -> AsyncTavilyClient:
+    """Get or initialize the shared AsyncTavilyClient instance."""
+    global _async_tavily_client
+    if _async_tavily_client is None:
+        _async_tavily_client = AsyncTavilyClient(_get_tavily_api_key())
+    return _async_tavily_client
+
+
+class MemorySearchBackend:
+    def __init__(self) -> None:
+        self._data: dict[str, tuple[float, dict]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, max_age: float) -> dict | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            stored_at, response = entry
+            if time.time() - stored_at >= max_age:
+                del self._data[key]
+                return None
+            return response
+
+    def put(self, key: str, response: dict) -> None:
+        with self._lock:
+            self._data[key] = (time.time(), response)
+
+    def evict_expired(self, max_age: float) -> int:
+        cutoff = time.time() - max_age
+        with self._lock:
+            expired = [k for k, (t, _) in self._data.items() if t < cutoff]
+            for k in expired:
+                del self._data[k]
+        return len(expired)
+
+
+class SqliteSearchBackend:
+    def __init__(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_cache ("
+            " key TEXT PRIMARY KEY, stored_at REAL NOT NULL, response TEXT NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: str, max_age: float) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM search_cache WHERE key = ? AND stored_at >= ?",
+                (key, time.time() - max_age),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, response: dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, stored_at, response) VALUES (?, ?, ?)",
+                (key, time.time(), json.dumps(response)),
+            )
+
+    def evict_expired(self, max_age: float) -> int:
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM search_cache WHERE stored_at < ?", (time.time() - max_age,)
+            )
+        return cur.rowcount
+
+
+class _InFlight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.response: dict | None = None
+        self.error: BaseException | None = None
+
+
+class _LeaderCancelled(Exception):
+    """Set on a shared Future when its leader is cancelled; waiters retry."""
+
+
+class SearchCache:
+    """TTL cache in front of TavilyClient.search with single-flight coalescing."""
+
+    def __init__(
+        self,
+        backend: MemorySearchBackend | SqliteSearchBackend,
+        ttl_seconds: float,
+        evict_every: int = 100,
+    ) -> None:
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.evict_every = evict_every
+        self._puts = 0
+        self._inflight: dict[str, _InFlight] = {}
+        self._ainflight: dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(query: str, search_depth: str, max_results: int) -> str:
+        return f"{' '.join(query.casefold().split())}|{search_depth}|{max_results}"
+
+    def search(self, query: str, search_depth: str = "advanced", max_results: int = 5) -> dict:
+        key = self.make_key(query, search_depth, max_results)
+        cached = self.backend.get(key, self.ttl_seconds)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlight()
+                self._inflight[key] = call
+
+        if not leader:
+            self.coalesced += 1
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.response or {}
+
+        self.misses += 1
+        try:
+            with tracer.span("tavily.search", search_depth=search_depth, max_results=max_results):
+                call.response = get_tavily_client().search(
+                    query=query, search_depth=search_depth, max_results=max_results
+                )
+            self._put(key, call.response)
+            return call.response
+        except BaseException as e:
+            # Errors are propagated to waiters but never cached.
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.done.set()
+
+    def _put(self, key: str, response: dict) -> None:
+        self.backend.put(key, response)
+        with self._lock:
+            self._puts += 1
+            due = self.evict_every and self._puts % self.evict_every == 0
+        if due:
+            self.backend.evict_expired(self.ttl_seconds)
+
+    async def _backend_get(self, key: str) -> dict | None:
+        if isinstance(self.backend, SqliteSearchBackend):
+            return await asyncio.to_thread(self.backend.get, key, self.ttl_seconds)
+        return self.backend.get(key, self.ttl_seconds)
+
+    async def _backend_put(self, key: str, response: dict) -> None:
+        if isinstance(self.backend, SqliteSearchBackend):
+            await asyncio.to_thread(self._put, key, response)
+        else:
+            self._put(key, response)
+
+    async def asearch(
+        self, query: str, search_depth: str = "advanced", max_results: int = 5
+    ) -> dict:
+        """Async variant: coalesces concurrent callers on the event loop via a shared Future."""
+        key = self.make_key(query, search_depth, max_results)
+        while True:
+            cached = await self._backend_get(key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+
+            pending = self._ainflight.get(key)
+            if pending is None:
+                break
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except _LeaderCancelled:
+                # The leader's caller went away, not ours: look again, maybe lead.
+                continue
+
+        self.misses += 1
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._ainflight[key] = future
+        try:
+            with tracer.span("tavily.search", search_depth=search_depth, max_results=max_results):
+                response = await get_async_tavily_client().search(
+                    query=query, search_depth=search_depth, max_results=max_results
+                )
+            future.set_result(response)
+            await self._backend_put(key, response)
+            return response
+        except asyncio.CancelledError:
+            # Never hand our cancellation to waiters that share the query.
+            if not future.done():
+                future.set_exception(_LeaderCancelled())
+                future.exception()
+            raise
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+                # Mark retrieved so an exception with no waiters isn't reported as unhandled.
+                future.exception()
+            raise
+        finally:
+            if self._ainflight.get(key) is future:
+                del self._ainflight[key]
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
+
+
+def _build_search_cache() -> SearchCache:
+    path = settings.search_cache_path
+    backend = SqliteSearchBackend(path) if path else MemorySearchBackend()
+    return SearchCache(backend, ttl_seconds=settings.search_cache_ttl_hours * 3600)
+
+
+search_cache = _build_search_cache()
+
+
+def cached_search(query: str, search_depth: str = "advanced", max_results: int = 5) -> dict:
+    """Drop-in replacement for TavilyClient.search backed by the shared cache."""
+    return search_cache.search(query, search_depth=search_depth, max_results=max_results)
+
+
+async def acached_search(query: str, search_depth: str = "advanced", max_results: int = 5) -> dict:
+    """Drop-in replacement for AsyncTavilyClient.search backed by the shared cache."""
+    return await search_cache.asearch(query, search_depth=search_depth, max_results=max_results)
@@ -0,0 +1,163 @@
+"""
+Append-only JSON Lines sink for web search logs.
+
+Callers enqueue entries; a single background thread owns the file, appends one
+line per entry, and rotates it once it exceeds a size limit (optionally
+gzipping rotated files). The queue is bounded: entries are dropped (and
+counted) rather than piling up if the disk can't keep up, and a failed write or
+rotation is logged and skipped without stopping the writer. iter_search_log
+streams entries back without loading whole files into memory.
+"""
+
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class SearchLogWriter:
+    """Single-writer JSONL log with size-based rotation."""
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+        compress: bool = True,
+        max_queue: int = 10_000,
+    ) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="search-log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, entry: dict) -> None:
+        """Enqueue one entry; never blocks on disk I/O. Dropped if the queue is full."""
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout: float | None = 5.0) -> None:
+        """Flush pending entries and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        f = None
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                try:
+                    if f is None:
+                        self.path.parent.mkdir(parents=True, exist_ok=True)
+                        f = open(self.path, "a", encoding="utf-8")
+                    f.write(json.dumps(item, default=str) + "\n")
+                    if self.max_bytes and f.tell() >= self.max_bytes:
+                        f.close()
+                        f = None
+                        self._rotate()
+                    # Batch writes while entries are queued; flush once the queue drains.
+                    elif self._queue.empty():
+                        f.flush()
+                except Exception:
+                    logger.exception("Search log write to %s failed; entry dropped", self.path)
+                    _close_quietly(f)
+                    f = None
+        finally:
+            _close_quietly(f)
+
+    def _backup_name(self, n: int) -> Path:
+        suffix = f".{n}.gz" if self.compress else f".{n}"
+        return self.path.with_name(self.path.name + suffix)
+
+    def _rotate(self) -> None:
+        if self.backup_count <= 0:
+            self.path.unlink(missing_ok=True)
+            return
+        self._backup_name(self.backup_count).unlink(missing_ok=True)
+        for n in range(self.backup_count - 1, 0, -1):
+            src = self._backup_name(n)
+            if src.exists():
+                src.rename(self._backup_name(n + 1))
+        if self.compress:
+            with open(self.path, "rb") as src_f, gzip.open(self._backup_name(1), "wb") as dst_f:
+                shutil.copyfileobj(src_f, dst_f)
+            self.path.unlink()
+        else:
+            os.replace(self.path, self._backup_name(1))
+
+
+def _close_quietly(f) -> None:
+    """Close a file whose buffered data may no longer be writable."""
+    if f is not None:
+        try:
+            f.close()
+        except OSError:
+            pass
+
+
+def iter_search_log(path: str, include_rotated: bool = True) -> Iterator[dict]:
+    """Yield log entries oldest-first, reading rotated files (plain or gzipped) line by line."""
+    base = Path(path)
+    files: list[Path] = []
+    if include_rotated:
+        rotated = []
+        for candidate in base.parent.glob(base.name + ".*"):
+            index = candidate.name[len(base.name) + 1 :].removesuffix(".gz")
+            if index.isdigit():
+                rotated.append((int(index), candidate))
+        files.extend(p for _, p in sorted(rotated, reverse=True))
+    if base.exists():
+        files.append(base)
+
+    for file_path in files:
+        opener = gzip.open if file_path.suffix == ".gz" else open
+        with opener(file_path, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A partially written last line (e.g. after a crash) is skipped.
+                    continue
+
+
+_search_log: SearchLogWriter | None = None
+_search_log_lock = threading.Lock()
+
+
+def get_search_log() -> SearchLogWriter:
+    """Get or start the process-wide search log writer."""
+    global _search_log
+    with _search_log_lock:
+        if _search_log is None:
+            _search_log = SearchLogWriter(
+                settings.search_log_path,
+                max_bytes=settings.search_log_max_bytes,
+                backup_count=settings.search_log_backups,
+                compress=settings.search_log_gzip,
+            )
+            atexit.register(_search_log.close)
+    return _search_log
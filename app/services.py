@@ -1,52 +1,161 @@
 """
 User lookup, session state, and mission lifecycle for the WhatsApp flow.
+
+Mutating helpers only change ORM state; the inbound worker commits once at the
+end of each message (see app.inbound_queue.process_message).
 """
 
 import uuid
+from dataclasses import dataclass
 
-from sqlalchemy import select
+from sqlalchemy import and_, inspect, select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.models import Lesson, Mission, User, UserProgress
+from app.models import Lesson, Message, Mission, NotificationOutbox, User, UserProgress
+from app.session_state import session_state_cache, snapshot_of
+from app.tracing import traced
 
 
+@traced("db.get_or_create_user")
 async def get_or_create_user(db: AsyncSession, phone: str) -> User:
+    user = session_state_cache.attach_user(db, phone)
+    if user is not None:
+        return user
     result = await db.execute(select(User).where(User.phone_number == phone))
     user = result.scalar_one_or_none()
     if not user:
-        user = User(phone_number=phone, wa_session_state="idle")
+        user = User(id=uuid.uuid4(), phone_number=phone, wa_session_state="idle")
         db.add(user)
-        await db.commit()
-        await db.refresh(user)
+    else:
+        session_state_cache.remember(snapshot_of(user))
     return user
 
 
-async def get_active_mission_as_learner(db: AsyncSession, user_id: uuid.UUID) -> Mission | None:
-    result = await db.execute(
-        select(Mission).where(
-            Mission.learner_id == user_id,
-            Mission.status == "active",
-        )
-    )
-    return result.scalar_one_or_none()
+# ── Conversation context ──────────────────────────────────────────────────────
 
+@dataclass
+class ConversationContext:
+    """
+    Everything the router needs for one inbound message, loaded up front:
+    the user, their active mission as learner (lessons ordered by order_index)
+    and the open progress row. Handlers mutate these objects in memory.
+    """
 
-async def get_current_lesson(db: AsyncSession, mission_id: uuid.UUID) -> Lesson | None:
-    """Get the lowest order_index lesson that isn't completed yet."""
-    result = await db.execute(
-        select(Lesson)
-        .where(Lesson.mission_id == mission_id, Lesson.status != "completed")
-        .order_by(Lesson.order_index)
-        .limit(1)
+    user: User
+    mission: Mission | None = None
+    progress: UserProgress | None = None
+
+    @property
+    def lessons(self) -> list[Lesson]:
+        return self.mission.lessons if self.mission else []
+
+    @property
+    def current_lesson(self) -> Lesson | None:
+        """Lowest order_index lesson that isn't completed yet."""
+        return next((l for l in self.lessons if l.status != "completed"), None)
+
+    def next_lesson_after(self, order_index: int) -> Lesson | None:
+        return next(
+            (l for l in self.lessons if l.order_index > order_index and l.status != "completed"),
+            None,
+        )
+
+    def progress_summary(self) -> dict:
+        if not self.mission:
+            return _summary(0, 0)
+        return _summary(self.mission.lessons_total, self.mission.lessons_completed)
+
+
+@traced("db.load_conversation_context")
+async def load_conversation_context(db: AsyncSession, phone: str) -> ConversationContext:
+    """
+    Load the user plus active mission, its lessons and the open progress row
+    in two queries (user; mission ⟕ progress with lessons joined-eager).
+
+    Lesson bodies stay deferred except for the lesson the open progress row
+    points at, whose content_md comes back in the same query.
+    """
+    user = await get_or_create_user(db, phone)
+    ctx = ConversationContext(user=user)
+    if user not in db.new:
+        in_progress = aliased(Lesson)
+        result = await db.execute(
+            select(Mission, UserProgress, in_progress.content_md)
+            .outerjoin(
+                UserProgress,
+                and_(
+                    UserProgress.mission_id == Mission.id,
+                    UserProgress.user_id == user.id,
+                    UserProgress.status != "completed",
+                ),
+            )
+            .outerjoin(in_progress, in_progress.id == UserProgress.lesson_id)
+            .where(Mission.learner_id == user.id, Mission.status == "active")
+            .options(joinedload(Mission.lessons))
+        )
+        row = result.unique().first()
+        if row is not None:
+            ctx.mission, ctx.progress, content_md = row
+            if ctx.progress is not None:
+                for lesson in ctx.lessons:
+                    if lesson.id == ctx.progress.lesson_id:
+                        set_committed_value(lesson, "content_md", content_md)
+    return ctx
+
+
+@traced("db.load_lesson_content")
+async def load_lesson_content(db: AsyncSession, lesson: Lesson) -> str | None:
+    """Load the deferred content_md for one lesson unless it's already loaded."""
+    if "content_md" in inspect(lesson).unloaded:
+        await db.refresh(lesson, ["content_md"])
+    return lesson.content_md
+
+
+@traced("db.load_lesson_research")
+async def load_lesson_research(db: AsyncSession, lesson: Lesson) -> dict | None:
+    """Load the deferred research_json (eager research mode) for one lesson."""
+    if "research_json" in inspect(lesson).unloaded:
+        await db.refresh(lesson, ["research_json"])
+    return lesson.research_json
+
+
+@traced("db.record_inbound_message")
+async def record_inbound_message(
+    db: AsyncSession,
+    user: User,
+    body: str,
+    media_type: str | None,
+    wa_message_id: str | None,
+) -> bool:
+    """
+    Store an inbound message. Returns False if this MessageSid was already
+    recorded (a Twilio retry), in which case the caller must not process it again.
+    """
+    stmt = (
+        insert(Message)
+        .values(
+            id=uuid.uuid4(),
+            user_id=user.id,
+            role="user",
+            content=body,
+            media_type=media_type,
+            wa_message_id=wa_message_id,
+        )
+        .on_conflict_do_nothing(index_elements=[Message.wa_message_id])
+        .returning(Message.id)
     )
-    return result.scalar_one_or_none()
+    result = await db.execute(stmt)
+    return result.scalar_one_or_none() is not None
 
 
 async def set_user_state(db: AsyncSession, user: User, state: str) -> None:
     user.wa_session_state = state
-    await db.commit()
 
 
+@traced("db.create_mission_with_outline")
 async def create_mission_with_outline(
     db: AsyncSession,
     goal_setter: User,
@@ -58,35 +167,34 @@ async def create_mission_with_outline(
     result = await db.execute(select(User).where(User.phone_number == learner_phone))
     learner = result.scalar_one_or_none()
     if not learner:
-        learner = User(phone_number=learner_phone, wa_session_state="idle")
+        learner = User(id=uuid.uuid4(), phone_number=learner_phone, wa_session_state="idle")
         db.add(learner)
-        await db.flush()
 
     mission = Mission(
+        id=uuid.uuid4(),
         goal_setter_id=goal_setter.id,
         learner_id=learner.id,
         topic=topic,
         status="pending_approval",
         outline_json=outline,
+        lessons_total=len(outline),
+        lessons_completed=0,
+        lessons=[
+            Lesson(
+                id=uuid.uuid4(),
+                order_index=i,
+                title=item.get("title", f"Lesson {i + 1}"),
+                content_md="",
+                status="pending",
+            )
+            for i, item in enumerate(outline)
+        ],
     )
     db.add(mission)
-    await db.flush()
-
-    for i, item in enumerate(outline):
-        lesson = Lesson(
-            mission_id=mission.id,
-            order_index=i,
-            title=item.get("title", f"Lesson {i + 1}"),
-            content_md="",
-            status="pending",
-        )
-        db.add(lesson)
-
-    await db.commit()
-    await db.refresh(mission)
     return mission
 
 
+@traced("db.get_mission_by_id")
 async def get_mission_by_id(db: AsyncSession, mission_id: str | uuid.UUID) -> Mission | None:
     if isinstance(mission_id, str):
         try:
@@ -99,51 +207,35 @@ async def get_mission_by_id(db: AsyncSession, mission_id: str | uuid.UUID) -> Mi
 async def activate_mission(db: AsyncSession, mission: Mission, learner: User) -> None:
     mission.status = "active"
     learner.wa_session_state = "mission_notified"
-    await db.commit()
 
 
 async def cancel_mission(db: AsyncSession, mission: Mission) -> None:
     mission.status = "cancelled"
-    await db.commit()
 
 
 # ── Phase 4: progress tracking ────────────────────────────────────────────────
 
-async def get_current_progress(
-    db: AsyncSession, user_id: uuid.UUID, mission_id: uuid.UUID
-) -> UserProgress | None:
-    result = await db.execute(
-        select(UserProgress).where(
-            UserProgress.user_id == user_id,
-            UserProgress.mission_id == mission_id,
-            UserProgress.status != "completed",
-        )
-    )
-    return result.scalar_one_or_none()
-
-
-async def create_or_get_progress(
+def start_progress(
     db: AsyncSession,
     user_id: uuid.UUID,
     mission_id: uuid.UUID,
     lesson_id: uuid.UUID,
 ) -> UserProgress:
-    progress = await get_current_progress(db, user_id, mission_id)
-    if not progress:
-        progress = UserProgress(
-            user_id=user_id,
-            mission_id=mission_id,
-            lesson_id=lesson_id,
-            status="in_progress",
-            confusion_score=0.0,
-            attempts=0,
-        )
-        db.add(progress)
-        await db.commit()
-        await db.refresh(progress)
+    """Add a fresh in-progress row for this lesson (persisted on the next flush)."""
+    progress = UserProgress(
+        id=uuid.uuid4(),
+        user_id=user_id,
+        mission_id=mission_id,
+        lesson_id=lesson_id,
+        status="in_progress",
+        confusion_score=0.0,
+        attempts=0,
+    )
+    db.add(progress)
     return progress
 
 
+@traced("db.record_attempt")
 async def record_attempt(
     db: AsyncSession,
     progress: UserProgress,
@@ -154,41 +246,76 @@ async def record_attempt(
     progress.attempts += 1
     progress.confusion_score = confusion_score
     progress.last_attempted_at = datetime.now(timezone.utc)
-    await db.commit()
 
 
+@traced("db.complete_lesson")
 async def complete_lesson(
-    db: AsyncSession, progress: UserProgress, lesson: Lesson
+    db: AsyncSession,
+    progress: UserProgress,
+    lesson: Lesson,
+    mission: Mission | None = None,
+    forced: bool = False,
 ) -> None:
+    """
+    Mark the lesson done. When `mission` is given, the goal-setter's progress
+    notification is queued in the same transaction.
+    """
     progress.status = "completed"
+    if lesson.status != "completed":
+        if mission is not None:
+            mission.lessons_completed += 1
+        else:
+            await db.execute(
+                update(Mission)
+                .where(Mission.id == lesson.mission_id)
+                .values(lessons_completed=Mission.lessons_completed + 1)
+            )
     lesson.status = "completed"
-    await db.commit()
+    if mission is not None:
+        enqueue_notification(
+            db,
+            recipient_id=mission.goal_setter_id,
+            mission_id=mission.id,
+            kind="lesson_completed",
+            payload={"topic": mission.topic, "lesson_title": lesson.title, "forced": forced},
+        )
 
 
-async def get_next_lesson(
-    db: AsyncSession, mission_id: uuid.UUID, current_order_index: int
-) -> Lesson | None:
+def enqueue_notification(
+    db: AsyncSession,
+    recipient_id: uuid.UUID,
+    mission_id: uuid.UUID | None,
+    kind: str,
+    payload: dict,
+) -> None:
+    """Add an outbox row to the current transaction; delivered by app.notifications."""
+    db.add(
+        NotificationOutbox(
+            recipient_id=recipient_id,
+            mission_id=mission_id,
+            kind=kind,
+            payload=payload,
+            status="pending",
+            attempts=0,
+        )
+    )
+
+
+def _summary(total: int, completed: int) -> dict:
+    return {"total": total, "completed": completed, "remaining": total - completed}
+
+
+@traced("db.get_mission_progress_summaries")
+async def get_mission_progress_summaries(
+    db: AsyncSession, mission_ids: list[uuid.UUID]
+) -> dict[uuid.UUID, dict]:
+    """Counters for several missions in one query, keyed by mission id."""
+    if not mission_ids:
+        return {}
     result = await db.execute(
-        select(Lesson)
-        .where(
-            Lesson.mission_id == mission_id,
-            Lesson.order_index > current_order_index,
-            Lesson.status != "completed",
+        select(Mission.id, Mission.lessons_total, Mission.lessons_completed).where(
+            Mission.id.in_(mission_ids)
         )
-        .order_by(Lesson.order_index)
-        .limit(1)
     )
-    return result.scalar_one_or_none()
-
-
-async def get_mission_progress_summary(
-    db: AsyncSession, mission_id: uuid.UUID
-) -> dict:
-    result = await db.execute(select(Lesson).where(Lesson.mission_id == mission_id))
-    lessons = result.scalars().all()
-    completed = [l for l in lessons if l.status == "completed"]
-    return {
-        "total": len(lessons),
-        "completed": len(completed),
-        "remaining": len(lessons) - len(completed),
-    }
+    return {mission_id: _summary(total, completed) for mission_id, total, completed in result}
+
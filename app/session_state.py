@@ -0,0 +1,289 @@
+"""
+Per-process cache of users' WhatsApp session state (wa_session_state).
+
+Reads: load_conversation_context attaches a cached User to the session instead
+of selecting it. The cache holds the whole users row (it is small), so every
+column of the attached instance is loaded and nothing lazy-loads later. Writes stay in the ORM unit
+of work, so every transition made while handling one message collapses into a
+single UPDATE at commit. users.wa_state_version is the mapper's version column:
+that UPDATE only applies if the row still has the version we cached, otherwise
+StaleDataError is raised and the caller reloads and retries.
+
+Every committed state change is published with pg_notify on the
+'wa_session_state' channel (in the writing transaction, so only on commit);
+each process LISTENs and updates or drops its entry. Reads are only served
+from the cache while that listener is connected.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+import asyncpg
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from app.config import settings
+from app.models import User
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "wa_session_state"
+_PENDING_KEY = "session_state_changes"
+
+
+@dataclass
+class CachedState:
+    user_id: uuid.UUID
+    state: str | None
+    version: int
+    name: str | None
+    preferred_language: str | None
+    # None when the writer didn't have it loaded (e.g. just inserted): not attachable
+    created_at: datetime | None
+    cached_at: float
+
+
+def user_snapshot(
+    user_id: uuid.UUID,
+    phone: str,
+    state: str | None,
+    version: int,
+    name: str | None,
+    preferred_language: str | None,
+    created_at: datetime | None,
+) -> dict:
+    """JSON-ready users row, as cached and as sent in notifications."""
+    return {
+        "id": str(user_id),
+        "phone": phone,
+        "state": state,
+        "version": version,
+        "name": name,
+        "preferred_language": preferred_language,
+        "created_at": created_at.isoformat() if created_at else None,
+    }
+
+
+def snapshot_of(user: User) -> dict:
+    # Read loaded values only: this runs inside flush events, where touching an
+    # expired attribute (e.g. server-default created_at) would emit a query.
+    loaded = inspect(user).dict
+    return user_snapshot(
+        user.id,
+        user.phone_number,
+        user.wa_session_state,
+        user.wa_state_version,
+        loaded.get("name"),
+        loaded.get("preferred_language"),
+        loaded.get("created_at"),
+    )
+
+
+class SessionStateCache:
+    """LRU of phone → CachedState, kept consistent across processes via LISTEN/NOTIFY."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, enabled: bool = True) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._entries: OrderedDict[str, CachedState] = OrderedDict()
+        self._listening = False
+        self._task: asyncio.Task | None = None
+        self.hits = 0
+        self.misses = 0
+
+    # ── Cache ─────────────────────────────────────────────────────────
+
+    def get(self, phone: str) -> CachedState | None:
+        if not (self.enabled and self._listening):
+            return None
+        entry = self._entries.get(phone)
+        if entry is None or time.monotonic() - entry.cached_at > self.ttl_seconds:
+            self._entries.pop(phone, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(phone)
+        self.hits += 1
+        return entry
+
+    def remember(self, snapshot: dict) -> None:
+        """Store a committed user_snapshot() unless we already hold a newer version."""
+        if not self.enabled:
+            return
+        phone, version = snapshot["phone"], int(snapshot["version"])
+        current = self._entries.get(phone)
+        if current is not None and current.version > version:
+            return
+        created_at = snapshot.get("created_at")
+        self._entries[phone] = CachedState(
+            user_id=uuid.UUID(snapshot["id"]),
+            state=snapshot["state"],
+            version=version,
+            name=snapshot.get("name"),
+            preferred_language=snapshot.get("preferred_language"),
+            created_at=datetime.fromisoformat(created_at) if created_at else None,
+            cached_at=time.monotonic(),
+        )
+        self._entries.move_to_end(phone)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def forget(self, phone: str) -> None:
+        self._entries.pop(phone, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def attach_user(self, db: AsyncSession, phone: str) -> User | None:
+        """
+        Attach the cached user to `db` as a persistent instance without a
+        SELECT, with every column loaded. None on a miss, or if the entry is
+        missing part of the row.
+        """
+        entry = self.get(phone)
+        if entry is None or entry.created_at is None:
+            return None
+        user = User(
+            id=entry.user_id,
+            phone_number=phone,
+            name=entry.name,
+            preferred_language=entry.preferred_language,
+            wa_session_state=entry.state,
+            wa_state_version=entry.version,
+            created_at=entry.created_at,
+        )
+        make_transient_to_detached(user)
+        db.add(user)
+        return user
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "listening": self._listening,
+        }
+
+    # ── LISTEN/NOTIFY ─────────────────────────────────────────────────
+
+    async def start(self) -> None:
+        if self.enabled:
+            self._task = asyncio.create_task(self._listen(), name="session-state-listener")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._listening = False
+
+    async def _listen(self) -> None:
+        dsn = settings.database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+        while True:
+            try:
+                conn = await asyncpg.connect(dsn)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Session state listener failed to connect")
+                await asyncio.sleep(5.0)
+                continue
+
+            closed = asyncio.Event()
+            conn.add_termination_listener(lambda _conn: closed.set())
+            try:
+                await conn.add_listener(CHANNEL, self._on_notify)
+                # Anything cached while disconnected may have missed an invalidation.
+                self.clear()
+                self._listening = True
+                await closed.wait()
+                logger.warning("Session state listener disconnected; reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Session state listener failed")
+            finally:
+                self._listening = False
+                if not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(1.0)
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            self.remember(json.loads(payload))
+        except Exception:
+            logger.exception("Bad session state notification: %r", payload)
+
+
+session_state_cache = SessionStateCache(
+    max_entries=settings.session_state_cache_entries,
+    ttl_seconds=settings.session_state_cache_ttl_seconds,
+    enabled=settings.session_state_cache,
+)
+
+
+# ── Publishing committed changes ──────────────────────────────────────────────
+
+def _notify_sql(snapshot: dict):
+    return select(func.pg_notify(CHANNEL, json.dumps(snapshot)))
+
+
+def _record(session: Session | None, snapshot: dict) -> None:
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, {})[snapshot["phone"]] = snapshot
+
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_update")
+def _publish_user_state(mapper, connection, target: User) -> None:
+    snapshot = snapshot_of(target)
+    connection.execute(_notify_sql(snapshot))
+    _record(object_session(target), snapshot)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed(session: Session) -> None:
+    for snapshot in session.info.pop(_PENDING_KEY, {}).values():
+        session_state_cache.remember(snapshot)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+async def set_state_by_id(db: AsyncSession, user_id: uuid.UUID, state: str) -> None:
+    """Set another user's state without loading them; bumps the version and publishes."""
+    result = await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(wa_session_state=state, wa_state_version=User.wa_state_version + 1)
+        .returning(
+            User.phone_number,
+            User.wa_state_version,
+            User.name,
+            User.preferred_language,
+            User.created_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    row = result.one_or_none()
+    if row is not None:
+        snapshot = user_snapshot(
+            user_id,
+            row.phone_number,
+            state,
+            row.wa_state_version,
+            row.name,
+            row.preferred_language,
+            row.created_at,
+        )
+        await db.execute(_notify_sql(snapshot))
+        _record(db.sync_session, snapshot)
@@ -0,0 +1,370 @@
+"""
+Per-stage latency tracing.
+
+`tracer.span(name)` (or the `@traced(name)` decorator) times a block and links
+it to the enclosing span through a contextvar, so one inbound message yields a
+tree: inbound.process_message → router.route_message → db.* / agent_bridge.* /
+llm.call / tavily.search / twilio.send_chunk. asyncio tasks inherit the
+current span when they are created.
+
+Finished spans go to the configured exporter (TRACING_EXPORTER):
+- none:   spans are only counted in the histograms
+- memory: last N spans kept in-process (tests, debugging)
+- jsonl:  one JSON object per span appended to TRACING_JSONL_PATH
+- otlp:   batched OTLP/HTTP JSON to TRACING_OTLP_ENDPOINT (any OpenTelemetry collector)
+
+Every span's duration is also recorded in a per-stage histogram, served in
+Prometheus text format at /metrics.
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_time: float  # epoch seconds
+    duration: float = 0.0
+    attributes: dict = field(default_factory=dict)
+    error: str | None = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+# ── Exporters ─────────────────────────────────────────────────────────────────
+
+class NullExporter:
+    def export(self, span: Span) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class InMemoryExporter:
+    """Keeps the most recent spans in a ring buffer."""
+
+    def __init__(self, max_spans: int = 10_000) -> None:
+        self.spans: deque[Span] = deque(maxlen=max_spans)
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def clear(self) -> None:
+        self.spans.clear()
+
+    def close(self) -> None:
+        pass
+
+
+class JsonlExporter:
+    """
+    Appends one JSON object per span to a file. Serialization and file writes
+    happen on a background thread, like OtlpExporter, so exporting never blocks
+    the event loop; spans are dropped (and counted) if the queue is full.
+    """
+
+    def __init__(self, path: str, max_queue: int = 10_000) -> None:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._queue: queue.Queue[Span | None] = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="jsonl-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+
+    def _run(self) -> None:
+        with self._file:
+            while True:
+                span = self._queue.get()
+                if span is None:
+                    return
+                try:
+                    self._file.write(json.dumps(asdict(span), default=str) + "\n")
+                    if self._queue.empty():
+                        self._file.flush()
+                except Exception as e:
+                    logger.warning("JSONL span export failed: %s", e)
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(span: Span) -> dict:
+    start_ns = int(span.start_time * 1e9)
+    otlp = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(start_ns),
+        "endTimeUnixNano": str(start_ns + int(span.duration * 1e9)),
+        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+    }
+    if span.parent_id:
+        otlp["parentSpanId"] = span.parent_id
+    return otlp
+
+
+class OtlpExporter:
+    """
+    Batches spans and POSTs them as OTLP/HTTP JSON from a background thread,
+    so exporting never blocks the event loop. Spans are dropped (and counted)
+    if the collector can't keep up.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        service_name: str,
+        batch_size: int = 256,
+        flush_interval: float = 2.0,
+        max_queue: int = 10_000,
+    ) -> None:
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue[Span | None] = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+
+    def _run(self) -> None:
+        with httpx.Client(timeout=10.0) as client:
+            batch: list[Span] = []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                try:
+                    span = self._queue.get(timeout=max(deadline - time.monotonic(), 0.01))
+                except queue.Empty:
+                    pass
+                else:
+                    if span is None:
+                        self._post(client, batch)
+                        return
+                    batch.append(span)
+                if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                    self._post(client, batch)
+                    batch = []
+                    deadline = time.monotonic() + self.flush_interval
+
+    def _post(self, client: httpx.Client, batch: list[Span]) -> None:
+        if not batch:
+            return
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": self.service_name}},
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": "app.tracing"},
+                    "spans": [_otlp_span(span) for span in batch],
+                }],
+            }]
+        }
+        try:
+            client.post(self.endpoint, json=payload).raise_for_status()
+        except Exception as e:
+            logger.warning("OTLP export of %d spans failed: %s", len(batch), e)
+
+
+# ── Histograms ────────────────────────────────────────────────────────────────
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class StageHistograms:
+    """Cumulative latency histograms keyed by span name; thread-safe."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self._counts: dict[str, list[int]] = {}
+        self._sums: dict[str, float] = {}
+        self._errors: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            counts = self._counts.get(stage)
+            if counts is None:
+                counts = self._counts[stage] = [0] * (len(self.buckets) + 1)
+                self._sums[stage] = 0.0
+                self._errors[stage] = 0
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._sums[stage] += seconds
+            if error:
+                self._errors[stage] += 1
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        lines = [
+            "# HELP learnado_stage_duration_seconds Latency of traced stages.",
+            "# TYPE learnado_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            stages = sorted(self._counts)
+            for stage in stages:
+                label = stage.replace("\\", "\\\\").replace('"', '\\"')
+                cumulative = 0
+                for bound, count in zip(self.buckets, self._counts[stage]):
+                    cumulative += count
+                    lines.append(
+                        f'learnado_stage_duration_seconds_bucket{{stage="{label}",le="{bound}"}} {cumulative}'
+                    )
+                cumulative += self._counts[stage][-1]
+                lines.append(
+                    f'learnado_stage_duration_seconds_bucket{{stage="{label}",le="+Inf"}} {cumulative}'
+                )
+                lines.append(f'learnado_stage_duration_seconds_sum{{stage="{label}"}} {self._sums[stage]}')
+                lines.append(f'learnado_stage_duration_seconds_count{{stage="{label}"}} {cumulative}')
+            lines.append("# HELP learnado_stage_errors_total Traced stages that raised.")
+            lines.append("# TYPE learnado_stage_errors_total counter")
+            for stage in stages:
+                label = stage.replace("\\", "\\\\").replace('"', '\\"')
+                lines.append(f'learnado_stage_errors_total{{stage="{label}"}} {self._errors[stage]}')
+        return "\n".join(lines) + "\n"
+
+
+# ── Tracer ────────────────────────────────────────────────────────────────────
+
+class Tracer:
+    def __init__(self, exporter, histograms: StageHistograms | None = None) -> None:
+        self.exporter = exporter
+        self.histograms = histograms or StageHistograms()
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Time the enclosed block as a child of the current span."""
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else None,
+            start_time=time.time(),
+            attributes=attributes,
+        )
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            _current_span.reset(token)
+            self.histograms.observe(name, span.duration, error=span.error is not None)
+            try:
+                self.exporter.export(span)
+            except Exception:
+                logger.exception("Span export failed")
+
+    def metrics(self) -> str:
+        return self.histograms.render()
+
+    def close(self) -> None:
+        self.exporter.close()
+
+
+def _build_exporter():
+    kind = settings.tracing_exporter
+    if kind == "memory":
+        return InMemoryExporter()
+    if kind == "jsonl":
+        return JsonlExporter(settings.tracing_jsonl_path)
+    if kind == "otlp":
+        return OtlpExporter(settings.tracing_otlp_endpoint, settings.tracing_service_name)
+    if kind not in ("", "none"):
+        logger.warning("Unknown TRACING_EXPORTER %r; spans will not be exported", kind)
+    return NullExporter()
+
+
+tracer = Tracer(_build_exporter())
+
+
+def traced(name: str):
+    """Decorator form of tracer.span for sync and async functions."""
+
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.span(name):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
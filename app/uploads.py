@@ -0,0 +1,105 @@
+"""
+Upload ingestion: stream an UploadFile to disk without blocking the event loop.
+
+Chunks are read from the spooled upload, then written and hashed in a worker
+thread. The size limit is enforced while streaming (413 as soon as it's
+exceeded, partial file removed). Files are stored content-addressed as
+<sha256><suffix>, so identical uploads share one file and concurrent uploads
+with the same filename can't clobber each other.
+
+Blocking processing (Whisper, Tesseract, sync Gemini calls, index builds)
+goes through run_blocking(), a bounded thread pool separate from the default
+executor, so a burst of uploads can't starve other to_thread users.
+"""
+
+import asyncio
+import hashlib
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi import HTTPException, UploadFile
+
+from app.config import settings
+
+UPLOAD_DIR = Path("data/uploads")
+
+
+@dataclass
+class StoredUpload:
+    path: Path
+    sha256: str
+    size: int
+    filename: str
+
+
+def max_upload_bytes() -> int:
+    return settings.upload_max_mb * 1024 * 1024
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413, detail=f"File too large (limit {settings.upload_max_mb} MB)"
+    )
+
+
+def _write_chunk(f, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    f.write(chunk)
+
+
+async def ingest_upload(file: UploadFile) -> StoredUpload:
+    """Stream `file` to UPLOAD_DIR; raises HTTPException(413) past UPLOAD_MAX_MB."""
+    limit = max_upload_bytes()
+    # Starlette knows the spooled size already; reject without copying anything.
+    if file.size is not None and file.size > limit:
+        raise _too_large()
+
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = UPLOAD_DIR / f".upload-{uuid.uuid4().hex}.part"
+    digest = hashlib.sha256()
+    size = 0
+    f = await asyncio.to_thread(open, tmp, "wb")
+    try:
+        while chunk := await file.read(settings.upload_chunk_bytes):
+            size += len(chunk)
+            if size > limit:
+                raise _too_large()
+            await asyncio.to_thread(_write_chunk, f, digest, chunk)
+    except BaseException:
+        await asyncio.to_thread(f.close)
+        await asyncio.to_thread(tmp.unlink, True)
+        raise
+    await asyncio.to_thread(f.close)
+
+    sha256 = digest.hexdigest()
+    suffix = Path(file.filename or "").suffix.lower()[:16]
+    path = UPLOAD_DIR / f"{sha256}{suffix}"
+    await asyncio.to_thread(os.replace, tmp, path)
+    return StoredUpload(path=path, sha256=sha256, size=size, filename=file.filename or path.name)
+
+
+_pool: ThreadPoolExecutor | None = None
+
+
+def processing_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=settings.upload_workers, thread_name_prefix="upload-worker"
+        )
+    return _pool
+
+
+async def run_blocking(fn, *args):
+    """Run a blocking call on the upload processing pool."""
+    return await asyncio.get_running_loop().run_in_executor(processing_pool(), fn, *args)
+
+
+def shutdown_processing_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -11,9 +11,7 @@ Helper functions for OCR, STT, translation, and common operations.
 # import hashlib
 # import mimetypes
 
-import io
 import os
-import pymupdf
 import pytesseract
 from PIL import Image
 from dotenv import load_dotenv
@@ -22,6 +20,11 @@ import whisper
 import torch
 from pathlib import Path
 
+from app.config import settings
+from app.extraction_store import sha256_file
+from app.pdf_extract import extract_pdf_text, iter_pdf_pages
+from app.retrieval import Chunk, pdf_namespace, retrieve
+
 load_dotenv()
 
 # Initialize Gemini LLM lazily
@@ -43,19 +46,9 @@ def get_llm():
 def extract_text_from_pdf(pdf_path: str) -> str:
     """
     Extract text from a PDF. Falls back to OCR if page is image-only.
+    Pages are extracted in parallel; see app.pdf_extract.
     """
-    doc = pymupdf.open(pdf_path)
-    text = ""
-    for page in doc:
-        page_text = page.get_text()
-        if page_text.strip():
-            text += page_text
-        else:
-            # Fallback to OCR
-            pix = page.get_pixmap()
-            img = Image.open(io.BytesIO(pix.tobytes("png")))
-            text += pytesseract.image_to_string(img)
-    return text
+    return extract_pdf_text(pdf_path)
 
 def process_image(file_path: str, user_query: str) -> str:
     """
@@ -66,8 +59,20 @@ def process_image(file_path: str, user_query: str) -> str:
 
     try:
         # OCR with Tesseract
-        extracted_text = pytesseract.image_to_string(Image.open(file_path))
+        extracted_text = ocr_image(file_path)
+        return answer_image_query(file_path, user_query, extracted_text)
+    except Exception as e:
+        raise RuntimeError(f"Error processing image: {e}")
 
+def ocr_image(file_path: str) -> str:
+    """Extract text from an image with Tesseract."""
+    return pytesseract.image_to_string(Image.open(file_path))
+
+def answer_image_query(file_path: str, user_query: str, extracted_text: str) -> str:
+    """
+    Send the OCR text and the image itself to Gemini.
+    """
+    try:
         # Send both to Gemini (multimodal input: text + image)
         llm = get_llm()
         response = llm.invoke([
@@ -90,6 +95,15 @@ def query_audio(file_path: str, question: str) -> str:
     try:
         model = get_whisper_model()
         transcription = model.transcribe(file_path)["text"]
+        return answer_audio_question(transcription, question)
+    except Exception as e:
+        raise RuntimeError(f"Error processing audio: {e}")
+
+def answer_audio_question(transcription: str, question: str) -> str:
+    """
+    Ask Gemini a question about an audio transcription.
+    """
+    try:
         llm = get_llm()
         response = llm.invoke(
             f"User question: {question}\n\nTranscribed audio:\n{transcription}"
@@ -98,15 +112,45 @@ def query_audio(file_path: str, question: str) -> str:
     except Exception as e:
         raise RuntimeError(f"Error processing audio: {e}")
 
-def query_pdf(pdf_path: str, question: str) -> str:
+def query_pdf(pdf_path: str, question: str, mode: str | None = None) -> str:
     """
     Ask a question about the contents of a PDF.
+    mode "retrieval" sends only the most relevant chunks, "full" the whole text
+    (default: PDF_QUERY_MODE).
+    """
+    if (mode or settings.pdf_query_mode) == "full":
+        return answer_pdf_question(extract_text_from_pdf(pdf_path), question)
+    chunks = retrieve(
+        pdf_namespace(sha256_file(pdf_path)),
+        lambda: [page.text for page in iter_pdf_pages(pdf_path)],
+        question,
+    )
+    return answer_pdf_question_from_chunks(chunks, question)
+
+def answer_pdf_question(content: str, question: str) -> str:
+    """
+    Ask a question about already-extracted PDF text.
     """
-    content = extract_text_from_pdf(pdf_path)
     llm = get_llm()
     res = llm.invoke(question + "\n\n" + content)
     return res.content
 
+def pdf_chunks_prompt(chunks: list[Chunk], question: str) -> str:
+    excerpts = "\n\n".join(f"[Page {chunk.page + 1}]\n{chunk.text}" for chunk in chunks)
+    return (
+        "Answer the question using the excerpts from a PDF below. "
+        "If they don't contain the answer, say so.\n\n"
+        f"Question: {question}\n\nExcerpts:\n{excerpts}"
+    )
+
+def answer_pdf_question_from_chunks(chunks: list[Chunk], question: str) -> str:
+    """
+    Ask a question about the retrieved chunks of a PDF only.
+    """
+    llm = get_llm()
+    res = llm.invoke(pdf_chunks_prompt(chunks, question))
+    return res.content
+
 # Choose device (CUDA if available, else CPU)
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 
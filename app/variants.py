@@ -0,0 +1,138 @@
+"""
+Simplified lesson variants, stored per (lesson, level, prompt version).
+
+The first time a learner is confused by a lesson, the rewrite for their attempt
+is generated (once, even if several learners ask at the same moment) and the
+remaining levels are pre-generated in the background. Every later confused
+learner gets the stored text without an LLM call. Attempt N maps to level N, so
+each retry is simpler than the last.
+"""
+
+import asyncio
+import logging
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.agent import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, llm_priority
+from app.agent_bridge import MAX_SIMPLIFY_LEVEL, SIMPLIFY_PROMPT_VERSION, asimplify_lesson_text
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import LessonVariant
+
+logger = logging.getLogger(__name__)
+
+
+def level_for_attempt(attempt: int) -> int:
+    """Attempt 1 → level 1, attempt 2 → level 2, capped at the simplest level."""
+    return min(max(attempt, 1), MAX_SIMPLIFY_LEVEL)
+
+
+class LessonVariants:
+    """
+    Lookup plus single-flight generation of simplified lesson variants.
+
+    At most `max_background` pre-generations run at once; a variant a learner
+    asked for directly doesn't take one of those slots.
+    """
+
+    def __init__(self, max_background: int) -> None:
+        self._background = asyncio.Semaphore(max_background)
+        self._inflight: dict[tuple[uuid.UUID, int], asyncio.Task] = {}
+        self.hits = 0
+        self.generated = 0
+
+    async def simplified(
+        self, db: AsyncSession, lesson_id: uuid.UUID, content: str, attempt: int
+    ) -> str:
+        """Simplified text for this attempt; generates (and stores) it if needed."""
+        level = level_for_attempt(attempt)
+        # One read for this level and every simpler one, so only missing
+        # levels get a background task (and a DB session).
+        result = await db.execute(
+            select(LessonVariant.level, LessonVariant.content_md).where(
+                LessonVariant.lesson_id == lesson_id,
+                LessonVariant.level >= level,
+                LessonVariant.prompt_version == SIMPLIFY_PROMPT_VERSION,
+            )
+        )
+        stored = dict(result.all())
+        self._pregenerate(
+            lesson_id,
+            content,
+            [lvl for lvl in range(level + 1, MAX_SIMPLIFY_LEVEL + 1) if lvl not in stored],
+        )
+        if level in stored:
+            self.hits += 1
+            return stored[level]
+
+        try:
+            return await asyncio.shield(self._start(lesson_id, content, level))
+        except Exception as e:
+            return f"{content}\n\n_(Simplified version unavailable: {e})_"
+
+    def _pregenerate(self, lesson_id: uuid.UUID, content: str, levels) -> None:
+        for level in levels:
+            self._start(lesson_id, content, level, PRIORITY_BACKGROUND)
+
+    def _start(
+        self, lesson_id: uuid.UUID, content: str, level: int, priority: int = PRIORITY_INTERACTIVE
+    ) -> asyncio.Task:
+        key = (lesson_id, level)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._generate(lesson_id, content, level, priority))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._done(k, t))
+        return task
+
+    def _done(self, key: tuple[uuid.UUID, int], task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Lesson variant %s failed: %s", key, task.exception())
+
+    async def _generate(
+        self, lesson_id: uuid.UUID, content: str, level: int, priority: int
+    ) -> str:
+        with llm_priority(priority):
+            if priority == PRIORITY_INTERACTIVE:
+                return await self._generate_and_store(lesson_id, content, level)
+            async with self._background:
+                return await self._generate_and_store(lesson_id, content, level)
+
+    async def _generate_and_store(self, lesson_id: uuid.UUID, content: str, level: int) -> str:
+        # Separate short sessions for read and write: no pooled connection is
+        # held idle in transaction while Gemini rewrites the lesson.
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(LessonVariant.content_md).where(
+                    LessonVariant.lesson_id == lesson_id,
+                    LessonVariant.level == level,
+                    LessonVariant.prompt_version == SIMPLIFY_PROMPT_VERSION,
+                )
+            )
+            stored = result.scalar_one_or_none()
+        if stored is not None:
+            return stored
+
+        text = await asimplify_lesson_text(content, level)
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                insert(LessonVariant)
+                .values(
+                    id=uuid.uuid4(),
+                    lesson_id=lesson_id,
+                    level=level,
+                    prompt_version=SIMPLIFY_PROMPT_VERSION,
+                    content_md=text,
+                )
+                .on_conflict_do_nothing(constraint="uq_lesson_variants_lesson_level_version")
+            )
+            await db.commit()
+        self.generated += 1
+        return text
+
+
+lesson_variants = LessonVariants(max_background=settings.lesson_variant_workers)
@@ -1,43 +1,53 @@
 """
-Twilio WhatsApp webhook — receives incoming messages, routes, and replies via API.
+Twilio WhatsApp webhook — receives incoming messages and queues them for processing.
+Replies are sent asynchronously by the inbound worker pool (see app.inbound_queue).
 """
 
 import logging
 
-from fastapi import APIRouter, Depends, Form
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Form
 
-from app.database import get_db
-from app.router import route_message
-from app.services import get_or_create_user
-from app.whatsapp import send_message
+from app.dedup import recent_message_ids
+from app.inbound_queue import QueuedMessage, inbound_queue
+from app.tracing import traced
 
 logger = logging.getLogger(__name__)
 webhook_router = APIRouter()
 
 
 @webhook_router.post("/webhook/whatsapp")
+@traced("webhook.whatsapp")
 async def whatsapp_webhook(
     From: str = Form(...),
     Body: str = Form(default=""),
     MediaUrl0: str | None = Form(default=None),
     MediaContentType0: str | None = Form(default=None),
-    db: AsyncSession = Depends(get_db),
+    MessageSid: str | None = Form(default=None),
 ):
     phone = From.replace("whatsapp:", "").strip()
     logger.info("WhatsApp webhook: from=%s body=%r", phone, (Body or "")[:80])
 
-    user = await get_or_create_user(db, phone)
-    reply_text, reply_media = await route_message(
-        db, user, Body, MediaUrl0, MediaContentType0
+    # Twilio retries reuse the MessageSid; replay the original outcome without reprocessing.
+    if MessageSid:
+        outcome = recent_message_ids.get(MessageSid)
+        if outcome is not None:
+            logger.info("Duplicate webhook delivery %s from %s", MessageSid, phone)
+            return outcome
+
+    enqueued = await inbound_queue.put(
+        QueuedMessage(
+            phone=phone,
+            body=Body,
+            media_url=MediaUrl0,
+            media_type=MediaContentType0,
+            wa_message_id=MessageSid,
+        )
     )
-    logger.info("Sending reply to %s: %r", phone, (reply_text or "")[:80])
-
-    try:
-        await send_message(phone, reply_text, reply_media)
-    except Exception as e:
-        logger.exception("Twilio send_message failed: %s", e)
-        # Still return 200 so Twilio doesn't retry; fix config and try again
-        return {"status": "ok", "error": str(e)}
-
-    return {"status": "ok"}
+    if not enqueued:
+        logger.info("Duplicate webhook delivery %s from %s (already queued)", MessageSid, phone)
+
+    # Acknowledge right away so Twilio doesn't time out and retry.
+    outcome = {"status": "ok"}
+    if MessageSid:
+        recent_message_ids.remember(MessageSid, outcome)
+    return outcome
@@ -1,53 +1,155 @@
 """
 Twilio WhatsApp send logic; kept separate from webhook routing.
+
+Messages go straight to the Twilio REST API over a shared keep-alive
+httpx.AsyncClient. Point TWILIO_API_BASE_URL at app.fake_twilio to run
+offline (e.g. for throughput benchmarks).
 """
 
 import asyncio
-from typing import Any
+import contextvars
+from contextlib import contextmanager
 
-from twilio.rest import Client
+import httpx
 
 from app.config import settings
+from app.tracing import tracer, traced
+
+# Twilio WhatsApp has a strict body limit (~1600 chars). Split proactively.
+# Keep chunks a bit smaller to avoid edge cases with encoding/concat.
+MAX_CHUNK_LEN = 1500
 
-_client: Client | None = None
+_http_client: httpx.AsyncClient | None = None
+_global_limit: asyncio.Semaphore | None = None
+_destination_limits: dict[str, asyncio.Semaphore] = {}
+_already_sent: contextvars.ContextVar[set[tuple] | None] = contextvars.ContextVar(
+    "whatsapp_already_sent", default=None
+)
 
 
-def get_twilio_client() -> Client:
-    global _client
-    if not _client:
-        _client = Client(
-            settings.twilio_account_sid,
-            settings.twilio_auth_token,
+def get_http_client() -> httpx.AsyncClient:
+    """Get or initialize the pooled Twilio HTTP client."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            base_url=settings.twilio_api_base_url,
+            auth=(settings.twilio_account_sid, settings.twilio_auth_token),
+            timeout=settings.twilio_send_timeout,
+            limits=httpx.Limits(
+                max_connections=settings.twilio_max_connections,
+                max_keepalive_connections=settings.twilio_max_connections,
+            ),
         )
-    return _client
+    return _http_client
+
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _destination_limit(to_phone: str) -> asyncio.Semaphore:
+    limit = _destination_limits.get(to_phone)
+    if limit is None:
+        if len(_destination_limits) >= 10_000:
+            # Forget idle destinations so the map doesn't grow with every phone ever seen.
+            for phone, sem in list(_destination_limits.items()):
+                if not sem.locked():
+                    del _destination_limits[phone]
+        limit = asyncio.Semaphore(settings.twilio_per_destination_concurrency)
+        _destination_limits[to_phone] = limit
+    return limit
+
+
+def _global_send_limit() -> asyncio.Semaphore:
+    global _global_limit
+    if _global_limit is None:
+        _global_limit = asyncio.Semaphore(settings.twilio_max_connections)
+    return _global_limit
 
 
+def split_message(body: str, max_len: int = MAX_CHUNK_LEN) -> list[str]:
+    """
+    Split a body into chunks of at most max_len characters, preferring to break
+    at a paragraph, then a line, then a word boundary.
+    """
+    chunks: list[str] = []
+    rest = body
+    while len(rest) > max_len:
+        window = rest[:max_len]
+        cut = -1
+        for sep in ("\n\n", "\n", " "):
+            cut = window.rfind(sep)
+            # Don't accept a break that leaves a tiny first chunk.
+            if cut > max_len // 2:
+                break
+            cut = -1
+        if cut == -1:
+            cut = max_len
+        chunks.append(rest[:cut].rstrip())
+        rest = rest[cut:].lstrip()
+    if rest or not chunks:
+        chunks.append(rest)
+    return chunks
+
+
+@contextmanager
+def skip_repeat_sends(sent: set[tuple]):
+    """
+    Within the block, a message already in `sent` is not sent again, and each
+    one that goes out is added. A handler re-run for the same inbound message
+    (e.g. after a StaleDataError) doesn't repeat "Generating..." style notices.
+    """
+    token = _already_sent.set(sent)
+    try:
+        yield
+    finally:
+        _already_sent.reset(token)
+
+
+@traced("twilio.send_message")
 async def send_message(
     to_phone: str,
     body: str,
     media_url: str | None = None,
 ) -> str:
     """Send a WhatsApp message. to_phone should be plain e.g. +917042881303."""
-    # Twilio WhatsApp has a strict body limit (~1600 chars). Split proactively.
-    # Keep chunks a bit smaller to avoid edge cases with encoding/concat.
-    max_len = 1500
-    chunks = [body[i : i + max_len] for i in range(0, len(body), max_len)] or [""]
+    sent = _already_sent.get()
+    key = (to_phone, body, media_url)
+    if sent is not None and key in sent:
+        return ""
+    client = get_http_client()
+    url = f"/2010-04-01/Accounts/{settings.twilio_account_sid}/Messages.json"
 
     last_sid = ""
-    for i, chunk in enumerate(chunks):
-        kwargs: dict[str, Any] = {
-            "from_": settings.twilio_whatsapp_from,
-            "to": f"whatsapp:{to_phone}",
-            "body": chunk,
-        }
-        # Only attach media to the first chunk
-        if media_url and i == 0:
-            kwargs["media_url"] = [media_url]
-
-        def _create() -> Any:
-            return get_twilio_client().messages.create(**kwargs)
-
-        msg = await asyncio.to_thread(_create)
-        last_sid = msg.sid
+    # Chunks for one destination go out in order; other destinations proceed in parallel.
+    async with _destination_limit(to_phone):
+        for i, chunk in enumerate(split_message(body)):
+            data: dict[str, str] = {
+                "From": settings.twilio_whatsapp_from,
+                "To": f"whatsapp:{to_phone}",
+                "Body": chunk,
+            }
+            # Only attach media to the first chunk
+            if media_url and i == 0:
+                data["MediaUrl"] = media_url
 
+            with tracer.span("twilio.send_chunk", chunk=i, chars=len(chunk)):
+                async with _global_send_limit():
+                    response = await client.post(url, data=data)
+                response.raise_for_status()
+            last_sid = response.json().get("sid", "")
+
+    if sent is not None:
+        sent.add(key)
     return last_sid
+
+
+async def send_many(messages: list[tuple[str, str]]) -> list[str | BaseException]:
+    """Send (to_phone, body) pairs concurrently; returns SIDs or exceptions in input order."""
+    return await asyncio.gather(
+        *(send_message(to_phone, body) for to_phone, body in messages),
+        return_exceptions=True,
+    )
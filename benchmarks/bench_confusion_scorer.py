@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+How many learner replies the tiered confusion scorer settles without Gemini.
+
+Replays a mix of typical WhatsApp replies (confused one-liners, on-topic
+paraphrases, ambiguous partial answers) through app.confusion.ConfusionScorer
+with a fake LLM that records each call. Replies arrive in bursts from
+--concurrency learners at once, so micro-batching can be observed too.
+
+    uv run python benchmarks/bench_confusion_scorer.py --replies 1000 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import confusion  # noqa: E402
+from app.confusion import ConfusionScorer, heuristic_score  # noqa: E402
+
+LESSON = (
+    "UPI lets you send money instantly from your bank account using a UPI ID or QR code. "
+    "Your UPI PIN is like an ATM PIN: you only enter it to send money, never to receive it. "
+    "Scammers often ask victims to enter their PIN to 'receive' a refund or prize. "
+    "Always check the payee name before paying, and never share your PIN or OTP with anyone, "
+    "even if they claim to be from your bank. Quick check: do you need your PIN to receive money?"
+)
+
+REPLIES = {
+    "confused": [
+        "idk",
+        "I don't know",
+        "no idea sorry",
+        "huh?",
+        "I'm confused",
+        "didn't understand this",
+        "what does that mean",
+        "",
+    ],
+    "understood": [
+        "You only enter your UPI PIN to send money, never to receive money. Scammers ask for "
+        "the PIN to receive a refund or prize, so never share your PIN or OTP with anyone and "
+        "check the payee name before paying.",
+        "No, the PIN is only needed to send money from your bank account. If someone asks you "
+        "to enter the UPI PIN to receive a refund it is a scam, never share the PIN or OTP even "
+        "if they say they are from the bank.",
+    ],
+    "ambiguous": [
+        "no",
+        "I think you need it sometimes",
+        "it is like an atm",
+        "you should be careful with money apps and ask your family before paying anyone",
+        "yes",
+    ],
+}
+
+
+class FakeResponse:
+    def __init__(self, content: str) -> None:
+        self.content = content
+
+
+class FakeLLM:
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.calls = 0
+        self.items = 0
+
+    async def ainvoke(self, prompt: str) -> FakeResponse:
+        self.calls += 1
+        n = prompt.count("### Item ") or 1
+        self.items += n
+        await asyncio.sleep(self.latency)
+        if n == 1 and "### Item" not in prompt:
+            return FakeResponse("0.4")
+        return FakeResponse("[" + ", ".join("0.4" for _ in range(n)) + "]")
+
+
+async def run(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    kinds = rng.choices(list(REPLIES), weights=[0.35, 0.25, 0.40], k=args.replies)
+    replies = [(kind, rng.choice(REPLIES[kind])) for kind in kinds]
+
+    local_by_kind: dict[str, list[int]] = {kind: [0, 0] for kind in REPLIES}
+    for kind, reply in replies:
+        local_by_kind[kind][1] += 1
+        if heuristic_score(LESSON, reply) is not None:
+            local_by_kind[kind][0] += 1
+
+    llm = FakeLLM(args.latency_ms / 1000)
+    confusion.get_tool_llm = lambda: llm
+    scorer = ConfusionScorer(
+        heuristics=True,
+        batch_window=args.window_ms / 1000,
+        max_batch=args.max_batch,
+        report_every=0,
+    )
+
+    start = time.perf_counter()
+    for i in range(0, len(replies), args.concurrency):
+        burst = replies[i : i + args.concurrency]
+        await asyncio.gather(*(scorer.score(LESSON, reply) for _, reply in burst))
+    elapsed = time.perf_counter() - start
+
+    stats = scorer.stats()
+    print(f"Replies:                 {stats['replies']}")
+    print(f"Scored locally:          {stats['scored_locally']} ({stats['avoided_llm_fraction']:.1%})")
+    for kind, (local, total) in local_by_kind.items():
+        print(f"  {kind:<12} {local}/{total} local")
+    print(f"Escalated to LLM:        {llm.items}")
+    print(f"LLM calls (batched):     {llm.calls}  (avg {llm.items / max(llm.calls, 1):.1f} items/call)")
+    print(f"LLM calls without tiers: {stats['replies']}")
+    print(f"Wall time:               {elapsed:.2f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--replies", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--window-ms", type=int, default=150)
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--latency-ms", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
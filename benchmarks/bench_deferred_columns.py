@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Payload size and Python allocations for lesson/mission reads, full rows vs deferred vs headers.
+
+Seeds a throwaway schema in the configured Postgres (POSTGRES_* settings) with
+missions carrying a realistic outline and lessons with multi-KB bodies, then
+runs each lookup three ways:
+
+- full:     ORM entities with the large columns undeferred (the old behaviour)
+- deferred: ORM entities with the models' default deferral
+- header:   column-only selects of the ids, order and status
+
+For each it reports decoded payload bytes per call (sum of the returned values'
+sizes, a proxy for wire transfer) and tracemalloc allocation counts / peak.
+
+    uv run python benchmarks/bench_deferred_columns.py --missions 2000 --body-bytes 6000
+"""
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, inspect, select, text  # noqa: E402
+from sqlalchemy.orm import Session, undefer  # noqa: E402
+from sqlalchemy.schema import CreateSchema, DropSchema  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.models import Lesson, Mission  # noqa: E402
+
+LESSONS_PER_MISSION = 5
+
+LESSON_HEADER = (Lesson.id, Lesson.mission_id, Lesson.order_index, Lesson.title, Lesson.status)
+MISSION_HEADER = (
+    Mission.id,
+    Mission.goal_setter_id,
+    Mission.learner_id,
+    Mission.topic,
+    Mission.status,
+    Mission.lessons_total,
+    Mission.lessons_completed,
+)
+
+
+def lookups(mission_id):
+    """(name, statement, returns ORM entities?) for each variant of each lookup."""
+    current = (Lesson.mission_id == mission_id, Lesson.status != "completed")
+    return [
+        ("current lesson / full", select(Lesson).where(*current).order_by(Lesson.order_index)
+         .limit(1).options(undefer(Lesson.content_md)), True),
+        ("current lesson / deferred", select(Lesson).where(*current).order_by(Lesson.order_index)
+         .limit(1), True),
+        ("current lesson / header", select(*LESSON_HEADER).where(*current)
+         .order_by(Lesson.order_index).limit(1), False),
+        ("mission lessons / full", select(Lesson).where(Lesson.mission_id == mission_id)
+         .options(undefer(Lesson.content_md)), True),
+        ("mission lessons / deferred", select(Lesson).where(Lesson.mission_id == mission_id), True),
+        ("mission lessons / header", select(*LESSON_HEADER).where(Lesson.mission_id == mission_id),
+         False),
+        ("mission / full", select(Mission).where(Mission.id == mission_id)
+         .options(undefer(Mission.outline_json)), True),
+        ("mission / deferred", select(Mission).where(Mission.id == mission_id), True),
+        ("mission / header", select(*MISSION_HEADER).where(Mission.id == mission_id), False),
+    ]
+
+
+def payload_bytes(rows, entities: bool) -> int:
+    total = 0
+    for row in rows:
+        if entities:
+            state = inspect(row)
+            values = [state.dict[key] for key in state.mapper.column_attrs.keys() if key in state.dict]
+        else:
+            values = list(row)
+        total += sum(len(str(value).encode()) for value in values if value is not None)
+    return total
+
+
+def seed(conn, missions: int, body_bytes: int) -> None:
+    users = max(missions // 2, 1)
+    conn.execute(text(
+        "INSERT INTO users (id, phone_number, wa_session_state, created_at) "
+        "SELECT md5('u' || g)::uuid, '+1' || lpad(g::text, 12, '0'), 'idle', now() "
+        "FROM generate_series(1, :users) g"
+    ), {"users": users})
+    conn.execute(text(
+        "INSERT INTO missions (id, goal_setter_id, learner_id, topic, status, outline_json, "
+        "                      lessons_total, lessons_completed, created_at) "
+        "SELECT md5('m' || g)::uuid, md5('u' || (g % :users + 1))::uuid, "
+        "       md5('u' || ((g + 1) % :users + 1))::uuid, 'topic ' || g, 'active', "
+        "       (SELECT jsonb_agg(jsonb_build_object('title', 'Lesson ' || i, "
+        "                                            'description', repeat('outline text ', 40))) "
+        "        FROM generate_series(0, :per - 1) i), "
+        "       :per, g % :per, now() "
+        "FROM generate_series(1, :missions) g"
+    ), {"users": users, "missions": missions, "per": LESSONS_PER_MISSION})
+    conn.execute(text(
+        "INSERT INTO lessons (id, mission_id, order_index, title, content_md, status) "
+        "SELECT md5('l' || g || '-' || i)::uuid, md5('m' || g)::uuid, i, 'Lesson ' || i, "
+        "       left(repeat('Lesson body sentence with some detail. ', :reps), :body_bytes), "
+        "       CASE WHEN i < g % :per THEN 'completed' ELSE 'pending' END "
+        "FROM generate_series(1, :missions) g, generate_series(0, :per - 1) i"
+    ), {
+        "missions": missions,
+        "per": LESSONS_PER_MISSION,
+        "reps": body_bytes // 38 + 1,
+        "body_bytes": body_bytes,
+    })
+    conn.execute(text("ANALYZE"))
+
+
+def measure(engine, mission_ids: list) -> dict[str, dict[str, float]]:
+    results: dict[str, dict[str, float]] = {}
+    for mission_id in mission_ids:
+        for name, stmt, entities in lookups(mission_id):
+            # Fresh session per call so the identity map doesn't serve cached rows.
+            with Session(engine) as session:
+                tracemalloc.start()
+                start = time.perf_counter()
+                rows = session.execute(stmt).scalars().all() if entities else session.execute(stmt).all()
+                elapsed = time.perf_counter() - start
+                snapshot = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+                stats = results.setdefault(name, {"bytes": 0, "blocks": 0, "peak": 0, "ms": 0.0})
+                stats["bytes"] += payload_bytes(rows, entities)
+                stats["blocks"] += blocks
+                stats["peak"] += peak
+                stats["ms"] += elapsed * 1000
+    n = len(mission_ids)
+    return {name: {key: value / n for key, value in stats.items()} for name, stats in results.items()}
+
+
+def report(results: dict[str, dict[str, float]]) -> None:
+    print(f"\n  {'lookup':<30}{'payload B':>12}{'alloc blocks':>14}{'peak KiB':>10}{'ms':>8}")
+    for name, stats in results.items():
+        print(
+            f"  {name:<30}{stats['bytes']:>12,.0f}{stats['blocks']:>14,.0f}"
+            f"{stats['peak'] / 1024:>10.1f}{stats['ms']:>8.2f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--missions", type=int, default=2000)
+    parser.add_argument("--body-bytes", type=int, default=6000)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--schema", default="bench_deferred")
+    parser.add_argument("--keep", action="store_true", help="don't drop the schema afterwards")
+    args = parser.parse_args()
+
+    admin = create_engine(settings.sync_database_url)
+    with admin.begin() as conn:
+        conn.execute(DropSchema(args.schema, cascade=True, if_exists=True))
+        conn.execute(CreateSchema(args.schema))
+
+    engine = create_engine(
+        settings.sync_database_url,
+        connect_args={"options": f"-csearch_path={args.schema}"},
+    )
+    try:
+        with engine.begin() as conn:
+            Base.metadata.create_all(conn)
+            seed(conn, args.missions, args.body_bytes)
+        with engine.connect() as conn:
+            mission_ids = list(conn.execute(select(Mission.id)).scalars())
+        random.shuffle(mission_ids)
+        report(measure(engine, mission_ids[: args.samples]))
+    finally:
+        engine.dispose()
+        if not args.keep:
+            with admin.begin() as conn:
+                conn.execute(DropSchema(args.schema, cascade=True, if_exists=True))
+        admin.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+PDF text extraction: the old serial loop vs app.pdf_extract's process pool.
+
+Runs both over the given PDF and reports wall time, time to the first page,
+how many pages were OCR'd, and whether the extracted text matches.
+
+    uv run python benchmarks/bench_pdf_extract.py handout.pdf --workers 8
+"""
+
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import settings  # noqa: E402
+
+# Guarded so --help works without the PDF/OCR dependencies; main() exits if missing.
+try:
+    import pymupdf
+    import pytesseract
+    from PIL import Image
+
+    from app import pdf_extract
+except ImportError as e:
+    _MISSING: ImportError | None = e
+else:
+    _MISSING = None
+
+
+def serial_extract(pdf_path: str) -> tuple[str, int]:
+    """The previous utils.extract_text_from_pdf, kept here as the baseline."""
+    doc = pymupdf.open(pdf_path)
+    text = ""
+    ocr = 0
+    for page in doc:
+        page_text = page.get_text()
+        if page_text.strip():
+            text += page_text
+        else:
+            ocr += 1
+            pix = page.get_pixmap()
+            img = Image.open(io.BytesIO(pix.tobytes("png")))
+            text += pytesseract.image_to_string(img)
+    return text, ocr
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("pdf")
+    parser.add_argument("--workers", type=int, default=0, help="0 = one per CPU")
+    parser.add_argument("--pages-per-task", type=int, default=settings.pdf_pages_per_task)
+    parser.add_argument("--skip-serial", action="store_true")
+    args = parser.parse_args()
+    if _MISSING is not None:
+        sys.exit(f"bench_pdf_extract needs the PDF/OCR dependencies (uv sync): {_MISSING}")
+    settings.pdf_extract_workers = args.workers
+
+    print(f"{args.pdf}: {pdf_extract.page_count(args.pdf)} pages")
+    if not args.skip_serial:
+        start = time.perf_counter()
+        serial_text, serial_ocr = serial_extract(args.pdf)
+        print(f"  serial:   {time.perf_counter() - start:8.2f}s  ocr pages={serial_ocr}")
+
+    # Warm the pool so process start-up isn't billed to the first document.
+    pdf_extract.get_pdf_pool().submit(int).result()
+    start = time.perf_counter()
+    first = None
+    pages = []
+    for page in pdf_extract.iter_pdf_pages(args.pdf, args.pages_per_task):
+        if first is None:
+            first = time.perf_counter() - start
+        pages.append(page)
+    total = time.perf_counter() - start
+    ocr = sum(page.ocr for page in pages)
+    print(f"  parallel: {total:8.2f}s  first page={first or 0:.2f}s  ocr pages={ocr}")
+    if not args.skip_serial:
+        same = "".join(page.text for page in pages) == serial_text
+        print(f"  identical text: {same} (differs when OCR DPI or the text-layer test differ)")
+    pdf_extract.shutdown_pdf_pool()
+
+
+if __name__ == "__main__":
+    main()
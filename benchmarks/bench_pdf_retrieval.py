@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+PDF Q&A prompt size and latency vs document size: full text vs BM25 retrieval.
+
+Generates synthetic handouts of increasing page counts, each with facts
+planted on random pages, and for every question reports:
+
+- tokens sent (≈ chars / 4) with the whole document vs the top-k chunks
+- index build time (once per document) and retrieval time per question
+- recall: how often the planted fact is inside the retrieved chunks
+
+With --live the prompts are also sent to Gemini (GOOGLE_API_KEY) and answer
+latency is timed for both modes; full-text prompts beyond the context window fail.
+
+    uv run python benchmarks/bench_pdf_retrieval.py --pages 10 50 200 800 --questions 20
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import retrieval  # noqa: E402
+from app.config import settings  # noqa: E402
+
+VOCAB = (
+    "account balance bank branch card cash charge cheque credit customer debit deposit fee form "
+    "interest limit loan mobile money number office payment pension policy rate receipt record "
+    "savings scheme service statement transfer wallet week month year village market farmer crop "
+    "season water school health clinic family member group meeting loan repayment document"
+).split()
+
+FACTS = [
+    ("What is the daily limit for UPI transfers?", "The daily UPI transfer limit is one lakh rupees"),
+    ("How long does a cheque take to clear?", "A cheque normally clears within two working days"),
+    ("What is the minimum balance for a Jan Dhan account?", "Jan Dhan accounts need zero minimum balance"),
+    ("Which helpline reports card fraud?", "Report card fraud on the national cybercrime helpline 1930"),
+    ("When is crop insurance premium due?", "Crop insurance premium is due before sowing ends in July"),
+    ("What interest does the post office savings scheme pay?", "Post office savings pays four percent interest yearly"),
+]
+
+
+def make_document(pages: int, words_per_page: int, rng: random.Random) -> tuple[list[str], dict]:
+    texts = [" ".join(rng.choices(VOCAB, k=words_per_page)) + "." for _ in range(pages)]
+    planted = {}
+    for question, fact in FACTS:
+        page = rng.randrange(pages)
+        texts[page] += f" {fact}."
+        planted[question] = fact
+    return texts, planted
+
+
+def tokens(text: str) -> int:
+    return len(text) // 4
+
+
+def run(pages: int, args, rng: random.Random, llm) -> dict:
+    texts, planted = make_document(pages, args.words_per_page, rng)
+    namespace = f"bench-{pages}-{rng.random()}"
+
+    start = time.perf_counter()
+    retrieval.index_store.get_or_build(namespace, texts)
+    build_s = time.perf_counter() - start
+
+    full_prompt = "".join(texts)
+    questions = rng.choices(list(planted), k=args.questions)
+    retrieve_ms, chunk_tokens, found, live_full, live_chunks = [], [], 0, [], []
+    for question in questions:
+        start = time.perf_counter()
+        chunks = retrieval.retrieve(namespace, texts, question, args.top_k)
+        retrieve_ms.append((time.perf_counter() - start) * 1000)
+        from_chunks = " ".join(chunk.text for chunk in chunks)
+        chunk_tokens.append(tokens(from_chunks) + tokens(question))
+        found += planted[question] in from_chunks
+        if llm is not None:
+            for prompt, bucket in ((question + "\n\n" + full_prompt, live_full),
+                                   (question + "\n\n" + from_chunks, live_chunks)):
+                start = time.perf_counter()
+                try:
+                    llm.invoke(prompt)
+                    bucket.append(time.perf_counter() - start)
+                except Exception as e:
+                    print(f"    live call failed ({len(prompt):,} chars): {e}")
+
+    return {
+        "pages": pages,
+        "full_tokens": tokens(full_prompt),
+        "chunk_tokens": statistics.mean(chunk_tokens),
+        "build_s": build_s,
+        "retrieve_ms": statistics.median(retrieve_ms),
+        "recall": found / len(questions),
+        "live_full_s": statistics.median(live_full) if live_full else None,
+        "live_chunks_s": statistics.median(live_chunks) if live_chunks else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 50, 200, 800])
+    parser.add_argument("--words-per-page", type=int, default=350)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=settings.retrieval_top_k)
+    parser.add_argument("--live", action="store_true", help="also time real Gemini answers")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    retrieval.index_store = retrieval.IndexStore(tempfile.mkdtemp(prefix="bench-index-"))
+    llm = None
+    if args.live:
+        from app.utils import get_llm
+
+        llm = get_llm()
+
+    rng = random.Random(args.seed)
+    live_header = f"{'full s':>8}{'chunks s':>9}" if args.live else ""
+    print(f"\n  {'pages':>6}{'full tok':>11}{'chunk tok':>11}{'build s':>9}"
+          f"{'retr ms':>9}{'recall':>8}{live_header}")
+    for pages in args.pages:
+        r = run(pages, args, rng, llm)
+        live = (
+            f"{r['live_full_s'] or 0:>8.2f}{r['live_chunks_s'] or 0:>9.2f}" if args.live else ""
+        )
+        print(f"  {r['pages']:>6}{r['full_tokens']:>11,}{r['chunk_tokens']:>11,.0f}{r['build_s']:>9.3f}"
+              f"{r['retrieve_ms']:>9.2f}{r['recall']:>8.0%}{live}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark for the router's hot-path queries, with and without indexes.
+
+Seeds a throwaway schema in the configured Postgres (POSTGRES_* settings) with
+N lessons (5 per mission), times the per-message lookups with only primary
+keys in place, then builds the hot-path indexes from app.models and times
+them again.
+
+    uv run python benchmarks/bench_router_queries.py --lessons 1000000
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, select, text  # noqa: E402
+from sqlalchemy.schema import CreateSchema, DropSchema  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.models import Lesson, Mission, UserProgress  # noqa: E402
+
+LESSONS_PER_MISSION = 5
+HOT_TABLES = ("missions", "lessons", "user_progress")
+
+
+def hot_path_queries(learner_id, mission_id, user_id):
+    """The mission, current-lesson and open-progress lookups behind each inbound message."""
+    return {
+        "get_active_mission_as_learner": select(Mission.id).where(
+            Mission.learner_id == learner_id, Mission.status == "active"
+        ),
+        "current_lesson": select(Lesson.id)
+        .where(Lesson.mission_id == mission_id, Lesson.status != "completed")
+        .order_by(Lesson.order_index)
+        .limit(1),
+        "get_current_progress": select(UserProgress.id).where(
+            UserProgress.user_id == user_id,
+            UserProgress.mission_id == mission_id,
+            UserProgress.status != "completed",
+        ),
+    }
+
+
+def seed(conn, missions: int) -> None:
+    users = max(missions // 2, 1)
+    conn.execute(text(
+        "INSERT INTO users (id, phone_number, wa_session_state, created_at) "
+        "SELECT md5('u' || g)::uuid, '+1' || lpad(g::text, 12, '0'), 'idle', now() "
+        "FROM generate_series(1, :users) g"
+    ), {"users": users})
+    # Each user is goal-setter for one mission and learner for another; ~1 in 5 missions active.
+    conn.execute(text(
+        "INSERT INTO missions (id, goal_setter_id, learner_id, topic, status, created_at) "
+        "SELECT md5('m' || g)::uuid, md5('u' || (g % :users + 1))::uuid, "
+        "       md5('u' || ((g + 1) % :users + 1))::uuid, 'topic ' || g, "
+        "       CASE WHEN g % 5 = 0 THEN 'active' ELSE 'completed' END, now() "
+        "FROM generate_series(1, :missions) g"
+    ), {"users": users, "missions": missions})
+    conn.execute(text(
+        "INSERT INTO lessons (id, mission_id, order_index, title, content_md, status) "
+        "SELECT md5('l' || g || '-' || i)::uuid, md5('m' || g)::uuid, i, 'Lesson ' || i, "
+        "       repeat('lesson body ', 60), "
+        "       CASE WHEN i < g % :per THEN 'completed' ELSE 'pending' END "
+        "FROM generate_series(1, :missions) g, generate_series(0, :per - 1) i"
+    ), {"missions": missions, "per": LESSONS_PER_MISSION})
+    conn.execute(text(
+        "INSERT INTO user_progress (id, mission_id, lesson_id, user_id, status, attempts) "
+        "SELECT md5('p' || g || '-' || i)::uuid, md5('m' || g)::uuid, "
+        "       md5('l' || g || '-' || i)::uuid, md5('u' || ((g + 1) % :users + 1))::uuid, "
+        "       CASE WHEN i < g % :per THEN 'completed' ELSE 'in_progress' END, 1 "
+        "FROM generate_series(1, :missions) g, generate_series(0, :per - 1) i "
+        "WHERE i <= g % :per"
+    ), {"users": users, "missions": missions, "per": LESSONS_PER_MISSION})
+    conn.execute(text("ANALYZE"))
+
+
+def sample_keys(conn, n: int) -> list[tuple]:
+    rows = conn.execute(text(
+        "SELECT learner_id, id FROM missions WHERE status = 'active' "
+        "ORDER BY random() LIMIT :n"
+    ), {"n": n}).all()
+    return [(learner_id, mission_id, learner_id) for learner_id, mission_id in rows]
+
+
+def measure(conn, keys: list[tuple]) -> dict[str, list[float]]:
+    timings: dict[str, list[float]] = {}
+    for learner_id, mission_id, user_id in keys:
+        for name, stmt in hot_path_queries(learner_id, mission_id, user_id).items():
+            start = time.perf_counter()
+            conn.execute(stmt).all()
+            timings.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label: str, timings: dict[str, list[float]]) -> None:
+    print(f"\n{label}")
+    print(f"  {'query':<32}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name, samples in timings.items():
+        samples = sorted(samples)
+        p95 = samples[int(len(samples) * 0.95) - 1] if len(samples) > 1 else samples[0]
+        print(f"  {name:<32}{statistics.median(samples):>10.3f}{p95:>10.3f}{samples[-1]:>10.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lessons", type=int, default=1_000_000)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--schema", default="bench_router")
+    parser.add_argument("--keep", action="store_true", help="don't drop the schema afterwards")
+    args = parser.parse_args()
+
+    admin = create_engine(settings.sync_database_url)
+    with admin.begin() as conn:
+        conn.execute(DropSchema(args.schema, cascade=True, if_exists=True))
+        conn.execute(CreateSchema(args.schema))
+
+    engine = create_engine(
+        settings.sync_database_url,
+        connect_args={"options": f"-csearch_path={args.schema}"},
+    )
+    hot_indexes = [
+        index
+        for name in HOT_TABLES
+        for index in Base.metadata.tables[name].indexes
+    ]
+    try:
+        with engine.begin() as conn:
+            Base.metadata.create_all(conn)
+            # Baseline: primary keys only, like the initial schema.
+            for index in hot_indexes:
+                index.drop(conn)
+            conn.execute(text("ALTER TABLE lessons DROP CONSTRAINT uq_lessons_mission_id_order_index"))
+
+        missions = args.lessons // LESSONS_PER_MISSION
+        print(f"Seeding {missions:,} missions / {missions * LESSONS_PER_MISSION:,} lessons...")
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            seed(conn, missions)
+        print(f"Seeded in {time.perf_counter() - start:.1f}s")
+
+        with engine.connect() as conn:
+            keys = sample_keys(conn, args.samples)
+            random.shuffle(keys)
+            report("Before (primary keys only)", measure(conn, keys))
+
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            for index in hot_indexes:
+                index.create(conn)
+            conn.execute(text(
+                "ALTER TABLE lessons ADD CONSTRAINT uq_lessons_mission_id_order_index "
+                "UNIQUE (mission_id, order_index)"
+            ))
+            conn.execute(text("ANALYZE"))
+        print(f"\nBuilt indexes in {time.perf_counter() - start:.1f}s")
+
+        with engine.connect() as conn:
+            report("After (hot-path indexes)", measure(conn, keys))
+    finally:
+        engine.dispose()
+        if not args.keep:
+            with admin.begin() as conn:
+                conn.execute(DropSchema(args.schema, cascade=True, if_exists=True))
+        admin.dispose()
+
+
+if __name__ == "__main__":
+    main()
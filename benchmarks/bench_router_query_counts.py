@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+SQL statements and commits per inbound message, for each router state.
+
+Drives app.inbound_queue.process_message through a full goal-setter/learner
+conversation against a throwaway schema in the configured Postgres. LLM calls,
+Twilio sends and lesson prefetching are replaced with instant fakes, so the
+numbers reflect database round-trips only.
+
+    uv run python benchmarks/bench_router_query_counts.py
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import event, text  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine  # noqa: E402
+
+from app import inbound_queue, router, variants  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.inbound_queue import QueuedMessage, process_message  # noqa: E402
+from app.prefetch import lesson_prefetcher  # noqa: E402
+
+OUTLINE = [{"title": f"Lesson {i + 1}", "description": "bench"} for i in range(5)]
+
+
+class QueryCounter:
+    def __init__(self) -> None:
+        self.statements = 0
+        self.commits = 0
+
+    def reset(self) -> None:
+        self.statements = 0
+        self.commits = 0
+
+    def attach(self, sync_engine) -> None:
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def _count_statement(conn, cursor, statement, parameters, context, executemany):
+            self.statements += 1
+
+        @event.listens_for(sync_engine, "commit")
+        def _count_commit(conn):
+            self.commits += 1
+
+
+def install_fakes() -> None:
+    async def get_outline(topic: str) -> list[dict]:
+        return OUTLINE
+
+    async def get_lesson_content(
+        topic: str, lesson_title: str, description: str, research: dict | None = None
+    ) -> str:
+        return f"Content for {lesson_title}."
+
+    async def score_confusion(lesson_content: str, learner_response: str) -> float:
+        return 0.9 if "confused" in learner_response else 0.1
+
+    async def asimplify_lesson_text(content: str, level: int = 1) -> str:
+        return f"Simpler ({level}): " + content
+
+    async def send_message(to_phone: str, body: str, media_url: str | None = None) -> str:
+        return "SMbench"
+
+    router.get_outline = get_outline
+    router.get_lesson_content = get_lesson_content
+    router.score_confusion = score_confusion
+    variants.asimplify_lesson_text = asimplify_lesson_text
+    router.send_message = send_message
+    inbound_queue.send_message = send_message
+    lesson_prefetcher.schedule = lambda *args, **kwargs: None
+
+
+async def run(args: argparse.Namespace) -> None:
+    admin = create_async_engine(settings.database_url)
+    async with admin.begin() as conn:
+        await conn.execute(text(f'DROP SCHEMA IF EXISTS "{args.schema}" CASCADE'))
+        await conn.execute(text(f'CREATE SCHEMA "{args.schema}"'))
+
+    engine = create_async_engine(
+        settings.database_url,
+        connect_args={"server_settings": {"search_path": args.schema}},
+    )
+    counter = QueryCounter()
+    counter.attach(engine.sync_engine)
+    sessions = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    inbound_queue.AsyncSessionLocal = sessions
+    variants.AsyncSessionLocal = sessions
+    install_fakes()
+
+    goal_setter = "+15550000001"
+    learner = "+15550000002"
+    conversation = [
+        ("idle (welcome)", goal_setter, "hi"),
+        ("creating_mission", goal_setter, f"phone: {learner}\ntopic: UPI safety"),
+        ("confirming_outline (yes)", goal_setter, "yes"),
+        ("mission_notified (start)", learner, "start"),
+        ("in_lesson (understood)", learner, "Never share your UPI PIN with anyone."),
+        ("in_lesson (confused)", learner, "I'm confused"),
+        ("in_lesson (understood)", learner, "Check the payee name before paying."),
+    ]
+
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        print(f"  {'state':<30}{'statements':>12}{'commits':>10}{'ms':>10}")
+        for label, phone, body in conversation:
+            counter.reset()
+            start = time.perf_counter()
+            await process_message(
+                QueuedMessage(phone=phone, body=body, wa_message_id=f"SM{uuid.uuid4().hex}")
+            )
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"  {label:<30}{counter.statements:>12}{counter.commits:>10}{elapsed:>10.1f}")
+    finally:
+        await engine.dispose()
+        if not args.keep:
+            async with admin.begin() as conn:
+                await conn.execute(text(f'DROP SCHEMA IF EXISTS "{args.schema}" CASCADE'))
+        await admin.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--schema", default="bench_router_counts")
+    parser.add_argument("--keep", action="store_true", help="don't drop the schema afterwards")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the outbound WhatsApp sender against the fake Twilio server.
+
+Starts app.fake_twilio in-process, then sends N messages to M destinations and
+reports messages/second and chunks/second. No network access or credentials needed.
+
+    uv run python benchmarks/bench_twilio_send.py --messages 500 --destinations 50 --latency-ms 80
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+async def run(args: argparse.Namespace) -> None:
+    os.environ["FAKE_TWILIO_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["TWILIO_API_BASE_URL"] = f"http://127.0.0.1:{args.port}"
+    os.environ.setdefault("TWILIO_ACCOUNT_SID", "ACbench")
+    os.environ.setdefault("TWILIO_AUTH_TOKEN", "bench")
+
+    import uvicorn
+
+    from app import fake_twilio, whatsapp
+
+    server = uvicorn.Server(
+        uvicorn.Config(fake_twilio.app, host="127.0.0.1", port=args.port, log_level="warning")
+    )
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    body = ("This is a benchmark lesson sentence. " * (args.body_chars // 37 + 1))[: args.body_chars]
+    batch = [(f"+1555{i % args.destinations:07d}", body) for i in range(args.messages)]
+
+    start = time.perf_counter()
+    results = await whatsapp.send_many(batch)
+    elapsed = time.perf_counter() - start
+
+    errors = [r for r in results if isinstance(r, BaseException)]
+    chunks = len(fake_twilio.sent_messages)
+    print(f"messages:     {args.messages} ({len(errors)} failed)")
+    print(f"destinations: {args.destinations}")
+    print(f"chunks sent:  {chunks}")
+    print(f"elapsed:      {elapsed:.2f}s")
+    print(f"throughput:   {args.messages / elapsed:.1f} msg/s, {chunks / elapsed:.1f} chunks/s")
+
+    await whatsapp.close_http_client()
+    server.should_exit = True
+    await server_task
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--destinations", type=int, default=20)
+    parser.add_argument("--body-chars", type=int, default=2500)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--port", type=int, default=8099)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
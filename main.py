@@ -4,24 +4,70 @@ Handles file uploads, preprocessing, and AI-powered learning assistance.
 """
 
 import logging
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse
 
 logging.basicConfig(
     level=logging.INFO,
     format="%(levelname)s: %(name)s: %(message)s",
 )
 
+from app.agent import llm_gateway
+from app.inbound_queue import inbound_workers
+from app.jobs import job_runner
+from app.notifications import notification_dispatcher
+from app.pdf_extract import shutdown_pdf_pool
 from app.routes import router as app_router
+from app.session_state import session_state_cache
+from app.tracing import tracer
+from app.uploads import max_upload_bytes, shutdown_processing_pool
 from app.webhook import webhook_router
+from app.whatsapp import close_http_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start/stop background workers alongside the app."""
+    await session_state_cache.start()
+    await inbound_workers.start()
+    await notification_dispatcher.start()
+    await job_runner.start()
+    yield
+    await job_runner.stop()
+    await notification_dispatcher.stop()
+    await inbound_workers.stop()
+    await session_state_cache.stop()
+    await close_http_client()
+    shutdown_pdf_pool()
+    shutdown_processing_pool()
+    tracer.close()
+
 
 app = FastAPI(
     title="LearnADo",
     description="AI-powered learning assistant for document processing and analysis",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
+# Room for the multipart framing and form fields around the file itself.
+_MULTIPART_OVERHEAD = 64 * 1024
+
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Answer 413 before the body is read when Content-Length is already over the limit"""
+    length = request.headers.get("content-length", "")
+    if (
+        request.url.path.startswith("/api")
+        and length.isdigit()
+        and int(length) > max_upload_bytes() + _MULTIPART_OVERHEAD
+    ):
+        return JSONResponse(status_code=413, content={"detail": "File too large"})
+    return await call_next(request)
+
 @app.get("/")
 async def root():
     """Redirect to API documentation"""
@@ -32,6 +78,12 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "LearnADo"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Per-stage latency histograms and LLM gateway gauges in Prometheus text format"""
+    body = tracer.metrics() + llm_gateway.render_metrics()
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
 # API routes under /api
 app.include_router(app_router, prefix="/api")
 # WhatsApp webhook at /webhook/whatsapp (no prefix; Twilio calls this URL)
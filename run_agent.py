@@ -4,12 +4,14 @@ CLI interface to run the LearnaDo agent.
 Provides an interactive command-line interface for step-by-step micro-course generation.
 """
 
+import argparse
 import sys
 from rich.console import Console
+from rich.live import Live
 from rich.markdown import Markdown
 from rich.panel import Panel
 from rich.table import Table
-from app.agent import learnado_graph, search_and_lesson_graph
+from app.agent import LessonStream, learnado_graph, search_and_lesson_graph
 
 console = Console()
 
@@ -61,7 +63,11 @@ def display_lesson(lesson, lesson_num, total_lessons):
         padding=(1, 2)
     ))
 
-    # Display sources with relevance scores (only show sources >= 0.7)
+    display_sources(sources)
+
+
+def display_sources(sources):
+    """Display sources with relevance scores (only show sources >= 0.7)."""
     if sources:
         # Filter sources by threshold
         filtered_sources = [s for s in sources if s.get('score', 0.0) >= 0.7]
@@ -78,8 +84,66 @@ def display_lesson(lesson, lesson_num, total_lessons):
     console.print()
 
 
+def stream_lesson(state, lesson_num, total_lessons):
+    """
+    Generate the next lesson with streaming and render it live as tokens arrive.
+    Returns the lesson_synthesizer-style state update.
+    """
+    stream = LessonStream(state)
+    outline = state.get("outline") or []
+    index = state.get("current_lesson_index") or 0
+    topic = outline[index] if index < len(outline) else ""
+    header = f"📖 Lesson {lesson_num}/{total_lessons}: {topic}"
+    text = ""
+
+    console.print("\n")
+    with Live(
+        Panel("[dim]…[/dim]", title=header, border_style="cyan", padding=(1, 2)),
+        console=console,
+        refresh_per_second=12,
+        vertical_overflow="visible",
+    ) as live:
+        for delta in stream:
+            text += delta
+            live.update(Panel(Markdown(text), title=header, border_style="cyan", padding=(1, 2)))
+
+        lesson = (stream.result or {}).get("current_lesson")
+        if lesson:
+            # Swap in the title from the trailer once the stream has finished.
+            title = f"📖 Lesson {lesson_num}/{total_lessons}: {lesson['title']}"
+            live.update(Panel(Markdown(lesson["content"]), title=title, border_style="cyan", padding=(1, 2)))
+
+    if lesson:
+        display_sources(lesson.get("sources", []))
+    if stream.total_s is not None:
+        ttft = f"{stream.first_token_s:.2f}s" if stream.first_token_s is not None else "n/a"
+        console.print(f"[dim]⏱  first token {ttft} · total {stream.total_s:.2f}s[/dim]\n")
+    return stream.result or {"error": "No lesson was generated"}
+
+
+def generate_lesson(state, lesson_num, total_lessons, streaming):
+    """Generate and display the next lesson; returns the state update."""
+    if streaming:
+        return stream_lesson(state, lesson_num, total_lessons)
+
+    from app.agent import lesson_synthesizer
+    lesson_result = lesson_synthesizer(state)
+    if lesson_result.get("current_lesson"):
+        display_lesson(lesson_result["current_lesson"], lesson_num, total_lessons)
+    return lesson_result
+
+
 def main():
     """Run the interactive agent CLI."""
+    parser = argparse.ArgumentParser(description="LearnaDo interactive micro-course generator")
+    parser.add_argument(
+        "--no-stream",
+        action="store_true",
+        help="wait for each full lesson instead of streaming it as it is written",
+    )
+    args = parser.parse_args()
+    streaming = not args.no_stream
+
     print_welcome()
 
     try:
@@ -253,9 +317,8 @@ Just ask me what you'd like to learn about, and I'll create a personalized cours
                 # ========== PHASE 5: DELIVER LESSONS ONE BY ONE ==========
                 console.print(f"\n[bold cyan]✍️  Generating lesson 1...[/bold cyan]")
 
-                # Generate first lesson
-                from app.agent import lesson_synthesizer
-                lesson_result = lesson_synthesizer(state)
+                # Generate and display the first lesson
+                lesson_result = generate_lesson(state, 1, len(outline), streaming)
 
                 if lesson_result.get("error"):
                     console.print(f"\n[bold red]❌ Error:[/bold red] {lesson_result['error']}")
@@ -268,9 +331,6 @@ Just ask me what you'd like to learn about, and I'll create a personalized cours
                     console.print("\n[yellow]⚠️  No lesson was generated. Please try again.[/yellow]")
                     continue
 
-                # Display the first lesson
-                display_lesson(current_lesson, 1, len(outline))
-
                 # Continue generating and displaying remaining lessons
                 for i in range(2, len(outline) + 1):
                     # Ask if user wants the next lesson
@@ -287,18 +347,14 @@ Just ask me what you'd like to learn about, and I'll create a personalized cours
                     console.print(f"\n[bold cyan]✍️  Generating lesson {i}...[/bold cyan]")
 
                     # Generate next lesson (using cached search results)
-                    lesson_result = lesson_synthesizer(state)
+                    lesson_result = generate_lesson(state, i, len(outline), streaming)
 
                     if lesson_result.get("error"):
                         console.print(f"\n[bold red]❌ Error:[/bold red] {lesson_result['error']}")
                         break
 
                     state.update(lesson_result)
-                    current_lesson = state.get("current_lesson")
-
-                    if current_lesson:
-                        display_lesson(current_lesson, i, len(outline))
-                    else:
+                    if not state.get("current_lesson"):
                         break
 
                 # Course complete
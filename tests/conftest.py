@@ -0,0 +1,62 @@
+"""
+Shared fixtures.
+"""
+
+import pytest
+
+
+class FakeSessions:
+    """
+    Stands in for AsyncSessionLocal. Every session is this object: it counts
+    open sessions and commits, records each statement, and answers execute()
+    and scalar() with respond(stmt).
+    """
+
+    def __init__(self, respond=None) -> None:
+        self.respond = respond or (lambda stmt: None)
+        self.opened = 0
+        self.open = 0
+        self.commits = 0
+        self.statements: list = []
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        self.opened += 1
+        self.open += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self.open -= 1
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        return self.respond(stmt)
+
+    async def scalar(self, stmt):
+        self.statements.append(stmt)
+        return self.respond(stmt)
+
+    async def commit(self):
+        self.commits += 1
+
+    @property
+    def updates(self) -> list:
+        return [stmt for stmt in self.statements if stmt.is_update]
+
+    @property
+    def inserts(self) -> list:
+        return [stmt for stmt in self.statements if stmt.is_insert]
+
+
+@pytest.fixture
+def fake_sessions(monkeypatch):
+    """fake_sessions(module, respond=None) patches module.AsyncSessionLocal with a FakeSessions."""
+
+    def install(module, respond=None) -> FakeSessions:
+        sessions = FakeSessions(respond)
+        monkeypatch.setattr(module, "AsyncSessionLocal", sessions)
+        return sessions
+
+    return install
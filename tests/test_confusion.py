@@ -0,0 +1,42 @@
+"""
+Confusion heuristic: only bare confusion replies are scored locally.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app import confusion as confusion_module
+from app.confusion import CONFUSED_SCORE, ConfusionScorer, heuristic_score
+
+LESSON = "Never share your OTP with anyone, not even someone who says they are from the bank."
+
+
+@pytest.mark.parametrize("reply", ["idk", "Not sure", "sorry, I'm confused", "huh?", "   "])
+def test_bare_confusion_is_scored_locally(reply):
+    assert heuristic_score(LESSON, reply) == CONFUSED_SCORE
+
+
+@pytest.mark.parametrize(
+    "reply",
+    ["not sure but never share OTP", "confused, is it the PIN?", "I'm not sure, the bank never asks"],
+)
+def test_confusion_phrase_with_an_answer_is_left_to_the_llm(reply):
+    assert heuristic_score(LESSON, reply) is None
+
+
+def test_hedged_answer_goes_through_the_llm(monkeypatch):
+    prompts = []
+
+    class FakeLLM:
+        async def ainvoke(self, prompt):
+            prompts.append(prompt)
+            return SimpleNamespace(content="0.2")
+
+    monkeypatch.setattr(confusion_module, "get_tool_llm", lambda: FakeLLM())
+    scorer = ConfusionScorer(heuristics=True, batch_window=0.001, max_batch=4)
+    score = asyncio.run(scorer.score(LESSON, "not sure but never share OTP"))
+
+    assert score == 0.2
+    assert len(prompts) == 1 and scorer.local == 0
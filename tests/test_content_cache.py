@@ -0,0 +1,109 @@
+"""
+ContentCacheStore (memory LRU over Postgres, TTL) and lesson caching in agent_bridge.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app import agent_bridge
+from app import content_cache as content_cache_module
+from app.content_cache import ContentCacheStore, make_key
+
+
+def make_store(monkeypatch, rows=None, memory_entries=10) -> ContentCacheStore:
+    """Store whose Postgres side is a dict of key -> (payload, created_at)."""
+    store = ContentCacheStore(ttl_seconds=3600, memory_entries=memory_entries, max_rows=100)
+    store.rows = rows if rows is not None else {}
+    store.db_reads = 0
+
+    async def db_get(key):
+        store.db_reads += 1
+        return store.rows.get(key)
+
+    async def db_put(key, kind, payload):
+        store.rows[key] = (payload, datetime.now(timezone.utc))
+
+    monkeypatch.setattr(store, "_db_get", db_get)
+    monkeypatch.setattr(store, "_db_put", db_put)
+    return store
+
+
+def test_keys_ignore_case_whitespace_and_punctuation():
+    assert make_key("lesson", "UPI  Safety!", "Pins", "v1", "m") == make_key(
+        "lesson", "upi safety", "pins", "v1", "m"
+    )
+    assert make_key("lesson", "upi safety", "pins", "v2", "m") != make_key(
+        "lesson", "upi safety", "pins", "v1", "m"
+    )
+
+
+def test_put_then_get_is_served_from_memory(monkeypatch):
+    store = make_store(monkeypatch)
+
+    async def scenario():
+        await store.put("k", "lesson", {"content": "x"})
+        return await store.get("k")
+
+    assert asyncio.run(scenario()) == {"content": "x"}
+    assert store.db_reads == 0 and store.memory_hits == 1
+
+
+def test_memory_ttl_counts_from_the_rows_creation(monkeypatch):
+    written = datetime.now(timezone.utc) - timedelta(seconds=3500)  # 100s of TTL left
+    store = make_store(monkeypatch, {"k": ({"content": "old"}, written)})
+    clock = [1000.0]
+    monkeypatch.setattr(content_cache_module.time, "monotonic", lambda: clock[0])
+
+    async def scenario():
+        assert await store.get("k") == {"content": "old"}  # from Postgres
+        clock[0] += 50
+        assert await store.get("k") == {"content": "old"}  # from memory
+        clock[0] += 60
+        store.rows.clear()  # expired in Postgres too
+        return await store.get("k")
+
+    assert asyncio.run(scenario()) is None
+    assert (store.db_hits, store.memory_hits, store.misses) == (1, 1, 1)
+
+
+def test_lru_keeps_the_most_recent_entries(monkeypatch):
+    store = make_store(monkeypatch, memory_entries=2)
+
+    async def scenario():
+        for key in ("a", "b", "c"):
+            await store.put(key, "lesson", key)
+
+    asyncio.run(scenario())
+    assert list(store._lru) == ["b", "c"]
+
+
+def test_lesson_written_without_research_is_not_cached(monkeypatch):
+    store = make_store(monkeypatch)
+    monkeypatch.setattr(agent_bridge, "content_cache", store)
+
+    async def research(topic, title):
+        return {"error": "tavily 432"}
+
+    async def synthesize(topic, title, description, research):
+        return f"{title} (no sources)"
+
+    monkeypatch.setattr(agent_bridge, "aresearch_lesson", research)
+    monkeypatch.setattr(agent_bridge, "asynthesize_lesson_text", synthesize)
+
+    content = asyncio.run(agent_bridge.generate_lesson_content("UPI", "PINs", ""))
+    assert content == "PINs (no sources)"
+    assert store.rows == {} and not store._lru
+
+
+def test_lesson_with_research_is_cached(monkeypatch):
+    store = make_store(monkeypatch)
+    monkeypatch.setattr(agent_bridge, "content_cache", store)
+
+    async def synthesize(topic, title, description, research):
+        return "PINs are secret"
+
+    monkeypatch.setattr(agent_bridge, "asynthesize_lesson_text", synthesize)
+
+    research = {"results": [{"content": "Never share your PIN"}]}
+    asyncio.run(agent_bridge.generate_lesson_content("UPI", "PINs", "", research))
+    assert [payload for payload, _ in store.rows.values()] == [{"content": "PINs are secret"}]
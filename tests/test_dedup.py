@@ -0,0 +1,25 @@
+"""
+RecentMessageIds: bounded LRU of webhook outcomes keyed on MessageSid.
+"""
+
+from app.dedup import RecentMessageIds
+
+
+def test_remembered_outcome_is_returned_and_counted_as_duplicate():
+    ids = RecentMessageIds(max_size=4)
+    assert ids.get("SM1") is None
+    ids.remember("SM1", {"status": "ok"})
+
+    assert ids.get("SM1") == {"status": "ok"}
+    assert ids.duplicates == 1
+
+
+def test_least_recently_seen_id_is_evicted():
+    ids = RecentMessageIds(max_size=2)
+    ids.remember("SM1", {"n": 1})
+    ids.remember("SM2", {"n": 2})
+    ids.get("SM1")  # SM2 is now the oldest
+    ids.remember("SM3", {"n": 3})
+
+    assert ids.get("SM2") is None
+    assert ids.get("SM1") == {"n": 1} and ids.get("SM3") == {"n": 3}
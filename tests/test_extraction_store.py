@@ -0,0 +1,94 @@
+"""
+Disk extraction store: round trip, concurrent writes and size-based eviction.
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+from app.extraction_store import (
+    PDF_PAGES,
+    TRANSCRIPT,
+    DiskExtractionBackend,
+    ExtractionStore,
+    sha256_file,
+)
+
+SHA = "ab" * 32
+
+
+def test_round_trip_and_counters(tmp_path):
+    store = ExtractionStore(DiskExtractionBackend(str(tmp_path), max_bytes=1 << 20))
+
+    async def scenario():
+        assert await store.get(SHA, TRANSCRIPT) is None
+        await store.put(SHA, TRANSCRIPT, "hello")
+        return await store.get(SHA, TRANSCRIPT)
+
+    assert asyncio.run(scenario()) == "hello"
+    assert store.stats() == {"hits": 1, "misses": 1}
+
+
+def test_get_or_extract_runs_extract_once(tmp_path):
+    store = ExtractionStore(DiskExtractionBackend(str(tmp_path), max_bytes=1 << 20))
+    calls = []
+
+    def extract():
+        calls.append(1)
+        return [{"text": "page", "ocr": False}]
+
+    async def scenario():
+        first = await store.get_or_extract(SHA, PDF_PAGES, extract)
+        second = await store.get_or_extract(SHA, PDF_PAGES, extract)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == second and len(calls) == 1
+
+
+def test_concurrent_puts_of_one_key_do_not_collide(tmp_path):
+    backend = DiskExtractionBackend(str(tmp_path), max_bytes=1 << 20)
+    threads = 8
+    barrier = threading.Barrier(threads)
+    errors: list[BaseException] = []
+
+    def put():
+        barrier.wait()
+        try:
+            for _ in range(20):
+                backend.put(SHA, PDF_PAGES, [{"text": "x" * 100, "ocr": False}])
+        except BaseException as e:  # pragma: no cover - the regression
+            errors.append(e)
+
+    workers = [threading.Thread(target=put) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert errors == []
+    assert list(tmp_path.rglob("*.tmp")) == []
+    assert backend.get(SHA, PDF_PAGES) is not None
+
+
+def test_evicts_least_recently_used_past_max_bytes(tmp_path):
+    backend = DiskExtractionBackend(str(tmp_path), max_bytes=250)
+    old, recent, new = "11" * 32, "22" * 32, "33" * 32
+    backend.put(old, TRANSCRIPT, "a" * 100)
+    backend.put(recent, TRANSCRIPT, "b" * 100)
+    # Make `old` the least recently accessed, then touch `recent`.
+    past = time.time() - 60
+    os.utime(backend._path(old, TRANSCRIPT), (past, past))
+    backend.get(recent, TRANSCRIPT)
+
+    backend.put(new, TRANSCRIPT, "c" * 100)
+    assert backend.get(old, TRANSCRIPT) is None
+    assert backend.get(recent, TRANSCRIPT) == "b" * 100
+    assert backend.get(new, TRANSCRIPT) == "c" * 100
+
+
+def test_sha256_file(tmp_path):
+    path = tmp_path / "f.bin"
+    path.write_bytes(b"abc")
+    assert sha256_file(path) == "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"
@@ -0,0 +1,177 @@
+"""
+InboundWorkerPool with the in-memory queue: ordering, retries, failure replies,
+foreign cancellations and periodic lease requeueing.
+"""
+
+import asyncio
+
+from app import inbound_queue as inbound_module
+from app.inbound_queue import (
+    ERROR_REPLY,
+    InboundWorkerPool,
+    MemoryInboundQueue,
+    PostgresInboundQueue,
+    QueuedMessage,
+)
+
+
+def patch(monkeypatch, handler):
+    sent: list[tuple[str, str]] = []
+
+    async def send_message(phone, body, media_url=None):
+        sent.append((phone, body))
+
+    monkeypatch.setattr(inbound_module, "process_message", handler)
+    monkeypatch.setattr(inbound_module, "send_message", send_message)
+    return sent
+
+
+async def run_pool(pool: InboundWorkerPool, messages: list[QueuedMessage], until) -> None:
+    await pool.start()
+    try:
+        for msg in messages:
+            await pool.queue.put(msg)
+        for _ in range(200):
+            if until():
+                return
+            await asyncio.sleep(0.005)
+        raise AssertionError("pool did not finish in time")
+    finally:
+        await pool.stop()
+
+
+def test_messages_from_one_phone_run_in_order(monkeypatch):
+    handled: list[str] = []
+
+    async def handler(msg):
+        await asyncio.sleep(0.001)
+        handled.append(msg.body)
+
+    patch(monkeypatch, handler)
+    pool = InboundWorkerPool(MemoryInboundQueue(), concurrency=4)
+    bodies = [str(i) for i in range(10)]
+    messages = [QueuedMessage(phone="+91001", body=b) for b in bodies]
+    asyncio.run(run_pool(pool, messages, lambda: len(handled) == 10))
+    assert handled == bodies
+
+
+def test_failing_message_is_retried_then_failed_with_a_reply(monkeypatch):
+    attempts: dict[str, int] = {}
+    handled: list[str] = []
+
+    async def handler(msg):
+        attempts[msg.body] = msg.attempts
+        if msg.body == "boom":
+            raise RuntimeError("router exploded")
+        handled.append(msg.body)
+
+    sent = patch(monkeypatch, handler)
+    pool = InboundWorkerPool(MemoryInboundQueue(), concurrency=2, max_attempts=3)
+    messages = [QueuedMessage(phone="+91001", body="boom"), QueuedMessage(phone="+91001", body="next")]
+    asyncio.run(run_pool(pool, messages, lambda: handled == ["next"]))
+
+    assert attempts["boom"] == 3
+    assert sent == [("+91001", ERROR_REPLY)]
+    # The lane was released: the phone's next message still got served.
+    assert handled == ["next"]
+
+
+def test_transient_failure_is_retried_without_error_reply(monkeypatch):
+    handled: list[int] = []
+
+    async def handler(msg):
+        if msg.attempts == 1:
+            raise RuntimeError("db blip")
+        handled.append(msg.attempts)
+
+    sent = patch(monkeypatch, handler)
+    pool = InboundWorkerPool(MemoryInboundQueue(), concurrency=1, max_attempts=3)
+    asyncio.run(run_pool(pool, [QueuedMessage(phone="+91001", body="hi")], lambda: handled))
+    assert handled == [2]
+    assert sent == []
+
+
+def test_foreign_cancellation_does_not_kill_the_worker(monkeypatch):
+    handled: list[str] = []
+
+    async def handler(msg):
+        if msg.body == "cancelled":
+            # e.g. a shared search whose leader was cancelled elsewhere
+            raise asyncio.CancelledError()
+        handled.append(msg.body)
+
+    sent = patch(monkeypatch, handler)
+    pool = InboundWorkerPool(MemoryInboundQueue(), concurrency=1, max_attempts=1)
+    messages = [QueuedMessage(phone="+91001", body="cancelled"), QueuedMessage(phone="+91001", body="after")]
+    asyncio.run(run_pool(pool, messages, lambda: handled == ["after"]))
+    # The same single worker went on to serve the next message.
+    assert sent == [("+91001", ERROR_REPLY)]
+
+
+def test_stop_cancels_workers_mid_message(monkeypatch):
+    async def handler(msg):
+        await asyncio.Event().wait()
+
+    patch(monkeypatch, handler)
+
+    async def scenario():
+        pool = InboundWorkerPool(MemoryInboundQueue(), concurrency=2)
+        await pool.start()
+        await pool.queue.put(QueuedMessage(phone="+91001", body="slow"))
+        await asyncio.sleep(0.01)
+        tasks = list(pool._tasks)
+        await pool.stop()
+        return tasks
+
+    tasks = asyncio.run(scenario())
+    assert all(task.cancelled() for task in tasks)
+
+
+def test_postgres_pool_requeues_stale_messages_periodically(monkeypatch):
+    calls = 0
+
+    async def requeue_stale():
+        nonlocal calls
+        calls += 1
+        return 0
+
+    async def claim():
+        await asyncio.Event().wait()
+
+    queue = PostgresInboundQueue(poll_interval=0.01, lease_seconds=0.02)
+    monkeypatch.setattr(queue, "requeue_stale", requeue_stale)
+    monkeypatch.setattr(queue, "claim", claim)
+
+    async def scenario():
+        pool = InboundWorkerPool(queue, concurrency=1)
+        await pool.start()
+        await asyncio.sleep(0.06)
+        await pool.stop()
+
+    asyncio.run(scenario())
+    # Once at start, then every half lease.
+    assert calls >= 3
+
+
+def test_failed_reply_send_is_retried_without_routing_again(monkeypatch):
+    routed: list[str] = []
+    sent: list[str] = []
+
+    async def route(msg):
+        routed.append(msg.body)
+        return "Lesson 1: Saving", None
+
+    async def send_message(phone, body, media_url=None):
+        if not sent:
+            sent.append("failed")
+            raise RuntimeError("twilio 503")
+        sent.append(body)
+
+    monkeypatch.setattr(inbound_module, "_route", route)
+    monkeypatch.setattr(inbound_module, "send_message", send_message)
+    pool = InboundWorkerPool(MemoryInboundQueue(), concurrency=1, max_attempts=3)
+    messages = [QueuedMessage(phone="+91001", body="yes", wa_message_id="SM1")]
+    asyncio.run(run_pool(pool, messages, lambda: len(sent) == 2))
+
+    assert routed == ["yes"]
+    assert sent == ["failed", "Lesson 1: Saving"]
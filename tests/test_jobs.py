@@ -0,0 +1,99 @@
+"""
+JobRunner: one active job per upload, and wait() leaving no completion events behind.
+"""
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pymupdf")
+
+from app import jobs as jobs_module  # noqa: E402
+from app.jobs import JobRunner  # noqa: E402
+
+
+def runner() -> JobRunner:
+    return JobRunner(workers=1, poll_interval=0.01, lease_seconds=60, results_dir="unused")
+
+
+def job(status: str, kind: str = "pdf_pages", job_id: uuid.UUID | None = None):
+    return SimpleNamespace(id=job_id or uuid.uuid4(), status=status, kind=kind, result_path=None)
+
+
+def latest(row):
+    """respond() for FakeSessions: `row` as the latest job."""
+    return lambda stmt: SimpleNamespace(scalar_one_or_none=lambda: row)
+
+
+def test_submit_returns_the_active_job_instead_of_queueing(fake_sessions):
+    running = job("running")
+    sessions = fake_sessions(jobs_module, latest(running))
+
+    assert asyncio.run(runner().submit(SimpleNamespace(id=uuid.uuid4()), "pdf_pages")) is running
+    assert sessions.inserts == []
+
+
+def test_submit_losing_the_insert_race_returns_the_winners_job(fake_sessions):
+    winner = job("queued")
+
+    def respond(stmt):
+        if stmt.is_insert:
+            return None  # ON CONFLICT DO NOTHING: another submit got there first
+        if len(sessions.statements) == 1:
+            return SimpleNamespace(scalar_one_or_none=lambda: None)
+        return winner
+
+    sessions = fake_sessions(jobs_module, respond)
+    assert asyncio.run(runner().submit(SimpleNamespace(id=uuid.uuid4()), "pdf_pages")) is winner
+    assert len(sessions.inserts) == 1 and sessions.commits == 1
+
+
+def test_failed_job_is_resubmitted(fake_sessions):
+    fresh = job("queued")
+    sessions = fake_sessions(
+        jobs_module,
+        lambda stmt: fresh if stmt.is_insert else SimpleNamespace(scalar_one_or_none=lambda: job("failed")),
+    )
+
+    assert asyncio.run(runner().submit(SimpleNamespace(id=uuid.uuid4()), "pdf_pages")) is fresh
+    assert len(sessions.inserts) == 1
+
+
+def test_wait_times_out_and_drops_its_event(monkeypatch):
+    jobs = runner()
+    queued = job("queued")
+
+    async def latest_job(upload_id):
+        return queued
+
+    monkeypatch.setattr(jobs, "latest_job", latest_job)
+
+    async def scenario():
+        return await asyncio.gather(*(jobs.wait(uuid.uuid4(), timeout=0.05) for _ in range(3)))
+
+    assert asyncio.run(scenario()) == [queued] * 3
+    assert jobs._finished == {} and not jobs._waiters
+
+
+def test_wait_returns_once_the_job_finishes(monkeypatch):
+    jobs = runner()
+    jobs.poll_interval = 5  # only the event can wake the waiter in time
+    current = [job("running")]
+
+    async def latest_job(upload_id):
+        return current[0]
+
+    monkeypatch.setattr(jobs, "latest_job", latest_job)
+
+    async def scenario():
+        waiter = asyncio.create_task(jobs.wait(uuid.uuid4(), timeout=2))
+        await asyncio.sleep(0.01)
+        job_id = current[0].id
+        current[0] = job("succeeded", job_id=job_id)
+        jobs._finished.pop(job_id).set()  # what _execute does on completion
+        return await waiter
+
+    assert asyncio.run(scenario()).status == "succeeded"
+    assert jobs._finished == {} and not jobs._waiters
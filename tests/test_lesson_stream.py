@@ -0,0 +1,63 @@
+"""
+LessonStream: the body streams as it arrives and the <<<LESSON_META>>> trailer
+is held back, even when the marker is split across chunks.
+"""
+
+from types import SimpleNamespace
+
+from app import agent as agent_module
+from app.agent import LESSON_TRAILER_MARKER, LessonStream
+
+SOURCE_URL = "https://rbi.org.in/upi"
+
+
+def stream_of(monkeypatch, chunks):
+    class FakeLLM:
+        def stream(self, prompt):
+            for chunk in chunks:
+                yield SimpleNamespace(content=chunk)
+
+    monkeypatch.setattr(agent_module, "get_tool_llm", lambda: FakeLLM())
+    state = {
+        "outline": ["UPI PINs"],
+        "retrieved_facts": {"UPI PINs": {"results": [{"title": "RBI", "url": SOURCE_URL}]}},
+        "current_lesson_index": 0,
+        "synthesized_lessons": [],
+    }
+    return LessonStream(state)
+
+
+def test_trailer_split_across_chunks_is_never_emitted(monkeypatch):
+    text = f"Never share your PIN.\n{LESSON_TRAILER_MARKER}\n" + '{"title": "PIN safety", "sources": ["%s"]}' % SOURCE_URL
+    chunks = [text[i : i + 3] for i in range(0, len(text), 3)]
+    stream = stream_of(monkeypatch, chunks)
+
+    emitted = list(stream)
+
+    assert "".join(emitted) == "Never share your PIN.\n"
+    assert not any("<<<" in part for part in emitted)
+    lesson = stream.result["current_lesson"]
+    assert lesson["title"] == "PIN safety"
+    assert lesson["content"] == "Never share your PIN."
+    assert [s["cited"] for s in lesson["sources"]] == [True]
+    assert stream.result["current_lesson_index"] == 1
+
+
+def test_body_streams_before_the_end(monkeypatch):
+    stream = stream_of(monkeypatch, ["First paragraph is long enough to flush. ", "Second.", LESSON_TRAILER_MARKER, "{}"])
+    parts = iter(stream)
+
+    # The first chunk is out before the rest of the stream has been read.
+    assert next(parts).startswith("First paragraph")
+    assert stream.result is None
+    list(parts)
+    assert stream.result["current_lesson"]["content"] == "First paragraph is long enough to flush. Second."
+
+
+def test_missing_trailer_falls_back_to_the_topic(monkeypatch):
+    stream = stream_of(monkeypatch, ["Short <<", "< lesson"])
+
+    assert "".join(stream) == "Short <<< lesson"
+    lesson = stream.result["current_lesson"]
+    assert lesson["title"] == "UPI PINs"
+    assert [s["cited"] for s in lesson["sources"]] == [False]
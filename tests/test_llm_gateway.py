@@ -0,0 +1,246 @@
+"""
+LLMGateway: retries, circuit breaker and the half-open probe.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.agent import LLMGateway, LLMUnavailableError
+
+COOLDOWN = 0.05
+
+
+class Status(Exception):
+    def __init__(self, status_code: int) -> None:
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def make_gateway(**overrides) -> LLMGateway:
+    options = dict(
+        requests_per_minute=60_000,
+        tokens_per_minute=10_000_000,
+        max_retries=0,
+        retry_base_seconds=0,
+        retry_max_seconds=0,
+        breaker_threshold=2,
+        breaker_cooldown_seconds=COOLDOWN,
+    )
+    options.update(overrides)
+    return LLMGateway(**options)
+
+
+async def ok():
+    return "ok"
+
+
+async def unavailable():
+    raise Status(503)
+
+
+async def bad_request():
+    raise Status(400)
+
+
+async def open_breaker(gateway: LLMGateway) -> None:
+    for _ in range(gateway.breaker_threshold):
+        with pytest.raises(Status):
+            await gateway.acall(unavailable, "prompt")
+    assert gateway.stats()["breaker"] == "open"
+
+
+async def past_cooldown() -> None:
+    await asyncio.sleep(COOLDOWN * 1.5)
+
+
+def test_retries_retryable_errors_then_succeeds():
+    gateway = make_gateway(max_retries=2, breaker_threshold=5)
+    outcomes = [Status(429), Status(503)]
+
+    async def flaky():
+        if outcomes:
+            raise outcomes.pop(0)
+        return "ok"
+
+    assert asyncio.run(gateway.acall(flaky, "prompt")) == "ok"
+    assert gateway.retries == 2
+    assert gateway.stats()["breaker"] == "closed"
+
+
+def test_non_retryable_error_is_not_retried_and_does_not_trip_breaker():
+    gateway = make_gateway(max_retries=3)
+
+    async def scenario():
+        for _ in range(5):
+            with pytest.raises(Status):
+                await gateway.acall(bad_request, "prompt")
+
+    asyncio.run(scenario())
+    assert gateway.calls == 5
+    assert gateway.stats()["breaker"] == "closed"
+
+
+def test_open_breaker_rejects_until_cooldown_then_probe_closes_it():
+    gateway = make_gateway()
+
+    async def scenario():
+        await open_breaker(gateway)
+        with pytest.raises(LLMUnavailableError):
+            await gateway.acall(ok, "prompt")
+        await past_cooldown()
+        assert await gateway.acall(ok, "prompt") == "ok"
+        assert await gateway.acall(ok, "prompt") == "ok"
+
+    asyncio.run(scenario())
+    assert gateway.stats()["breaker"] == "closed"
+    assert gateway.rejected == 1
+
+
+def test_only_one_probe_while_half_open():
+    gateway = make_gateway()
+
+    async def scenario():
+        await open_breaker(gateway)
+        await past_cooldown()
+        release = asyncio.Event()
+
+        async def slow_ok():
+            await release.wait()
+            return "ok"
+
+        probe = asyncio.create_task(gateway.acall(slow_ok, "prompt"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(LLMUnavailableError):
+            await gateway.acall(ok, "prompt")
+        release.set()
+        assert await probe == "ok"
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_probe_reopens_breaker_instead_of_wedging_it():
+    gateway = make_gateway()
+
+    async def scenario():
+        await open_breaker(gateway)
+        await past_cooldown()
+
+        async def hangs():
+            await asyncio.Event().wait()
+
+        probe = asyncio.create_task(gateway.acall(hangs, "prompt"))
+        await asyncio.sleep(0.01)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        # Re-opened for a fresh cooldown ...
+        with pytest.raises(LLMUnavailableError):
+            await gateway.acall(ok, "prompt")
+        # ... after which the next probe gets through.
+        await past_cooldown()
+        assert await gateway.acall(ok, "prompt") == "ok"
+
+    asyncio.run(scenario())
+    assert gateway.stats()["breaker"] == "closed"
+
+
+def test_non_retryable_probe_reopens_breaker():
+    gateway = make_gateway()
+
+    async def scenario():
+        await open_breaker(gateway)
+        await past_cooldown()
+        with pytest.raises(Status):
+            await gateway.acall(bad_request, "prompt")
+        with pytest.raises(LLMUnavailableError):
+            await gateway.acall(ok, "prompt")
+        await past_cooldown()
+        assert await gateway.acall(ok, "prompt") == "ok"
+
+    asyncio.run(scenario())
+
+
+def test_sync_probe_failing_non_retryably_reopens_breaker():
+    gateway = make_gateway()
+
+    def fail(code):
+        def fn():
+            raise Status(code)
+        return fn
+
+    for _ in range(2):
+        with pytest.raises(Status):
+            gateway.call(fail(503), "prompt")
+    time.sleep(COOLDOWN * 1.5)
+    with pytest.raises(Status):
+        gateway.call(fail(400), "prompt")
+    with pytest.raises(LLMUnavailableError):
+        gateway.call(lambda: "ok", "prompt")
+    time.sleep(COOLDOWN * 1.5)
+    assert gateway.call(lambda: "ok", "prompt") == "ok"
+
+
+def test_stream_closed_after_first_chunk_counts_as_success():
+    gateway = make_gateway()
+    asyncio.run(open_breaker(gateway))
+    time.sleep(COOLDOWN * 1.5)
+
+    stream = gateway.stream(lambda: iter(["a", "b"]), "prompt")
+    assert next(stream) == "a"
+    stream.close()  # consumer stops early, after Gemini answered
+    assert gateway.stats()["breaker"] == "closed"
+
+
+def test_stream_probe_failing_before_first_chunk_reopens_breaker():
+    gateway = make_gateway()
+    asyncio.run(open_breaker(gateway))
+    time.sleep(COOLDOWN * 1.5)
+
+    def rejected():
+        raise Status(400)
+        yield  # pragma: no cover
+
+    with pytest.raises(Status):
+        list(gateway.stream(rejected, "prompt"))
+    with pytest.raises(LLMUnavailableError):
+        list(gateway.stream(lambda: iter(["a"]), "prompt"))
+    time.sleep(COOLDOWN * 1.5)
+    assert list(gateway.stream(lambda: iter(["a", "b"]), "prompt")) == ["a", "b"]
+
+
+def test_cancelled_waiter_leaves_queue():
+    gateway = make_gateway(requests_per_minute=1)
+
+    async def scenario():
+        assert await gateway.acall(ok, "prompt") == "ok"  # drains the bucket
+        waiter = asyncio.create_task(gateway.acall(ok, "prompt"))
+        await asyncio.sleep(0.01)
+        assert gateway.stats()["queue_depth"]["interactive"] == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert gateway.stats()["queue_depth"]["interactive"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_metrics_export_depth_waits_retries_and_breaker_state():
+    gateway = make_gateway(breaker_threshold=1)
+
+    async def scenario():
+        await gateway.acall(ok, "hi")
+        with pytest.raises(Status):
+            await gateway.acall(unavailable, "hi")
+
+    asyncio.run(scenario())
+    metrics = gateway.render_metrics()
+
+    assert 'learnado_llm_queue_depth{priority="interactive"} 0' in metrics
+    assert 'learnado_llm_queue_depth{priority="background"} 0' in metrics
+    assert 'learnado_llm_wait_seconds{quantile="0.95"}' in metrics
+    assert "learnado_llm_calls_total 2" in metrics
+    assert "learnado_llm_retries_total 0" in metrics
+    assert "learnado_llm_breaker_open 1" in metrics
@@ -0,0 +1,92 @@
+"""
+NotificationDispatcher: claim, send outside the transaction, record results.
+"""
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+from app import notifications as notifications_module
+from app.models import NotificationOutbox
+from app.notifications import NotificationDispatcher, build_digest
+
+
+def event(recipient_id, mission_id, title):
+    return NotificationOutbox(
+        id=uuid.uuid4(),
+        recipient_id=recipient_id,
+        mission_id=mission_id,
+        kind="lesson_completed",
+        payload={"topic": "Banking", "lesson_title": title},
+        status="pending",
+        attempts=0,
+    )
+
+
+def outbox(events, phones):
+    """respond() for FakeSessions: the due outbox rows, then the recipients' phones."""
+
+    def respond(stmt):
+        if not stmt.is_select:
+            return None
+        if stmt.column_descriptions[0]["entity"] is NotificationOutbox and len(stmt.column_descriptions) == 1:
+            return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: events))
+        return SimpleNamespace(all=lambda: list(phones.items()))
+
+    return respond
+
+
+def test_sends_outside_the_claim_transaction_and_records_results(monkeypatch, fake_sessions):
+    mission_id = uuid.uuid4()
+    ok_recipient, failing_recipient, missing_recipient = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    events = [
+        event(ok_recipient, mission_id, "Savings"),
+        event(ok_recipient, mission_id, "Loans"),
+        event(failing_recipient, mission_id, "Savings"),
+        event(missing_recipient, mission_id, "Savings"),
+    ]
+    phones = {ok_recipient: "+910000000001", failing_recipient: "+910000000002"}
+    sessions = fake_sessions(notifications_module, outbox(events, phones))
+    open_during_send = []
+
+    async def send_many(messages):
+        open_during_send.append(sessions.open)
+        return ["SM1" if phone.endswith("1") else RuntimeError("twilio 500") for phone, _ in messages]
+
+    async def summaries(db, mission_ids):
+        return {}
+
+    monkeypatch.setattr(notifications_module, "send_many", send_many)
+    monkeypatch.setattr(notifications_module, "get_mission_progress_summaries", summaries)
+
+    dispatcher = NotificationDispatcher(poll_interval=1, coalesce_seconds=0)
+    assert asyncio.run(dispatcher.dispatch_once()) == 1
+
+    assert open_during_send == [0]
+    assert all(e.status == "sending" and e.claimed_at is not None for e in events)
+    # requeue stale claims, then mark sent, then mark failed
+    assert len(sessions.updates) == 3
+    sent, failed = (u.compile().params for u in sessions.updates[1:])
+    assert set(sent["id_1"]) == {events[0].id, events[1].id}
+    assert set(failed["id_1"]) == {events[2].id, events[3].id}
+
+
+def test_nothing_due_sends_nothing(monkeypatch, fake_sessions):
+    fake_sessions(notifications_module, outbox([], {}))
+
+    async def send_many(messages):
+        raise AssertionError("nothing to send")
+
+    monkeypatch.setattr(notifications_module, "send_many", send_many)
+    assert asyncio.run(NotificationDispatcher(poll_interval=1, coalesce_seconds=0).dispatch_once()) == 0
+
+
+def test_digest_merges_lessons_per_mission():
+    recipient, mission_id = uuid.uuid4(), uuid.uuid4()
+    digest = build_digest(
+        [event(recipient, mission_id, "Savings"), event(recipient, mission_id, "Loans")],
+        {mission_id: {"completed": 2, "total": 5}},
+    )
+    assert "completed 2 lessons" in digest
+    assert "• Savings" in digest and "• Loans" in digest
+    assert "Progress: 2/5" in digest
@@ -0,0 +1,109 @@
+"""
+LessonPrefetcher: no DB session held across generation, failures not stored,
+deduplication, cancellation and foreground bypass of queued jobs.
+"""
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+from app import prefetch as prefetch_module
+from app.prefetch import LessonPrefetcher
+
+
+def lesson_row(content_md=None):
+    return SimpleNamespace(id=uuid.uuid4(), title="Saving", content_md=content_md, research_json=None)
+
+
+def serve(row):
+    """respond() for FakeSessions: the lesson row for selects."""
+    return lambda stmt: SimpleNamespace(one_or_none=lambda: row) if stmt.is_select else None
+
+
+def test_fill_releases_session_during_generation(monkeypatch, fake_sessions):
+    sessions = fake_sessions(prefetch_module, serve(lesson_row()))
+    open_during_generation = []
+
+    async def generate(topic, title, context, research):
+        open_during_generation.append(sessions.open)
+        return "# Saving"
+
+    monkeypatch.setattr(prefetch_module, "generate_lesson_content", generate)
+
+    asyncio.run(LessonPrefetcher(ahead=1, max_workers=1)._fill(uuid.uuid4(), "Banking", 0))
+    assert open_during_generation == [0]
+    assert len(sessions.updates) == 1 and sessions.commits == 1
+    assert sessions.open == 0
+
+
+def test_fill_skips_lessons_with_content(monkeypatch, fake_sessions):
+    sessions = fake_sessions(prefetch_module, serve(lesson_row(content_md="already there")))
+
+    async def generate(*args):
+        raise AssertionError("should not generate")
+
+    monkeypatch.setattr(prefetch_module, "generate_lesson_content", generate)
+
+    asyncio.run(LessonPrefetcher(ahead=1, max_workers=1)._fill(uuid.uuid4(), "Banking", 0))
+    assert sessions.updates == []
+
+
+def test_failed_generation_stores_nothing(monkeypatch, fake_sessions):
+    sessions = fake_sessions(prefetch_module, serve(lesson_row()))
+
+    async def generate(topic, title, context, research):
+        raise RuntimeError("429 rate limited")
+
+    monkeypatch.setattr(prefetch_module, "generate_lesson_content", generate)
+
+    asyncio.run(LessonPrefetcher(ahead=1, max_workers=1)._prefetch(uuid.uuid4(), "Banking", 0))
+    assert sessions.updates == []
+
+
+def test_wait_for_cancels_a_prefetch_still_queued(monkeypatch):
+    async def fill(self, mission_id, topic, order_index):
+        await self.gate.wait()
+
+    monkeypatch.setattr(LessonPrefetcher, "_fill", fill)
+
+    async def scenario():
+        prefetcher = LessonPrefetcher(ahead=2, max_workers=1)
+        prefetcher.gate = asyncio.Event()
+        mission_id = uuid.uuid4()
+        prefetcher.schedule(mission_id, "Banking", -1)  # lesson 0 runs, lesson 1 queues
+        await asyncio.sleep(0.01)
+        queued = prefetcher._inflight[(mission_id, 1)]
+        assert await prefetcher.wait_for(mission_id, 1) is False
+        await asyncio.sleep(0)
+        assert queued.cancelled()
+
+        running = asyncio.create_task(prefetcher.wait_for(mission_id, 0))
+        await asyncio.sleep(0.01)
+        assert not running.done()
+        prefetcher.gate.set()
+        return await running
+
+    assert asyncio.run(scenario()) is True
+
+
+def test_schedule_dedupes_and_cancel_mission_drops_jobs(monkeypatch):
+    started = []
+
+    async def fill(self, mission_id, topic, order_index):
+        started.append(order_index)
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(LessonPrefetcher, "_fill", fill)
+
+    async def scenario():
+        prefetcher = LessonPrefetcher(ahead=2, max_workers=4)
+        mission_id = uuid.uuid4()
+        prefetcher.schedule(mission_id, "Banking", -1)
+        prefetcher.schedule(mission_id, "Banking", 0)  # lesson 1 already in flight
+        await asyncio.sleep(0.01)
+        assert sorted(started) == [0, 1, 2]
+        prefetcher.cancel_mission(mission_id)
+        await asyncio.sleep(0.01)
+        return prefetcher
+
+    assert asyncio.run(scenario())._inflight == {}
@@ -0,0 +1,59 @@
+"""
+BM25 retrieval and the persisted index store.
+"""
+
+import threading
+
+from app.retrieval import BM25Index, IndexStore, chunk_pages
+
+
+PAGES = [
+    "Savings accounts earn interest every month at the bank branch.",
+    "A cheque normally clears within two working days.",
+    "Report card fraud on the national cybercrime helpline 1930.",
+]
+
+
+def build() -> BM25Index:
+    return BM25Index.build(chunk_pages(PAGES, 20, 5))
+
+
+def test_search_ranks_the_matching_chunk_first():
+    index = build()
+    (score, chunk_id), *_ = index.search("how long to clear a cheque?", 3)
+    assert score > 0
+    assert "cheque" in index.chunks[chunk_id].text
+
+
+def test_index_round_trips_through_disk(tmp_path):
+    store = IndexStore(str(tmp_path))
+    store.put("pdf-abc", build())
+    reloaded = IndexStore(str(tmp_path)).get("pdf-abc")
+    assert reloaded is not None
+    assert reloaded.search("fraud helpline", 1) == build().search("fraud helpline", 1)
+
+
+def test_concurrent_puts_of_one_namespace_do_not_collide(tmp_path):
+    store = IndexStore(str(tmp_path))
+    index = build()
+    threads = 8
+    barrier = threading.Barrier(threads)
+    errors: list[BaseException] = []
+
+    def put():
+        barrier.wait()
+        try:
+            for _ in range(20):
+                store.put("pdf-same", index)
+        except BaseException as e:  # pragma: no cover - the regression
+            errors.append(e)
+
+    workers = [threading.Thread(target=put) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert errors == []
+    assert list(tmp_path.glob("*.tmp")) == []
+    assert IndexStore(str(tmp_path)).get("pdf-same") is not None
@@ -0,0 +1,147 @@
+"""
+SearchCache.asearch: single-flight coalescing, cancellation and errors.
+"""
+
+import asyncio
+
+import pytest
+
+from app import search_cache as search_cache_module
+from app.search_cache import MemorySearchBackend, SearchCache, SqliteSearchBackend
+
+
+class FakeTavily:
+    """Counts searches; each one blocks until `release` is set."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.error: Exception | None = None
+
+    async def search(self, query, search_depth, max_results):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return {"query": query, "call": self.calls}
+
+
+@pytest.fixture
+def tavily(monkeypatch):
+    client = FakeTavily()
+    monkeypatch.setattr(search_cache_module, "get_async_tavily_client", lambda: client)
+    return client
+
+
+def make_cache(backend=None) -> SearchCache:
+    return SearchCache(backend or MemorySearchBackend(), ttl_seconds=60)
+
+
+def test_concurrent_callers_share_one_search(tavily):
+    cache = make_cache()
+
+    async def scenario():
+        tasks = [asyncio.create_task(cache.asearch("Bank Fees")) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        tavily.release.set()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(scenario())
+    assert tavily.calls == 1
+    assert all(r == results[0] for r in results)
+    assert cache.stats() == {"hits": 0, "misses": 1, "coalesced": 4}
+
+
+def test_cancelled_leader_does_not_cancel_waiters(tavily):
+    cache = make_cache()
+
+    async def scenario():
+        leader = asyncio.create_task(cache.asearch("upi limits"))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(cache.asearch("upi limits"))
+        await asyncio.sleep(0.01)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        await asyncio.sleep(0.01)
+        tavily.release.set()
+        return await waiter
+
+    result = asyncio.run(scenario())
+    # The waiter re-ran the search itself rather than inheriting the cancellation.
+    assert result == {"query": "upi limits", "call": 2}
+    assert tavily.calls == 2
+
+
+def test_cancelled_waiter_does_not_affect_leader(tavily):
+    cache = make_cache()
+
+    async def scenario():
+        leader = asyncio.create_task(cache.asearch("cheque clearing"))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(cache.asearch("cheque clearing"))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        tavily.release.set()
+        return await leader
+
+    assert asyncio.run(scenario())["call"] == 1
+
+
+def test_leader_error_reaches_waiters_and_is_not_cached(tavily):
+    cache = make_cache()
+    tavily.error = RuntimeError("tavily down")
+
+    async def scenario():
+        tasks = [asyncio.create_task(cache.asearch("crop insurance")) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        tavily.release.set()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert tavily.calls == 1
+
+    tavily.error = None
+    assert asyncio.run(cache.asearch("crop insurance"))["call"] == 2
+
+
+def test_results_are_cached_in_sqlite(tavily, tmp_path):
+    cache = make_cache(SqliteSearchBackend(str(tmp_path / "search.sqlite3")))
+    tavily.release.set()
+
+    async def scenario():
+        first = await cache.asearch("Pension  Scheme")
+        second = await cache.asearch("pension scheme")
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == second
+    assert tavily.calls == 1
+    assert cache.hits == 1
+
+
+
+@pytest.mark.parametrize("sqlite", [False, True])
+def test_expired_entries_are_purged_every_n_puts(tavily, tmp_path, monkeypatch, sqlite):
+    backend = SqliteSearchBackend(str(tmp_path / "search.sqlite3")) if sqlite else MemorySearchBackend()
+    cache = SearchCache(backend, ttl_seconds=60, evict_every=3)
+    tavily.release.set()
+    now = 1_000_000.0
+    monkeypatch.setattr(search_cache_module.time, "time", lambda: now)
+    purged = []
+    evict = backend.evict_expired
+    monkeypatch.setattr(backend, "evict_expired", lambda max_age: purged.append(evict(max_age)))
+
+    async def scenario():
+        nonlocal now
+        for query in ("a", "b"):
+            await cache.asearch(query)
+        now += 120  # a and b expire
+        await cache.asearch("c")  # third write purges them
+
+    asyncio.run(scenario())
+    assert purged == [2]
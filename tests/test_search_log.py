@@ -0,0 +1,83 @@
+"""
+SearchLogWriter: rotation, gzip, bounded queue and surviving write errors;
+iter_search_log reading rotated files back in order.
+"""
+
+import gzip
+import threading
+
+from app import search_log as search_log_module
+from app.search_log import SearchLogWriter, iter_search_log
+
+
+def write_all(writer: SearchLogWriter, entries) -> None:
+    for entry in entries:
+        writer.write(entry)
+    writer.close()
+
+
+def test_rotates_and_reads_back_oldest_first(tmp_path):
+    path = tmp_path / "logs" / "search.jsonl"
+    writer = SearchLogWriter(str(path), max_bytes=200, backup_count=10, compress=True)
+    write_all(writer, ({"query": f"q{i}", "pad": "x" * 40} for i in range(20)))
+
+    rotated = sorted(p.name for p in path.parent.iterdir() if p.name != path.name)
+    assert rotated and all(name.endswith(".gz") for name in rotated)
+    with gzip.open(path.with_name(path.name + ".1.gz"), "rt", encoding="utf-8") as f:
+        assert f.readline().startswith('{"query"')
+    assert [e["query"] for e in iter_search_log(str(path))] == [f"q{i}" for i in range(20)]
+
+
+def test_backup_count_limits_kept_files(tmp_path):
+    path = tmp_path / "search.jsonl"
+    writer = SearchLogWriter(str(path), max_bytes=50, backup_count=2, compress=False)
+    write_all(writer, ({"query": f"q{i}", "pad": "x" * 40} for i in range(10)))
+
+    backups = sorted(p.name for p in tmp_path.iterdir() if p.name != "search.jsonl")
+    assert backups == ["search.jsonl.1", "search.jsonl.2"]
+    # Only the newest entries survive, still oldest-first.
+    assert [e["query"] for e in iter_search_log(str(path))] == ["q8", "q9"]
+
+
+def test_iter_skips_partial_lines_and_can_ignore_rotated(tmp_path):
+    path = tmp_path / "search.jsonl"
+    (tmp_path / "search.jsonl.1").write_text('{"query": "old"}\n', encoding="utf-8")
+    path.write_text('{"query": "new"}\n{"query": "trunc', encoding="utf-8")
+
+    assert [e["query"] for e in iter_search_log(str(path))] == ["old", "new"]
+    assert [e["query"] for e in iter_search_log(str(path), include_rotated=False)] == ["new"]
+
+
+def test_failed_write_is_logged_and_writer_keeps_going(tmp_path, monkeypatch):
+    path = tmp_path / "search.jsonl"
+    dumps = search_log_module.json.dumps
+
+    def flaky_dumps(entry, **kwargs):
+        if entry["query"] == "bad":
+            raise OSError("disk full")
+        return dumps(entry, **kwargs)
+
+    monkeypatch.setattr(search_log_module.json, "dumps", flaky_dumps)
+    writer = SearchLogWriter(str(path), max_bytes=0)
+    write_all(writer, [{"query": "a"}, {"query": "bad"}, {"query": "b"}])
+
+    assert [e["query"] for e in iter_search_log(str(path))] == ["a", "b"]
+
+
+def test_full_queue_drops_entries(tmp_path, monkeypatch):
+    release = threading.Event()
+    dumps = search_log_module.json.dumps
+
+    def slow_dumps(entry, **kwargs):
+        release.wait(5)
+        return dumps(entry, **kwargs)
+
+    monkeypatch.setattr(search_log_module.json, "dumps", slow_dumps)
+    writer = SearchLogWriter(str(tmp_path / "search.jsonl"), max_queue=2)
+    for i in range(10):
+        writer.write({"query": f"q{i}"})
+    release.set()
+    writer.close()
+
+    # At most one entry in the writer's hands plus two queued.
+    assert writer.dropped >= 7
@@ -0,0 +1,123 @@
+"""
+Session state cache (full-row attach, versions, notifications) and the
+StaleDataError retry in process_message not repeating sends.
+"""
+
+import asyncio
+import json
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
+
+from app import inbound_queue as inbound_module
+from app import whatsapp
+from app.inbound_queue import QueuedMessage, process_message
+from app.session_state import CHANNEL, SessionStateCache, user_snapshot
+
+PHONE = "+910000000001"
+CREATED = datetime(2026, 1, 5, 9, 30, tzinfo=timezone.utc)
+
+
+def make_cache() -> SessionStateCache:
+    cache = SessionStateCache(max_entries=100, ttl_seconds=60)
+    cache._listening = True  # reads are only served while LISTEN is connected
+    return cache
+
+
+def snapshot(version=3, state="in_lesson", created_at=CREATED, user_id=None):
+    return user_snapshot(user_id or uuid.uuid4(), PHONE, state, version, "Asha", "hi", created_at)
+
+
+def test_attached_user_has_every_column_loaded():
+    cache = make_cache()
+    cache.remember(snapshot())
+    db = AsyncSession()
+    user = cache.attach_user(db, PHONE)
+
+    assert inspect(user).unloaded == {
+        "missions_set", "missions_learning", "progress", "messages", "documents"
+    }
+    assert (user.name, user.preferred_language, user.created_at) == ("Asha", "hi", CREATED)
+    assert (user.wa_session_state, user.wa_state_version) == ("in_lesson", 3)
+    assert inspect(user).persistent
+
+
+def test_entry_without_created_at_is_not_attached():
+    cache = make_cache()
+    cache.remember(snapshot(created_at=None))
+    assert cache.attach_user(AsyncSession(), PHONE) is None
+
+
+def test_older_versions_do_not_overwrite_newer():
+    cache = make_cache()
+    user_id = uuid.uuid4()
+    cache.remember(snapshot(version=5, state="new", user_id=user_id))
+    cache.remember(snapshot(version=4, state="old", user_id=user_id))
+    assert cache.get(PHONE).state == "new"
+
+
+def test_notification_payload_round_trips():
+    cache = make_cache()
+    cache._on_notify(None, 0, CHANNEL, json.dumps(snapshot(version=7)))
+    entry = cache.get(PHONE)
+    assert (entry.version, entry.name, entry.created_at) == (7, "Asha", CREATED)
+
+
+def test_disconnected_listener_serves_nothing():
+    cache = make_cache()
+    cache.remember(snapshot())
+    cache._listening = False
+    assert cache.attach_user(AsyncSession(), PHONE) is None
+
+
+class FakeTwilio:
+    def __init__(self) -> None:
+        self.bodies: list[str] = []
+        self.is_closed = False
+
+    async def post(self, url, data):
+        self.bodies.append(data["Body"])
+        return FakeResponse()
+
+
+class FakeResponse:
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"sid": "SM1"}
+
+
+def test_stale_retry_does_not_repeat_progress_messages(monkeypatch):
+    twilio = FakeTwilio()
+    runs = 0
+
+    async def route(msg):
+        nonlocal runs
+        runs += 1
+        await whatsapp.send_message(msg.phone, "Generating a lesson plan... give me a moment!")
+        if runs == 1:
+            raise StaleDataError("users row changed")
+        return "Here is your plan", None
+
+    monkeypatch.setattr(whatsapp, "get_http_client", lambda: twilio)
+    monkeypatch.setattr(inbound_module, "_route", route)
+
+    asyncio.run(process_message(QueuedMessage(phone=PHONE, body="learn banking")))
+    assert runs == 2
+    assert twilio.bodies == ["Generating a lesson plan... give me a moment!", "Here is your plan"]
+
+
+def test_sends_outside_a_handler_are_not_deduplicated(monkeypatch):
+    twilio = FakeTwilio()
+    monkeypatch.setattr(whatsapp, "get_http_client", lambda: twilio)
+
+    async def scenario():
+        await whatsapp.send_message(PHONE, "same")
+        await whatsapp.send_message(PHONE, "same")
+
+    asyncio.run(scenario())
+    assert twilio.bodies == ["same", "same"]
@@ -0,0 +1,55 @@
+"""
+JsonlExporter: writes happen on the writer thread and close() flushes them.
+"""
+
+import json
+import threading
+
+from app import tracing as tracing_module
+from app.tracing import JsonlExporter, Span
+
+
+def span(i: int) -> Span:
+    return Span(name=f"stage.{i}", trace_id="t" * 32, span_id=f"{i:016x}", parent_id=None, start_time=0.0)
+
+
+def test_export_is_handed_to_the_writer_thread(tmp_path, monkeypatch):
+    writers = []
+    dumps = json.dumps
+
+    def recording_dumps(*args, **kwargs):
+        writers.append(threading.current_thread().name)
+        return dumps(*args, **kwargs)
+
+    monkeypatch.setattr(tracing_module.json, "dumps", recording_dumps)
+    path = tmp_path / "spans" / "trace.jsonl"
+    exporter = JsonlExporter(str(path))
+    for i in range(50):
+        exporter.export(span(i))
+    exporter.close()
+
+    assert set(writers) == {"jsonl-exporter"}
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == [f"stage.{i}" for i in range(50)]
+
+
+def test_full_queue_drops_spans_instead_of_blocking(tmp_path):
+    exporter = JsonlExporter(str(tmp_path / "trace.jsonl"), max_queue=1)
+    writing, release = threading.Event(), threading.Event()
+    write = exporter._file.write
+
+    def slow_write(line):
+        writing.set()
+        release.wait(5)
+        return write(line)
+
+    exporter._file.write = slow_write
+    exporter.export(span(0))
+    assert writing.wait(5)  # writer thread is stuck on span 0
+    exporter.export(span(1))  # fills the queue
+    exporter.export(span(2))  # dropped
+    release.set()
+    exporter.close()
+
+    assert exporter.dropped == 1
+    assert len((tmp_path / "trace.jsonl").read_text().splitlines()) == 2
@@ -0,0 +1,49 @@
+"""
+ingest_upload: content-addressed storage and the streamed 413 limit.
+"""
+
+import asyncio
+import hashlib
+import io
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app import uploads as uploads_module
+from app.config import settings
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads_module, "UPLOAD_DIR", tmp_path)
+    monkeypatch.setattr(settings, "upload_max_mb", 1)
+    monkeypatch.setattr(settings, "upload_chunk_bytes", 64 * 1024)
+    return tmp_path
+
+
+def test_stores_under_the_content_hash(upload_dir):
+    data = b"%PDF-1.7 lesson notes"
+    stored = asyncio.run(uploads_module.ingest_upload(UploadFile(io.BytesIO(data), filename="Notes.PDF")))
+
+    assert stored.path == upload_dir / f"{hashlib.sha256(data).hexdigest()}.pdf"
+    assert stored.path.read_bytes() == data
+    assert (stored.size, stored.filename) == (len(data), "Notes.PDF")
+
+
+def test_known_oversize_is_rejected_before_writing(upload_dir):
+    data = b"x" * (1024 * 1024 + 1)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(uploads_module.ingest_upload(UploadFile(io.BytesIO(data), size=len(data), filename="big.bin")))
+
+    assert exc.value.status_code == 413
+    assert list(upload_dir.iterdir()) == []
+
+
+def test_oversize_while_streaming_removes_the_partial_file(upload_dir):
+    # No size up front: the limit is hit mid-stream.
+    data = b"x" * (1024 * 1024 + 1)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(uploads_module.ingest_upload(UploadFile(io.BytesIO(data), filename="big.bin")))
+
+    assert exc.value.status_code == 413
+    assert list(upload_dir.iterdir()) == []
@@ -0,0 +1,102 @@
+"""
+LessonVariants: stored levels, session lifetime and bounded pre-generation.
+"""
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+from app import agent_bridge
+from app import variants as variants_module
+from app.agent_bridge import MAX_SIMPLIFY_LEVEL
+from app.variants import LessonVariants
+
+
+class FakeDB:
+    """Session passed to simplified(); returns the given (level, content) rows."""
+
+    def __init__(self, rows) -> None:
+        self.rows = rows
+
+    async def execute(self, stmt):
+        return SimpleNamespace(all=lambda: list(self.rows))
+
+
+def patch(monkeypatch, fake_sessions, simplify):
+    sessions = fake_sessions(variants_module, lambda stmt: SimpleNamespace(scalar_one_or_none=lambda: None))
+    monkeypatch.setattr(variants_module, "asimplify_lesson_text", simplify)
+    return sessions
+
+
+def test_all_levels_stored_starts_no_tasks(monkeypatch, fake_sessions):
+    async def simplify(content, level):
+        raise AssertionError("should not generate")
+
+    sessions = patch(monkeypatch, fake_sessions, simplify)
+    rows = [(level, f"level {level}") for level in range(1, MAX_SIMPLIFY_LEVEL + 1)]
+
+    async def scenario():
+        variants = LessonVariants(max_background=1)
+        text = await variants.simplified(FakeDB(rows), uuid.uuid4(), "lesson", attempt=1)
+        return variants, text
+
+    variants, text = asyncio.run(scenario())
+    assert text == "level 1"
+    assert variants._inflight == {}
+    assert sessions.opened == 0
+
+
+def test_generation_holds_no_session(monkeypatch, fake_sessions):
+    open_during_generation = []
+
+    async def simplify(content, level):
+        open_during_generation.append(sessions.open)
+        return f"simple {level}"
+
+    sessions = patch(monkeypatch, fake_sessions, simplify)
+
+    async def scenario():
+        variants = LessonVariants(max_background=1)
+        text = await variants.simplified(FakeDB([]), uuid.uuid4(), "lesson", attempt=MAX_SIMPLIFY_LEVEL)
+        return text
+
+    assert asyncio.run(scenario()) == f"simple {MAX_SIMPLIFY_LEVEL}"
+    assert open_during_generation == [0]
+    assert len(sessions.inserts) == 1 and sessions.open == 0
+
+
+def test_background_pregeneration_is_bounded(monkeypatch, fake_sessions):
+    running = 0
+    peak = 0
+
+    async def simplify(content, level):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return f"simple {level}"
+
+    sessions = patch(monkeypatch, fake_sessions, simplify)
+
+    async def scenario():
+        variants = LessonVariants(max_background=1)
+        lessons = [uuid.uuid4() for _ in range(4)]
+        for lesson_id in lessons:
+            await variants.simplified(FakeDB([(1, "stored")]), lesson_id, "lesson", attempt=1)
+        while variants._inflight:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    # Each lesson pre-generates levels 2..MAX in the background, one at a time.
+    assert peak == 1
+    assert len(sessions.inserts) == 4 * (MAX_SIMPLIFY_LEVEL - 1)
+
+
+def test_simplify_accepts_list_content(monkeypatch):
+    class FakeLLM:
+        async def ainvoke(self, prompt):
+            return SimpleNamespace(content=[{"type": "text", "text": "Short "}, "and simple."])
+
+    monkeypatch.setattr(agent_bridge, "get_tool_llm", lambda: FakeLLM())
+    assert asyncio.run(agent_bridge.asimplify_lesson_text("Long lesson", 1)) == "Short and simple."
@@ -0,0 +1,34 @@
+"""
+split_message: chunks stay under the limit and break at the nicest boundary.
+"""
+
+from app.whatsapp import split_message
+
+
+def test_short_body_is_one_chunk():
+    assert split_message("hello", max_len=10) == ["hello"]
+    assert split_message("", max_len=10) == [""]
+
+
+def test_prefers_paragraph_then_line_then_word_breaks():
+    para = "a" * 12 + "\n\n" + "b b b\nb" + "b" * 5
+    assert split_message(para, max_len=20) == ["a" * 12, "b b b\nb" + "b" * 5]
+
+    line = "a" * 12 + "\n" + "b b" + "b" * 10
+    assert split_message(line, max_len=20) == ["a" * 12, "b b" + "b" * 10]
+
+    words = "alpha bravo charlie delta"
+    assert split_message(words, max_len=14) == ["alpha bravo", "charlie delta"]
+
+
+def test_early_break_is_ignored_for_a_hard_cut():
+    # The only space would leave a tiny first chunk, so cut at max_len instead.
+    body = "ab " + "c" * 30
+    assert split_message(body, max_len=20) == [body[:20], body[20:]]
+
+
+def test_every_chunk_fits_and_no_text_is_lost():
+    body = " ".join(f"word{i}" for i in range(500))
+    chunks = split_message(body, max_len=100)
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert " ".join(chunks) == body